@@ -0,0 +1,70 @@
+"""Compares ledger append throughput of per-row writes and the group-commit journal.
+
+Usage: python -m benchmarks.append_throughput [rows]
+
+Every strategy appends the same rows to a fresh ledger in a temp directory:
+the old per-row open/append/close, storage.append_transaction (lock, rollup
+update) with and without an fsync per row, and a JournalWriter at several
+fsync intervals. Each result is checked to hold every row exactly once.
+"""
+import os
+import sys
+import tempfile
+import time
+
+from features.storage import journal, storage
+from features.storage.codec import Transaction, encode_record
+
+def make_rows(rows):
+    return [
+        Transaction(f"2024-{i % 12 + 1:02d}-{i % 28 + 1:02d}", "expense", "Food", f"Row {i}", 100 + i % 500)
+        for i in range(rows)
+    ]
+
+def per_row_open(transactions, path):
+    for transaction in transactions:
+        with open(path, "a") as f:
+            f.write(encode_record(transaction))
+
+def per_row_append(transactions, path):
+    for transaction in transactions:
+        storage.append_transaction(transaction, path)
+
+def per_row_fsync(transactions, path):
+    for transaction in transactions:
+        storage.append_transactions([transaction], path, fsync=True)
+
+def journal_writer(fsync_interval):
+    def run(transactions, path):
+        with journal.JournalWriter(path, fsync_interval=fsync_interval) as writer:
+            for transaction in transactions:
+                writer.submit(transaction)
+    return run
+
+STRATEGIES = [
+    ("per-row open/append", per_row_open),
+    ("per-row append_transaction", per_row_append),
+    ("per-row append + fsync", per_row_fsync),
+    ("journal, fsync every group", journal_writer(0)),
+    ("journal, fsync every 0.5s", journal_writer(0.5)),
+    ("journal, no fsync", journal_writer(-1)),
+]
+
+def main(rows):
+    transactions = make_rows(rows)
+    print(f"{'strategy':<28} {'rows/s':>10} {'seconds':>8}")
+    with tempfile.TemporaryDirectory() as workdir:
+        for i, (name, run) in enumerate(STRATEGIES):
+            path = os.path.join(workdir, f"ledger-{i}.txt")
+            start = time.perf_counter()
+            run(transactions, path)
+            elapsed = time.perf_counter() - start
+            written = list(storage.read_text_transactions(path))
+            if written != transactions:
+                print(f"FAIL: {name} wrote {len(written)} of {rows} rows")
+                return 1
+            print(f"{name:<28} {rows / elapsed:>10,.0f} {elapsed:>8.3f}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(int(sys.argv[1]) if len(sys.argv) > 1 else 20_000))
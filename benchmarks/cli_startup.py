@@ -0,0 +1,91 @@
+"""Measures batch CLI startup time against a per-command budget.
+
+Usage: python -m benchmarks.cli_startup [runs]
+
+Each command runs in a fresh interpreter against a small ledger in a temp
+directory. The budgets cover what the app adds on top of a bare interpreter
+(`python -c pass`), whose startup varies with the machine and with whatever
+site-packages loads. The script fails if a command's median wall time, less
+the interpreter's, exceeds its budget or if it imports a module it shouldn't
+need.
+"""
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Median seconds a command adds to the interpreter's own startup. Measured
+# with 9 runs on Python 3.13 on Linux: balance 0.08-0.09, budgets 0.07-0.08,
+# analyze 0.07-0.09, export 0.03, add 0.10-0.11; the budgets leave room for
+# slower machines.
+STARTUP_BUDGET_SECONDS = {
+    "balance": 0.25,
+    "budgets": 0.25,
+    "analyze": 0.25,
+    "export": 0.10,
+    "add": 0.25,
+}
+
+COMMANDS = {
+    "balance": ["balance"],
+    "budgets": ["budgets"],
+    "analyze": ["analyze", "spending"],
+    "export": ["export", "-o", os.devnull],
+    "add": ["add", "expense", "1.50", "Food", "Startup benchmark"],
+}
+
+FORBIDDEN_MODULES = ["questionary", "streamlit", "pandas", "numpy", "plotly"]
+
+def run_command(workdir, argv, importtime=False):
+    command = [sys.executable] + (["-X", "importtime"] if importtime else []) + [os.path.join(ROOT, "main.py")] + argv
+    return run(workdir, command)
+
+def run(workdir, command):
+    start = time.perf_counter()
+    result = subprocess.run(command, cwd=workdir, capture_output=True, text=True, env={**os.environ, "PYTHONPATH": ROOT})
+    elapsed = time.perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError(f"{' '.join(command[1:])} failed:\n{result.stderr}")
+    return elapsed, result.stderr
+
+def imported_modules(importtime_log):
+    modules = set()
+    for line in importtime_log.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            modules.add(line.rsplit("|", 1)[1].strip().split(".")[0])
+    return modules
+
+def main(runs):
+    failures = []
+    with tempfile.TemporaryDirectory() as workdir:
+        shutil.copytree(os.path.join(ROOT, "database"), os.path.join(workdir, "database"))
+        interpreter = statistics.median(
+            run(workdir, [sys.executable, "-c", "pass"])[0] for _ in range(runs)
+        )
+        print(f"interpreter startup: {interpreter:.3f}s")
+        print(f"{'command':<10} {'median (s)':>10} {'app (s)':>10} {'budget (s)':>10}")
+        for name, argv in COMMANDS.items():
+            times = [run_command(workdir, argv)[0] for _ in range(runs)]
+            median = statistics.median(times)
+            app = median - interpreter
+            budget = STARTUP_BUDGET_SECONDS[name]
+            print(f"{name:<10} {median:>10.3f} {app:>10.3f} {budget:>10.2f}")
+            if app > budget:
+                failures.append(f"{name} took {app:.3f}s beyond interpreter startup, budget is {budget:.2f}s")
+
+            loaded = imported_modules(run_command(workdir, argv, importtime=True)[1])
+            for module in FORBIDDEN_MODULES:
+                if module in loaded:
+                    failures.append(f"{name} imported {module}")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main(int(sys.argv[1]) if len(sys.argv) > 1 else 5))
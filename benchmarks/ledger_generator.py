@@ -0,0 +1,117 @@
+"""Seeded synthetic ledgers for benchmarks.
+
+Usage: python -m benchmarks.ledger_generator ROWS [--seed N] [--output PATH]
+"""
+import argparse
+import random
+from datetime import date, timedelta
+
+from features.storage.codec import Transaction, encode_record
+from features.transactions.transactions import EXPENSE_CATEGORIES, INCOME_CATEGORIES
+
+# (relative frequency, median amount in rupees) per expense category
+EXPENSE_PROFILE = {
+    "Food": (40, 450),
+    "Transport": (20, 250),
+    "Shopping": (12, 2500),
+    "Bills": (6, 4000),
+    "Entertainment": (10, 1200),
+    "Health": (4, 1800),
+    "Other": (8, 800),
+}
+INCOME_PROFILE = {
+    "Freelance": (40, 15000),
+    "Business": (20, 30000),
+    "Investment": (20, 5000),
+    "Gift": (10, 3000),
+    "Other": (10, 2000),
+}
+DESCRIPTIONS = {
+    "Food": ["Groceries", "Lunch", "Dinner out", "Coffee", "Bakery"],
+    "Transport": ["Uber", "Fuel", "Metro card", "Parking"],
+    "Shopping": ["Clothes", "Electronics", "Books", "Home supplies"],
+    "Bills": ["Electricity", "Internet", "Rent", "Phone"],
+    "Entertainment": ["Cinema", "Streaming", "Concert", "Games"],
+    "Health": ["Pharmacy", "Doctor", "Gym"],
+    "Other": ["Misc", "Donation", "Repairs"],
+    "Salary": ["Monthly salary"],
+    "Freelance": ["Client project", "Consulting"],
+    "Business": ["Sales", "Invoice paid"],
+    "Investment": ["Dividends", "Profit"],
+    "Gift": ["Birthday gift"],
+}
+
+assert set(EXPENSE_PROFILE) == set(EXPENSE_CATEGORIES)
+assert set(INCOME_PROFILE) | {"Salary"} == set(INCOME_CATEGORIES)
+
+def _amount(rng, median_rupees):
+    # Log-normal spend, stored in paisa
+    return max(100, int(rng.lognormvariate(0, 0.6) * median_rupees * 100))
+
+def generate_transactions(rows, seed=0, end=None):
+    """Yields `rows` transactions in date order, ending in the month of `end` (default today).
+
+    Every month gets a salary on the 1st; the rest are mostly expenses with
+    more activity on weekends, plus occasional other income.
+    """
+    rng = random.Random(seed)
+    end = end or date.today()
+    # Roughly 150 transactions a month, so larger ledgers span more years
+    months = max(1, rows // 150)
+    first = date(end.year, end.month, 1)
+    for _ in range(months - 1):
+        first = (first - timedelta(days=1)).replace(day=1)
+
+    expense_categories = list(EXPENSE_PROFILE)
+    expense_weights = [weight for weight, _ in EXPENSE_PROFILE.values()]
+    income_categories = list(INCOME_PROFILE)
+    income_weights = [weight for weight, _ in INCOME_PROFILE.values()]
+    days = (end - first).days + 1
+    # Salaries are extra rows, and the weekday/weekend weights below average to 1
+    per_day = max(rows - months, 0) / days / ((5 * 0.85 + 2 * 1.4) / 7)
+
+    produced = 0
+    day = first
+    carry = 0.0
+    while produced < rows:
+        if day.day == 1:
+            yield Transaction(day.isoformat(), "income", "Salary", "Monthly salary", 150_000_00)
+            produced += 1
+        weekend = day.weekday() >= 5
+        carry += per_day * (1.4 if weekend else 0.85)
+        count = int(carry)
+        carry -= count
+        if day >= end:
+            count = rows - produced  # the last day absorbs whatever is left
+        for _ in range(min(count, rows - produced)):
+            if rng.random() < 0.05:
+                category = rng.choices(income_categories, income_weights)[0]
+                type, median = "income", INCOME_PROFILE[category][1]
+            else:
+                category = rng.choices(expense_categories, expense_weights)[0]
+                type, median = "expense", EXPENSE_PROFILE[category][1]
+            description = rng.choice(DESCRIPTIONS[category])
+            yield Transaction(day.isoformat(), type, category, description, _amount(rng, median))
+            produced += 1
+        day += timedelta(days=1)
+
+def write_ledger(path, rows, seed=0, end=None):
+    """Writes a synthetic ledger in the canonical text format."""
+    with open(path, "w", buffering=1 << 20) as f:
+        for transaction in generate_transactions(rows, seed, end):
+            f.write(encode_record(transaction))
+
+def write_budgets(path, seed=0):
+    """Writes a budget for every expense category."""
+    rng = random.Random(seed)
+    with open(path, "w") as f:
+        for category, (weight, median) in EXPENSE_PROFILE.items():
+            f.write(f"{category},{int(weight * median * 100 * rng.uniform(3, 5))}\n")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write a synthetic ledger.")
+    parser.add_argument("rows", type=int)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="database/transactions.txt")
+    args = parser.parse_args()
+    write_ledger(args.output, args.rows, args.seed)
@@ -0,0 +1,84 @@
+"""Benchmarks the bulk dashboard loader against the previous per-line loader.
+
+Usage: python -m benchmarks.load_transactions [rows ...]
+Default sizes are 10^5, 10^6 and 10^7 rows.
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+import pandas as pd
+
+from features.storage.frames import FRAME_COLUMNS, load_text_frame
+
+CATEGORIES = ["Food", "Transport", "Shopping", "Bills", "Entertainment", "Health", "Other"]
+
+def write_ledger(path, rows, seed=0):
+    """Writes a synthetic ledger with a few malformed and legacy comma rows mixed in."""
+    rng = random.Random(seed)
+    start = date(2015, 1, 1)
+    with open(path, "w") as f:
+        for i in range(rows):
+            day = (start + timedelta(days=rng.randrange(3650))).isoformat()
+            category = rng.choice(CATEGORIES)
+            sep = "," if i % 50 == 0 else "|"
+            if i % 1000 == 0:
+                f.write("not a transaction\n")
+            f.write(f"{day}{sep}expense{sep}{category}{sep}Row {i}{sep}{rng.randrange(1, 10**7)}\n")
+
+def load_rowwise(path):
+    """The dashboard loader before the bulk loader: one split and strptime per line."""
+    with open(path, "r") as f:
+        lines = f.readlines()
+
+    transactions = []
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        for sep in ["|", ","]:
+            parts = [p.strip() for p in line.split(sep)]
+            if len(parts) == 5:
+                break
+        else:
+            continue
+        date_str, trans_type, category, description, amount_paisa = parts
+        try:
+            transactions.append({
+                "Date": datetime.strptime(date_str, "%Y-%m-%d"),
+                "Type": trans_type.lower().title(),
+                "Category": category,
+                "Description": description,
+                "Amount": int(amount_paisa) / 100,
+            })
+        except ValueError:
+            continue
+    if not transactions:
+        return pd.DataFrame(columns=FRAME_COLUMNS)
+    return pd.DataFrame(transactions)
+
+def timed(func, path):
+    start = time.perf_counter()
+    result = func(path)
+    return time.perf_counter() - start, result
+
+def main(sizes):
+    print(f"{'rows':>10} {'per-line (s)':>14} {'bulk (s)':>10} {'speedup':>8}")
+    for rows in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "transactions.txt")
+            write_ledger(path, rows)
+            rowwise_time, expected = timed(load_rowwise, path)
+            bulk_time, actual = timed(load_text_frame, path)
+            assert len(expected) == len(actual), "loaders disagree on skipped rows"
+            assert (expected["Date"].to_numpy() == actual["Date"].to_numpy()).all()
+            # The bulk loader keeps amounts in paisa
+            assert (expected["Amount"].to_numpy() == actual["Amount"].to_numpy() / 100).all()
+            del expected, actual
+        print(f"{rows:>10} {rowwise_time:>14.2f} {bulk_time:>10.2f} {rowwise_time / bulk_time:>7.1f}x")
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [10**5, 10**6, 10**7])
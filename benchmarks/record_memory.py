@@ -0,0 +1,113 @@
+"""Measures the memory of every in-memory transaction representation.
+
+Usage: python -m benchmarks.record_memory [rows ...]
+Default sizes are 10^5 and 10^6 rows.
+
+For each size a synthetic ledger is written to a temp directory and loaded
+into each representation in turn. The retained size is what tracemalloc
+still counts once the representation is built, the peak includes what was
+allocated on the way. The DataFrame is measured with memory_usage(deep=True),
+since pandas keeps its arrays outside tracemalloc's view when NumPy allocates.
+"""
+import gc
+import os
+import sys
+import tempfile
+import tracemalloc
+from array import array
+
+from benchmarks.ledger_generator import write_ledger
+from features.storage import storage
+from features.storage.codec import decode_record
+
+DEFAULT_SIZES = [100_000, 1_000_000]
+
+def raw_lines(path):
+    """Every line of the file as a string."""
+    with open(path, "r") as f:
+        return f.readlines()
+
+def transaction_tuples(path):
+    """The previous read_text_transactions: a list of Transaction namedtuples."""
+    with open(path, "r") as f:
+        transactions = [decode_record(line) for line in f]
+    return [t for t in transactions if t is not None]
+
+def row_dicts(path):
+    """The previous dashboard loader: one dict per row before building the DataFrame."""
+    return [
+        {
+            "Date": t.date,
+            "Type": t.type.title(),
+            "Category": t.category,
+            "Description": t.description,
+            "Amount": t.amount / 100,
+        }
+        for t in storage.iter_text_transactions(path)
+    ]
+
+def transaction_columns(path):
+    return storage.read_text_transactions(path)
+
+def offset_lists(path, new=list):
+    """The previous ledger index offsets: three lists of ints."""
+    offsets, months, categories = new(), {}, {}
+    with open(path, "rb") as f:
+        offset = 0
+        for raw in f:
+            transaction = decode_record(raw.decode("utf-8"))
+            if transaction is not None:
+                key = (int(transaction.date[:4]), int(transaction.date[5:7]))
+                offsets.append(offset)
+                months.setdefault(key, new()).append(offset)
+                categories.setdefault(key + (transaction.category,), new()).append(offset)
+            offset += len(raw)
+    return offsets, months, categories
+
+def offset_arrays(path):
+    """The ledger index offsets as LedgerIndex keeps them now."""
+    return offset_lists(path, lambda: array("q"))
+
+REPRESENTATIONS = {
+    "lines (list of str)": raw_lines,
+    "list of Transaction tuples": transaction_tuples,
+    "list of row dicts": row_dicts,
+    "TransactionColumns": transaction_columns,
+    "index, offset lists": offset_lists,
+    "index, offset arrays": offset_arrays,
+}
+
+def measure(func, path):
+    gc.collect()
+    tracemalloc.start()
+    try:
+        value = func(path)
+        retained, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del value
+    return retained, peak
+
+def frame_bytes(path):
+    from features.storage.frames import load_text_frame
+    return int(load_text_frame(path).memory_usage(deep=True).sum())
+
+def main(sizes):
+    with tempfile.TemporaryDirectory() as workdir:
+        for rows in sizes:
+            path = os.path.join(workdir, f"ledger-{rows}.txt")
+            write_ledger(path, rows)
+            print(f"\n{rows:,} rows, {os.path.getsize(path) / 2**20:.1f} MiB on disk")
+            print(f"{'representation':<28} {'retained MiB':>12} {'peak MiB':>9} {'bytes/row':>10}")
+            for name, func in REPRESENTATIONS.items():
+                retained, peak = measure(func, path)
+                print(f"{name:<28} {retained / 2**20:>12.1f} {peak / 2**20:>9.1f} {retained / rows:>10.0f}")
+            try:
+                size = frame_bytes(path)
+            except ImportError:
+                continue
+            print(f"{'DataFrame (deep)':<28} {size / 2**20:>12.1f} {'':>9} {size / rows:>10.0f}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main([int(size) for size in sys.argv[1:]] or DEFAULT_SIZES))
@@ -0,0 +1,150 @@
+"""Times every feature entry point headlessly at several ledger sizes.
+
+Usage: python -m benchmarks.run_benchmarks [--sizes 10000 100000 ...] [--entry-points ...]
+                                           [--output results.json] [--compare old.json]
+
+For each size a synthetic ledger is generated in a temp directory, and each
+entry point is timed cold (no in-process index, no rollup file) and warm
+(immediately called again). Peak Python memory of the cold run is measured
+separately with tracemalloc. Results are written as JSON so runs can be
+compared with --compare, which flags entries that got more than 20% slower.
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+from benchmarks.ledger_generator import write_budgets, write_ledger
+from features.analytics import analytics
+from features.budgets import budgets
+from features.storage import rollup, storage
+from features.transactions import transactions
+
+DEFAULT_SIZES = [10_000, 100_000]
+REGRESSION_THRESHOLD = 1.2
+
+def _load_dashboard_frame():
+    from features.storage.frames import LedgerFrameCache
+    return LedgerFrameCache(storage.TRANSACTIONS_FILE).get()
+
+ENTRY_POINTS = {
+    "list_transactions": transactions.list_transactions,
+    "show_balance": transactions.show_balance,
+    "display_budgets": budgets.display_budgets,
+    "analyze_spending": analytics.analyze_spending,
+    "analyze_income": analytics.analyze_income,
+    "dashboard.load_transactions": _load_dashboard_frame,
+}
+
+def _reset_caches():
+    storage._indexes.clear()
+    rollup._cache.clear()
+    try:
+        os.remove(storage.rollup_path())
+    except FileNotFoundError:
+        pass
+
+def _timed(func):
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+def _peak_memory(func):
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+def run(sizes, seed=0, entry_points=None):
+    entry_points = entry_points or list(ENTRY_POINTS)
+    results = []
+    cwd = os.getcwd()
+    # Output is rendered but thrown away, so rendering cost is still measured
+    with open(os.devnull, "w") as devnull, tempfile.TemporaryDirectory() as workdir:
+        for module in (transactions, budgets, analytics):
+            module.console.file = devnull
+        os.makedirs(os.path.join(workdir, "database"))
+        os.chdir(workdir)
+        try:
+            for rows in sizes:
+                write_ledger(storage.TRANSACTIONS_FILE, rows, seed)
+                write_budgets(storage.BUDGETS_FILE, seed)
+                for name in entry_points:
+                    func = ENTRY_POINTS[name]
+                    if name.startswith("dashboard") and not _has_pandas():
+                        continue
+                    with contextlib.redirect_stdout(devnull):
+                        _reset_caches()
+                        cold = _timed(func)
+                        warm = _timed(func)
+                        _reset_caches()
+                        peak = _peak_memory(func)
+                    results.append({
+                        "entry_point": name,
+                        "rows": rows,
+                        "cold_seconds": round(cold, 4),
+                        "warm_seconds": round(warm, 4),
+                        "peak_memory_bytes": peak,
+                    })
+                    print(f"{name:<28} {rows:>9} rows  cold {cold:8.3f}s  warm {warm:8.3f}s  peak {peak / 2**20:8.1f} MiB")
+        finally:
+            os.chdir(cwd)
+
+    return {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "seed": seed,
+        "results": results,
+    }
+
+def _has_pandas():
+    try:
+        import pandas  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+def compare(old, new):
+    """Prints timing changes between two result files. Returns the number of regressions."""
+    previous = {(r["entry_point"], r["rows"]): r for r in old["results"]}
+    regressions = 0
+    for result in new["results"]:
+        before = previous.get((result["entry_point"], result["rows"]))
+        if not before:
+            continue
+        for key in ["cold_seconds", "warm_seconds"]:
+            if before[key] and result[key] / before[key] > REGRESSION_THRESHOLD and result[key] - before[key] > 0.005:
+                regressions += 1
+                print(f"REGRESSION {result['entry_point']} {result['rows']} rows {key}: {before[key]:.3f}s -> {result[key]:.3f}s")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the finance tracker entry points.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--entry-points", nargs="+", choices=list(ENTRY_POINTS), help="defaults to all")
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    args = parser.parse_args()
+
+    report = run(args.sizes, args.seed, args.entry_points)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare, "r") as f:
+            return 1 if compare(json.load(f), report) else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
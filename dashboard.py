@@ -1,7 +1,17 @@
+import os
 import streamlit as st
 import pandas as pd
-from datetime import datetime
+from datetime import date, timedelta
 import plotly.express as px
+from features.analytics.dashboard_queries import DashboardQueries
+from features.analytics.metrics import HEALTH_WINDOW_MONTHS, get_metrics_pipeline, health_score
+from features.budgets.budget_engine import evaluate
+from features.analytics.range_engine import get_range_engine, shift_years
+from features.instrumentation import instrumentation
+from features.instrumentation.instrumentation import stage
+from features.storage import recurring_store, storage
+from features.storage.frames import LedgerFrameCache, concat_frames, load_columnar_frame, load_shard_frames, load_sqlite_frame
+from features.storage.storage import COLUMNAR_DIR, SHARDS_DIR, TRANSACTIONS_FILE
 
 # --- Page Configuration ---
 st.set_page_config(
@@ -17,71 +27,68 @@ SECONDARY_COLOR = "#ff7f0e"
 SUCCESS_COLOR = "#2ca02c"
 WARNING_COLOR = "#d62728"
 
-# --- Data Loading ---
-@st.cache_data
-def load_transactions():
-    """Loads transactions from the text file and returns a DataFrame."""
-    try:
-        with open("database/transactions.txt", "r") as f:
-            lines = f.readlines()
-    except FileNotFoundError:
-        return pd.DataFrame(columns=["Date", "Type", "Category", "Description", "Amount"])
-
-    def parse_line(line: str):
-        line = line.strip()
-        if not line:
-            return None
-        # Try comma first, then pipe
-        for sep in [",", "|"]:
-            parts = [p.strip() for p in line.split(sep)]
-            if len(parts) == 5:
-                return parts
-        return None
-
-    transactions = []
-    for line in lines:
-        parsed = parse_line(line)
-        if not parsed:
-            continue
-        date_str, trans_type, category, description, amount_paisa = parsed
-        try:
-            date = datetime.strptime(date_str, "%Y-%m-%d")
-            # Normalize type to 'Income' / 'Expense'
-            t = trans_type.strip().lower()
-            if t == "income":
-                norm_type = "Income"
-            elif t == "expense":
-                norm_type = "Expense"
-            else:
-                norm_type = trans_type.strip().title()
+# Rows per page of the transactions grid
+PAGE_SIZE = 100
+# Newest matches shown for a description search
+SEARCH_LIMIT = 500
+# Months shown in the financial health trends
+TREND_MONTHS = 24
 
-            amount = int(amount_paisa) / 100  # stored in paisa
-
-            transactions.append({
-                "Date": date,
-                "Type": norm_type,
-                "Category": category.strip(),
-                "Description": description.strip(),
-                "Amount": amount,
-            })
-        except Exception:
-            continue
-
-    if not transactions:
-        return pd.DataFrame(columns=["Date", "Type", "Category", "Description", "Amount"])
+# --- Data Loading ---
+@st.cache_resource
+def ledger_frame_cache():
+    """Shared across reruns and sessions; refreshes itself when the ledger changes."""
+    return LedgerFrameCache(TRANSACTIONS_FILE)
+
+@st.cache_resource(max_entries=1)
+def load_queries(version):
+    """Shared across reruns and sessions until the data version changes, e.g. after a CLI append."""
+    with stage("dashboard.load_transactions"):
+        return DashboardQueries(load_transactions())
+
+@st.cache_resource(max_entries=1)
+def materialize_recurring(day):
+    """Adds the recurring transactions that came due, once a day per server rather than on every rerun."""
+    return recurring_store.materialize()
+
+@st.cache_data(max_entries=1)
+def load_archived_transactions(shards_signature):
+    """Cached per (path, size, mtime) of every archived shard."""
+    return load_shard_frames()
 
-    return pd.DataFrame(transactions)
+def load_transactions():
+    """Loads transactions from the ledger, archived shards first, and returns a DataFrame."""
+    frame = load_live_transactions()
+    if os.path.isdir(SHARDS_DIR):
+        from features.storage import shards
+        frame = concat_frames([load_archived_transactions(shards.signature()), frame])
+    return frame
+
+def load_live_transactions():
+    """Loads the live ledger the new transactions are appended to."""
+    if storage.BACKEND == "sqlite":
+        return load_sqlite_frame()
+    if os.path.isdir(COLUMNAR_DIR):
+        from features.storage import columnar
+        if columnar.is_fresh():
+            return load_columnar_frame()
+    return ledger_frame_cache().get()
 
 # --- UI Components ---
-def display_dashboard(df: pd.DataFrame):
+def in_rupees(frame, columns):
+    """Returns a copy of a frame with paisa columns converted to rupees, for display only."""
+    return frame.assign(**{column: frame[column] / 100 for column in columns})
+
+def display_dashboard(queries: DashboardQueries):
     st.header("Monthly Financial Overview")
-    current_month = datetime.now().month
-    current_year = datetime.now().year
-    df_month = df[(df['Date'].dt.month == current_month) & (df['Date'].dt.year == current_year)]
+    today = date.today()
+    month_start = today.replace(day=1)
+    month_end = (month_start + timedelta(days=32)).replace(day=1) - timedelta(days=1)
 
     # --- Metrics ---
-    total_income = df_month[df_month['Type'] == 'Income']['Amount'].sum()
-    total_expenses = df_month[df_month['Type'] == 'Expense']['Amount'].sum()
+    totals = queries.totals(month_start, month_end)
+    total_income = totals.get('Income', 0) / 100
+    total_expenses = totals.get('Expense', 0) / 100
     current_balance = total_income - total_expenses
     savings_rate = (current_balance / total_income) if total_income > 0 else 0
 
@@ -99,14 +106,10 @@ def display_dashboard(df: pd.DataFrame):
     # ---- Spending by Category ----
     with col1:
         st.subheader("Spending by Category")
-        expense_by_cat = (
-            df_month[df_month['Type'] == 'Expense']
-            .groupby('Category')['Amount']
-            .sum()
-        )
+        expense_by_cat = queries.category_totals(month_start, month_end, 'Expense')
         if not expense_by_cat.empty:
             fig = px.pie(
-                values=expense_by_cat.values,
+                values=expense_by_cat.values / 100,
                 names=expense_by_cat.index,
                 hole=.3,
                 color_discrete_sequence=px.colors.sequential.RdBu
@@ -118,21 +121,11 @@ def display_dashboard(df: pd.DataFrame):
     # ---- Income vs. Expenses Trend ----
     with col2:
         st.subheader("Income vs. Expenses Trend")
-        if not df_month.empty:
-            df_trend = df_month.copy()
-            df_trend['Day'] = df_trend['Date'].dt.day
-
-            trend = (
-                df_trend
-                .groupby(['Day', 'Type'])['Amount']
-                .sum()
-                .reset_index()
-                .pivot(index='Day', columns='Type', values='Amount')
-                .fillna(0)
-                .reset_index()
-            )
-
+        if totals:
+            trend, _ = queries.trend(month_start, month_end)
             y_cols = [c for c in ['Income', 'Expense'] if c in trend.columns]
+            # The cached trend is shared with other sessions, so convert and add the column on a copy
+            trend = in_rupees(trend, y_cols).assign(Day=trend['Date'].dt.day)
 
             if y_cols:
                 fig = px.line(
@@ -154,64 +147,263 @@ def display_dashboard(df: pd.DataFrame):
 
     # --- Recent Transactions ---
     st.subheader("Recent Transactions")
-    st.dataframe(
-        df.sort_values("Date", ascending=False).head(5),
-        use_container_width=True,
-        hide_index=True
-    )
+    recent, _ = queries.page(page_size=5)
+    st.dataframe(in_rupees(recent, ["Amount"]), use_container_width=True, hide_index=True)
 
-def display_all_transactions(df: pd.DataFrame):
+def display_all_transactions(queries: DashboardQueries):
     st.header("All Recorded Transactions")
 
-    if df.empty:
+    if queries.empty:
         st.info("No transactions to display.")
         return
 
     # --- Filtering ---
     col1, col2, col3 = st.columns(3)
     with col1:
-        start_date = st.date_input("Start date", df['Date'].min().date())
+        start_date = st.date_input("Start date", queries.first_date)
     with col2:
-        end_date = st.date_input("End date", df['Date'].max().date())
+        end_date = st.date_input("End date", queries.last_date)
     with col3:
+        all_categories = queries.categories()
         categories = st.multiselect(
             "Filter by category",
-            df['Category'].unique(),
-            default=list(df['Category'].unique())
+            all_categories,
+            default=all_categories
         )
+    query = st.text_input("Search descriptions", placeholder="e.g. uber, metro card")
 
     if not categories:
         st.info("Please select at least one category.")
         return
 
-    filtered_df = df[
-        (df['Date'].dt.date >= start_date) &
-        (df['Date'].dt.date <= end_date) &
-        (df['Category'].isin(categories))
-    ]
+    if start_date <= end_date:
+        trend, bucket = queries.trend(start_date, end_date)
+        y_cols = [c for c in ['Income', 'Expense'] if c in trend.columns]
+        if y_cols:
+            st.subheader(f"Income vs. Expenses by {bucket}")
+            fig = px.line(
+                in_rupees(trend, y_cols),
+                x='Date',
+                y=y_cols,
+                color_discrete_map={
+                    'Income': SUCCESS_COLOR,
+                    'Expense': WARNING_COLOR
+                }
+            )
+            st.plotly_chart(fig, use_container_width=True)
+
+    selected = None if len(categories) == len(all_categories) else categories
+    if query.strip():
+        display_search_results(query, start_date, end_date, selected)
+        return
 
+    # Only the requested page is sliced out of the cached, date-sorted frame and sent to the browser
+    _, matches = queries.page(start_date, end_date, selected, page_size=PAGE_SIZE)
+    pages = max(1, -(-matches // PAGE_SIZE))
+    page = st.number_input("Page", min_value=1, max_value=pages, value=1, step=1)
+    rows, _ = queries.page(start_date, end_date, selected, page, PAGE_SIZE)
+    st.caption(f"{matches:,} transactions, page {page} of {pages}")
+    st.dataframe(in_rupees(rows, ["Amount"]), use_container_width=True, hide_index=True)
+
+def display_search_results(query, start_date, end_date, categories):
+    # Answered from the on-disk description index, not by scanning the frame
+    result = storage.search(query, start_date.isoformat(), end_date.isoformat(), category=categories, limit=SEARCH_LIMIT)
+    if not result.total:
+        st.info(f"No transactions match '{query}'.")
+        return
+    shown = len(result.transactions)
+    st.caption(
+        f"{result.total:,} matches" + (f", newest {shown:,} shown" if shown < result.total else "") + " · "
+        + ", ".join(f"{category} {n:,}" for category, n in sorted(result.categories.items(), key=lambda item: -item[1]))
+    )
     st.dataframe(
-        filtered_df.sort_values("Date", ascending=False),
+        pd.DataFrame({
+            "Date": pd.to_datetime([t.date for t in result.transactions]),
+            "Type": [t.type.title() for t in result.transactions],
+            "Category": [t.category for t in result.transactions],
+            "Description": [t.description for t in result.transactions],
+            "Amount": [t.amount / 100 for t in result.transactions],
+        }),
         use_container_width=True,
-        hide_index=True
+        hide_index=True,
     )
 
+def display_trends():
+    st.header("Trends")
+    engine = get_range_engine()
+    if engine.first is None:
+        st.info("No transactions to analyze.")
+        return
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        default_start = max(engine.first_date, engine.last_date - timedelta(days=364))
+        dates = st.date_input(
+            "Date range",
+            (default_start, engine.last_date),
+            min_value=engine.first_date,
+            max_value=engine.last_date,
+        )
+    with col2:
+        type = st.radio("Type", ["expense", "income"], format_func=str.title, horizontal=True)
+    with col3:
+        category = st.selectbox("Category", ["All"] + engine.categories(type))
+    if len(dates) != 2:
+        st.info("Please pick an end date.")
+        return
+    start, end = dates
+    category = None if category == "All" else category
+
+    # Every figure below is a prefix-sum lookup, so any range costs the same
+    total = engine.total(start, end, type, category)
+    previous = engine.total(shift_years(start, -1), shift_years(end, -1), type, category)
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Total in Range", f"₹{total/100:,.2f}")
+    col2.metric(
+        "Same Range Last Year",
+        f"₹{previous/100:,.2f}",
+        f"{(total - previous) / previous:+.1%}" if previous else None,
+        delta_color="inverse" if type == "expense" else "normal",
+    )
+    col3.metric("Rolling 12 Months", f"₹{engine.rolling_12_months(end, type, category)/100:,.2f}")
+
+    col1, col2 = st.columns(2)
+    with col1:
+        st.subheader("By Month")
+        monthly = pd.DataFrame(engine.monthly(start, end, type, category), columns=["Year", "Month", "Amount"])
+        monthly["Month"] = pd.to_datetime(monthly[["Year", "Month"]].assign(Day=1))
+        monthly["Amount"] = monthly["Amount"] / 100
+        st.plotly_chart(px.bar(monthly, x="Month", y="Amount"), use_container_width=True)
+    with col2:
+        st.subheader(f"Year to Date, up to {end.strftime('%d %b')}")
+        yearly = pd.DataFrame(engine.yearly(type, category, (end.month, end.day)), columns=["Year", "Amount"])
+        yearly["Amount"] = yearly["Amount"] / 100
+        st.plotly_chart(px.bar(yearly, x="Year", y="Amount"), use_container_width=True)
+
 def display_budget_analysis():
-    st.header("Budget Analysis (Coming Soon)")
-    st.info("This feature is under construction. You will be able to set and track your budgets here.")
+    st.header("Budget Analysis")
+    # Past months come out of the pipeline's cache; only the current month is recomputed
+    months = get_metrics_pipeline().months()
+    budgeted = [m for m in months if m.budgets]
+    if not budgeted:
+        st.info("No monthly budgets set yet. Set them in the CLI with Set Budget or `python main.py set-budgets`.")
+        return
+
+    by_month = {m.month: m for m in budgeted}
+    choice = st.selectbox("Month", list(reversed(by_month)))
+    selected = by_month[choice]
+    statuses = evaluate(selected.budgets, selected.spending, sorted(selected.budgets))
+
+    budget_total = sum(s.budget for s in statuses)
+    spent_total = sum(s.spent for s in statuses)
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Budgeted", f"₹{budget_total/100:,.2f}")
+    col2.metric("Spent", f"₹{spent_total/100:,.2f}")
+    col3.metric("Remaining", f"₹{(budget_total - spent_total)/100:,.2f}")
+    col4.metric("Over Budget", f"{len(selected.over_budget)} of {len(statuses)}")
+
+    col1, col2 = st.columns(2)
+    with col1:
+        st.subheader("Budget vs. Actual")
+        actual = pd.DataFrame({
+            "Category": [s.category for s in statuses],
+            "Budget": [s.budget / 100 for s in statuses],
+            "Spent": [s.spent / 100 for s in statuses],
+        })
+        fig = px.bar(
+            actual.melt(id_vars="Category", var_name="Series", value_name="Amount"),
+            x="Category",
+            y="Amount",
+            color="Series",
+            barmode="group",
+            color_discrete_map={"Budget": PRIMARY_COLOR, "Spent": SECONDARY_COLOR},
+        )
+        st.plotly_chart(fig, use_container_width=True)
+    with col2:
+        st.subheader("Categories")
+        st.dataframe(
+            pd.DataFrame({
+                "Category": [s.category for s in statuses],
+                "Budget": [s.budget / 100 for s in statuses],
+                "Spent": [s.spent / 100 for s in statuses],
+                "Remaining": [s.remaining / 100 for s in statuses],
+                "Used": [f"{s.utilization:.0f}%" for s in statuses],
+                "Status": [s.status for s in statuses],
+            }),
+            use_container_width=True,
+            hide_index=True,
+        )
+
+    st.subheader("Budget History")
+    history = pd.DataFrame({
+        "Month": pd.to_datetime([m.month for m in budgeted], format="%Y-%m"),
+        "Budgeted": [sum(m.budgets.values()) / 100 for m in budgeted],
+        "Spent": [sum(m.spending.get(c, 0) for c in m.budgets) / 100 for m in budgeted],
+    })
+    fig = px.line(
+        history,
+        x="Month",
+        y=["Budgeted", "Spent"],
+        markers=True,
+        color_discrete_map={"Budgeted": PRIMARY_COLOR, "Spent": SECONDARY_COLOR},
+    )
+    st.plotly_chart(fig, use_container_width=True)
 
 def display_financial_health():
-    st.header("Financial Health Score (Coming Soon)")
-    st.info("This feature is under construction. You will be able to see your financial health score here.")
+    st.header("Financial Health")
+    months = get_metrics_pipeline().months()
+    score = health_score(months)
+    if score is None:
+        st.info("The health score is based on complete months. Check back after your first full month.")
+        return
+
+    col1, col2 = st.columns([1, 2])
+    with col1:
+        st.metric(f"Health Score, last {HEALTH_WINDOW_MONTHS} months", f"{score.score}/100")
+    with col2:
+        for name, fraction in score.components.items():
+            st.progress(fraction, text=f"{name}: {fraction:.0%}")
+
+    # Only closed months go into the trends, the current one is still in progress
+    closed = months[:-1][-TREND_MONTHS:]
+    trend = pd.DataFrame({
+        "Month": pd.to_datetime([m.month for m in closed], format="%Y-%m"),
+        "Income": [m.income / 100 for m in closed],
+        "Expense": [m.expense / 100 for m in closed],
+        # A month without income has no savings rate and leaves a gap
+        "Savings Rate": pd.Series([m.savings_rate for m in closed], dtype="float64"),
+    })
+    trend["3-Month Average"] = trend["Savings Rate"].rolling(3, min_periods=1).mean()
+
+    col1, col2 = st.columns(2)
+    with col1:
+        st.subheader("Savings Rate (%)")
+        st.plotly_chart(px.line(trend, x="Month", y=["Savings Rate", "3-Month Average"]), use_container_width=True)
+    with col2:
+        st.subheader("Income vs. Expenses")
+        fig = px.bar(
+            trend,
+            x="Month",
+            y=["Income", "Expense"],
+            barmode="group",
+            color_discrete_map={"Income": SUCCESS_COLOR, "Expense": WARNING_COLOR},
+        )
+        st.plotly_chart(fig, use_container_width=True)
 
 # --- Main App ---
 def main():
     """Main function to run the Streamlit dashboard."""
     st.title("Finance Tracker Pro")
 
-    df = load_transactions()
+    instrumentation.reset()
+    try:
+        # Before reading the ledger version, so the data loaded includes what it adds
+        materialize_recurring(date.today())
+    except Exception as e:
+        st.warning(f"Recurring transactions were not added: {e}")
+    queries = load_queries(storage.ledger_version())
 
-    if df.empty:
+    if queries.empty:
         st.warning("No transactions found. Add some transactions in the CLI to see your dashboard.")
         return
 
@@ -219,17 +411,25 @@ def main():
     st.sidebar.title("Navigation")
     page = st.sidebar.radio(
         "Choose a page",
-        ["Dashboard", "All Transactions", "Budget Analysis", "Financial Health"]
+        ["Dashboard", "All Transactions", "Trends", "Budget Analysis", "Financial Health"]
     )
 
-    if page == "Dashboard":
-        display_dashboard(df)
-    elif page == "All Transactions":
-        display_all_transactions(df)
-    elif page == "Budget Analysis":
-        display_budget_analysis()
-    elif page == "Financial Health":
-        display_financial_health()
+    with stage(f"dashboard.render.{page}"):
+        if page == "Dashboard":
+            display_dashboard(queries)
+        elif page == "All Transactions":
+            display_all_transactions(queries)
+        elif page == "Trends":
+            display_trends()
+        elif page == "Budget Analysis":
+            display_budget_analysis()
+        elif page == "Financial Health":
+            display_financial_health()
+
+    if instrumentation.ENABLED:
+        # Timings of this rerun only
+        with st.sidebar.expander("Profile"):
+            st.dataframe(pd.DataFrame(instrumentation.report()), hide_index=True)
 
 if __name__ == "__main__":
     main()
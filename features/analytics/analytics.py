@@ -2,39 +2,27 @@ from datetime import datetime
 from rich.panel import Panel
 from rich.console import Console
 from rich.table import Table
+from features.instrumentation.instrumentation import instrumented, stage
+from features.storage.storage import has_transactions, month_totals
 
 console = Console()
 
+@instrumented("analyze_spending")
 def analyze_spending():
     """Analyzes spending patterns for the current month."""
     try:
-        # Read transactions
-        transactions = []
-        try:
-            with open("database/transactions.txt", "r") as f:
-                transactions = f.readlines()
-        except FileNotFoundError:
-            console.print(Panel("[bold yellow]No transactions found.[/bold yellow]", title="Spending Analysis"))
-            return
-
-        if not transactions:
+        if not has_transactions():
             console.print(Panel("[bold yellow]No transactions found.[/bold yellow]", title="Spending Analysis"))
             return
 
         # Filter for current month's expenses
         current_month = datetime.now().month
         current_year = datetime.now().year
-        monthly_expenses = {}
-
-        for transaction in transactions:
-            date_str, type, category, _, amount = transaction.strip().split(',')
-            date = datetime.strptime(date_str, "%Y-%m-%d")
-            if date.month == current_month and date.year == current_year and type == "expense":
-                amount = int(amount)
-                if category in monthly_expenses:
-                    monthly_expenses[category] += amount
-                else:
-                    monthly_expenses[category] = amount
+        monthly_expenses = {
+            category: amount
+            for (type, category), amount in month_totals(current_year, current_month).items()
+            if type == "expense"
+        }
         
         if not monthly_expenses:
             console.print(Panel("[bold yellow]No expenses found for the current month.[/bold yellow]", title="Spending Analysis"))
@@ -55,7 +43,8 @@ def analyze_spending():
             percentage = (amount / total_spent) * 100
             table.add_row(category, f"{amount/100:.2f}", f"{percentage:.2f}%")
 
-        console.print(table)
+        with stage("render"):
+            console.print(table)
 
         # Top 3 spending categories
         top_3 = sorted_expenses[:3]
@@ -68,19 +57,11 @@ def analyze_spending():
     except Exception as e:
         console.print(Panel(f"[bold red]An error occurred: {e}[/bold red]", title="Error"))
 
+@instrumented("analyze_income")
 def analyze_income():
     """Analyzes income for the current month."""
     try:
-        # Read transactions
-        transactions = []
-        try:
-            with open("database/transactions.txt", "r") as f:
-                transactions = f.readlines()
-        except FileNotFoundError:
-            console.print(Panel("[bold yellow]No transactions found.[/bold yellow]", title="Income Analysis"))
-            return
-
-        if not transactions:
+        if not has_transactions():
             console.print(Panel("[bold yellow]No transactions found.[/bold yellow]", title="Income Analysis"))
             return
 
@@ -90,24 +71,16 @@ def analyze_income():
         prev_month = current_month - 1 if current_month > 1 else 12
         prev_year = current_year if current_month > 1 else current_year - 1
         
-        current_month_income = {}
-        prev_month_income = {}
-
-        for transaction in transactions:
-            date_str, type, category, _, amount = transaction.strip().split(',')
-            date = datetime.strptime(date_str, "%Y-%m-%d")
-            amount = int(amount)
-            if type == "income":
-                if date.month == current_month and date.year == current_year:
-                    if category in current_month_income:
-                        current_month_income[category] += amount
-                    else:
-                        current_month_income[category] = amount
-                elif date.month == prev_month and date.year == prev_year:
-                    if category in prev_month_income:
-                        prev_month_income[category] += amount
-                    else:
-                        prev_month_income[category] = amount
+        current_month_income = {
+            category: amount
+            for (type, category), amount in month_totals(current_year, current_month).items()
+            if type == "income"
+        }
+        prev_month_income = {
+            category: amount
+            for (type, category), amount in month_totals(prev_year, prev_month).items()
+            if type == "income"
+        }
 
         if not current_month_income:
             console.print(Panel("[bold yellow]No income found for the current month.[/bold yellow]", title="Income Analysis"))
@@ -123,7 +96,8 @@ def analyze_income():
         for source, amount in current_month_income.items():
             table.add_row(source, f"{amount/100:.2f}")
 
-        console.print(table)
+        with stage("render"):
+            console.print(table)
 
         # Comparison with last month
         total_prev_income = sum(prev_month_income.values())
@@ -145,3 +119,59 @@ def analyze_income():
 
     except Exception as e:
         console.print(Panel(f"[bold red]An error occurred: {e}[/bold red]", title="Error"))
+
+@instrumented("analyze_range")
+def analyze_range(start, end, category=None):
+    """Analyzes totals per category over any date range, compared with the same range a year earlier."""
+    from features.analytics.range_engine import get_range_engine, shift_years
+
+    try:
+        if not has_transactions():
+            console.print(Panel("[bold yellow]No transactions found.[/bold yellow]", title="Range Analysis"))
+            return
+        if start > end:
+            console.print(Panel("[bold red]The start date is after the end date.[/bold red]", title="Error"))
+            return
+
+        engine = get_range_engine()
+        previous_start, previous_end = shift_years(start, -1), shift_years(end, -1)
+
+        table = Table(title=f"Totals {start.isoformat()} to {end.isoformat()}")
+        table.add_column("Type", style="magenta")
+        table.add_column("Category", style="cyan")
+        table.add_column("Amount", justify="right", style="green")
+        table.add_column("Year Before", justify="right")
+        table.add_column("Change", justify="right", style="yellow")
+
+        totals = engine.category_totals(start, end)
+        rows = [
+            (type, name) for type, name in sorted(totals, key=lambda key: (key[0], -totals[key]))
+            if category is None or name == category
+        ]
+        if not rows:
+            console.print(Panel("[bold yellow]No transactions found in this range.[/bold yellow]", title="Range Analysis"))
+            return
+
+        for type, name in rows:
+            amount = totals[(type, name)]
+            previous = engine.total(previous_start, previous_end, type, name)
+            change = f"{(amount - previous) / previous * 100:+.1f}%" if previous else "-"
+            table.add_row(type, name, f"{amount/100:.2f}", f"{previous/100:.2f}", change)
+
+        with stage("render"):
+            console.print(table)
+
+        # Rolling 12 months up to the end of the range
+        income = engine.rolling_12_months(end, "income")
+        expense = engine.rolling_12_months(end, "expense")
+        net = income - expense
+        net_style = "green" if net >= 0 else "red"
+        console.print(Panel(
+            f"[green]Income: {income/100:.2f}[/green]\n"
+            f"[red]Expenses: {expense/100:.2f}[/red]\n"
+            f"[{net_style}]Net: {net/100:.2f}[/{net_style}]",
+            title=f"12 Months to {end.isoformat()}"
+        ))
+
+    except Exception as e:
+        console.print(Panel(f"[bold red]An error occurred: {e}[/bold red]", title="Error"))
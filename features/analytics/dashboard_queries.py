@@ -0,0 +1,137 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from features.instrumentation.instrumentation import count, stage
+
+# Longest series a trend chart is sent; longer ranges are summed into weeks, months or years
+MAX_TREND_POINTS = 400
+TREND_BUCKETS = [(None, "Day"), ("W-SUN", "Week"), ("M", "Month"), ("Y", "Year")]
+PAGE_SIZE = 50
+CACHED_QUERIES = 128
+
+class DashboardQueries:
+    """Answers the dashboard's questions about one transactions DataFrame.
+
+    The frame is sorted newest first once, so a date range is a binary search
+    away, and the daily income/expense totals are grouped once. Category
+    splits, trends and filtered row positions are cached per query, so a
+    Streamlit rerun that asks the same thing again does no pandas work. One
+    instance is shared by every session until the ledger changes.
+
+    Amounts go in and come out in paisa, exact int64 sums; the dashboard
+    converts them to rupees only when it displays them.
+    """
+
+    def __init__(self, frame):
+        with stage("dashboard_queries.build"):
+            dates = frame["Date"].to_numpy(dtype="datetime64[D]")
+            # Reversing a stable ascending sort keeps the latest entry of a day on top
+            order = np.argsort(dates, kind="stable")[::-1]
+            self.frame = frame.iloc[order].reset_index(drop=True)
+            # Negated day numbers ascend as the rows go back in time
+            self._keys = -dates[order].astype(np.int64)
+            self.daily = (
+                frame.groupby(["Date", "Type"], observed=True)["Amount"]
+                .sum()
+                .unstack("Type", fill_value=0)
+                .sort_index()
+            )
+            count(rows=len(frame))
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def empty(self):
+        return self.frame.empty
+
+    @property
+    def first_date(self):
+        return self.frame["Date"].iloc[-1].date()
+
+    @property
+    def last_date(self):
+        return self.frame["Date"].iloc[0].date()
+
+    def categories(self):
+        return list(self.frame["Category"].cat.categories)
+
+    def _cached(self, key, compute):
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+        value = compute()
+        with self._lock:
+            self._cache[key] = value
+            if len(self._cache) > CACHED_QUERIES:
+                self._cache.popitem(last=False)
+        return value
+
+    def _range(self, start, end):
+        """Returns the (lo, hi) row slice of the sorted frame dated start..end inclusive."""
+        lo = 0 if end is None else np.searchsorted(self._keys, -_day_number(end), "left")
+        hi = len(self._keys) if start is None else np.searchsorted(self._keys, -_day_number(start), "right")
+        return int(lo), int(hi)
+
+    def totals(self, start, end):
+        """Returns {type: amount in paisa} from start to end inclusive."""
+        def compute():
+            days = self.daily.loc[pd.Timestamp(start):pd.Timestamp(end)]
+            return {type: int(days[type].sum()) for type in days.columns}
+        return self._cached(("totals", start, end), compute)
+
+    def category_totals(self, start, end, type="Expense"):
+        """Returns a Series of the amount in paisa per category of one type from start to end inclusive."""
+        def compute():
+            lo, hi = self._range(start, end)
+            rows = self.frame.iloc[lo:hi]
+            rows = rows[rows["Type"] == type]
+            return rows.groupby("Category", observed=True)["Amount"].sum()
+        return self._cached(("categories", start, end, type), compute)
+
+    def trend(self, start, end, max_points=MAX_TREND_POINTS):
+        """Returns (DataFrame of Date and one column per type, bucket name) from start to end inclusive.
+
+        Every day of the range is present, zero-filled. Ranges longer than
+        max_points days are summed into the finest of weeks, months or years
+        that fits.
+        """
+        def compute():
+            days = self.daily.reindex(pd.date_range(start, end, freq="D"), fill_value=0)
+            for period, bucket in TREND_BUCKETS:
+                if period is None:
+                    series = days
+                else:
+                    # Each bucket is labelled with its first day, weeks starting on Monday
+                    series = days.groupby(days.index.to_period(period)).sum()
+                    series.index = series.index.start_time
+                if len(series) <= max_points:
+                    break
+            return series.rename_axis("Date").reset_index(), bucket
+        return self._cached(("trend", start, end, max_points), compute)
+
+    def page(self, start=None, end=None, categories=None, page=1, page_size=PAGE_SIZE):
+        """Returns (rows of one page newest first, number of matching rows).
+
+        Only the positions of the matching rows are cached, so paging through
+        a filter copies nothing but the page itself.
+        """
+        def compute():
+            lo, hi = self._range(start, end)
+            if categories is None:
+                return lo, hi, None
+            in_range = self.frame["Category"].iloc[lo:hi]
+            return lo, hi, lo + np.flatnonzero(in_range.isin(categories).to_numpy())
+        lo, hi, positions = self._cached(
+            ("page", start, end, None if categories is None else tuple(sorted(categories))), compute
+        )
+        first = (page - 1) * page_size
+        if positions is None:
+            return self.frame.iloc[lo + first:min(hi, lo + first + page_size)], hi - lo
+        return self.frame.iloc[positions[first:first + page_size]], len(positions)
+
+def _day_number(day):
+    return np.datetime64(day, "D").astype(np.int64)
@@ -0,0 +1,138 @@
+import statistics
+from collections import namedtuple
+from datetime import date
+
+from features.instrumentation.instrumentation import count, stage
+from features.storage.storage import BUDGETS_FILE, TRANSACTIONS_FILE, monthly_totals, read_budgets
+
+MonthMetrics = namedtuple("MonthMetrics", [
+    "month",         # YYYY-MM
+    "income",        # paisa
+    "expense",       # paisa
+    "savings",       # income - expense, paisa
+    "savings_rate",  # percent of income, None for a month without income
+    "spending",      # {category: paisa} of expenses
+    "budgets",       # {category: paisa} of the monthly budgets in effect
+    "over_budget",   # {category: paisa} spent beyond the budget
+])
+
+# A score from 0 to 100 and {component: fraction from 0 to 1} behind it
+HealthScore = namedtuple("HealthScore", ["score", "components"])
+
+# Closed months the health score looks back over
+HEALTH_WINDOW_MONTHS = 6
+# Savings rate in percent that earns full marks
+TARGET_SAVINGS_RATE = 20
+# Coefficient of variation of monthly spending that earns no stability marks
+UNSTABLE_SPENDING = 0.5
+
+def compute_month(month, totals, budgets):
+    """Returns the MonthMetrics of one month from its {(type, category): amount} totals and budgets."""
+    income = 0
+    spending = {}
+    for (type, category), amount in totals.items():
+        if type == "income":
+            income += amount
+        elif type == "expense":
+            spending[category] = spending.get(category, 0) + amount
+    expense = sum(spending.values())
+    return MonthMetrics(
+        month,
+        income,
+        expense,
+        income - expense,
+        (income - expense) / income * 100 if income > 0 else None,
+        spending,
+        budgets,
+        {
+            category: spending.get(category, 0) - budget
+            for category, budget in budgets.items()
+            if spending.get(category, 0) > budget
+        },
+    )
+
+class MetricsPipeline:
+    """Per-month income, spending, savings and budget figures of a ledger.
+
+    The transaction side comes from the monthly rollup, which the ledger index
+    maintains in its single pass over the ledger, and the budget side from the
+    monthly budgets in effect in each month. The metrics of a closed month are
+    kept and handed back as they are while its totals and budgets are
+    unchanged, so only the current month, or a past month that received a
+    backdated transaction or budget, is computed again.
+    """
+
+    def __init__(self, path=TRANSACTIONS_FILE, budgets_path=BUDGETS_FILE):
+        self.path = path
+        self.budgets_path = budgets_path
+        self.closed = {}  # YYYY-MM -> (totals, budgets, MonthMetrics)
+
+    def months(self, today=None):
+        """Returns MonthMetrics for every month from the first ledger month to the current one, oldest first."""
+        today = today or date.today()
+        current = (today.year, today.month)
+        with stage("metrics.months"):
+            totals = monthly_totals(self.path)
+            year, month = min(min(totals, default=current), current)
+            result = []
+            computed = 0
+            while (year, month) <= current:
+                key = f"{year:04d}-{month:02d}"
+                month_totals = totals.get((year, month), {})
+                budgets = read_budgets("monthly", self.budgets_path, key)
+                cached = self.closed.get(key)
+                if cached and cached[0] == month_totals and cached[1] == budgets:
+                    metrics = cached[2]
+                else:
+                    metrics = compute_month(key, month_totals, budgets)
+                    computed += 1
+                    if (year, month) < current:
+                        self.closed[key] = (month_totals, budgets, metrics)
+                result.append(metrics)
+                year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+            count(rows=computed)
+        return result
+
+def health_score(months, window=HEALTH_WINDOW_MONTHS):
+    """Scores financial health from the closed months at the end of a MonthMetrics list.
+
+    The list is expected to end with the current month, which is left out
+    because it is still in progress. Each component is a fraction from 0 to 1:
+
+    - Savings: average savings rate, full at TARGET_SAVINGS_RATE percent
+    - Budgets: share of budgeted categories kept within budget, if any budgets were set
+    - Stability: how little monthly spending varies
+    - Income: share of months with any income
+
+    The score is their average scaled to 100. Returns None without a closed month.
+    """
+    closed = months[:-1][-window:]
+    if not closed:
+        return None
+    components = {}
+
+    rates = [m.savings_rate for m in closed if m.savings_rate is not None]
+    average_rate = statistics.fmean(rates) if rates else 0
+    components["Savings"] = min(max(average_rate / TARGET_SAVINGS_RATE, 0), 1)
+
+    budgeted = sum(len(m.budgets) for m in closed)
+    if budgeted:
+        components["Budgets"] = 1 - sum(len(m.over_budget) for m in closed) / budgeted
+
+    expenses = [m.expense for m in closed]
+    mean = statistics.fmean(expenses)
+    variation = statistics.pstdev(expenses) / mean if mean else 0
+    components["Stability"] = max(1 - variation / UNSTABLE_SPENDING, 0)
+
+    components["Income"] = sum(1 for m in closed if m.income > 0) / len(closed)
+
+    return HealthScore(round(statistics.fmean(components.values()) * 100), components)
+
+_pipelines = {}
+
+def get_metrics_pipeline(path=TRANSACTIONS_FILE, budgets_path=BUDGETS_FILE):
+    """Returns the shared MetricsPipeline of a ledger and budgets file."""
+    pipeline = _pipelines.get((path, budgets_path))
+    if pipeline is None:
+        pipeline = _pipelines[(path, budgets_path)] = MetricsPipeline(path, budgets_path)
+    return pipeline
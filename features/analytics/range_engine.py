@@ -0,0 +1,141 @@
+from array import array
+from datetime import date, timedelta
+from itertools import accumulate
+
+from features.instrumentation.instrumentation import count, stage
+from features.storage.codec import date_ordinal
+from features.storage.storage import TRANSACTIONS_FILE, daily_totals, ledger_version
+
+class RangeEngine:
+    """Answers range totals over the whole ledger in constant time.
+
+    For every (type, category), and for every type as a whole, it keeps the
+    cumulative sum of the daily totals from the first to the last ledger day,
+    so the total of any inclusive date range is prefix[end] - prefix[start].
+    Monthly and yearly series are a handful of such lookups each.
+    """
+
+    def __init__(self, daily):
+        """daily maps (YYYY-MM-DD, type, category) to an amount in paisa."""
+        self.series = {}  # (type, category or None) -> array of cumulative sums
+        if not daily:
+            self.first = self.last = None
+            return
+        days = {key: date_ordinal(key[0]) for key in daily}
+        self.first = min(days.values())
+        self.last = max(days.values())
+        length = self.last - self.first + 1
+
+        per_day = {}
+        for (day, type, category), amount in daily.items():
+            offset = days[(day, type, category)] - self.first
+            for key in ((type, category), (type, None)):
+                values = per_day.get(key)
+                if values is None:
+                    values = per_day[key] = array("q", bytes(8 * length))
+                values[offset] += amount
+        for key, values in per_day.items():
+            # prefix[i] is the sum of the first i days
+            self.series[key] = array("q", accumulate(values, initial=0))
+
+    @property
+    def first_date(self):
+        return date.fromordinal(self.first) if self.first is not None else None
+
+    @property
+    def last_date(self):
+        return date.fromordinal(self.last) if self.last is not None else None
+
+    def types(self):
+        return sorted({type for type, _ in self.series})
+
+    def categories(self, type=None):
+        return sorted({
+            category for series_type, category in self.series
+            if category is not None and (type is None or series_type == type)
+        })
+
+    def total(self, start, end, type, category=None):
+        """Returns the total of one type, optionally one category, from start to end inclusive."""
+        prefix = self.series.get((type, category))
+        if prefix is None:
+            return 0
+        first = max(start.toordinal(), self.first) - self.first
+        last = min(end.toordinal(), self.last) - self.first
+        if first > last:
+            return 0
+        return prefix[last + 1] - prefix[first]
+
+    def category_totals(self, start, end, type=None):
+        """Returns {(type, category): amount} from start to end inclusive, leaving out zeros."""
+        totals = {}
+        for series_type, category in self.series:
+            if category is None or (type is not None and series_type != type):
+                continue
+            amount = self.total(start, end, series_type, category)
+            if amount:
+                totals[(series_type, category)] = amount
+        return totals
+
+    def monthly(self, start, end, type, category=None):
+        """Returns [(year, month, amount)] for every month touching start..end."""
+        result = []
+        year, month = start.year, start.month
+        while (year, month) <= (end.year, end.month):
+            next_year, next_month = (year + 1, 1) if month == 12 else (year, month + 1)
+            month_start = max(start, date(year, month, 1))
+            month_end = min(end, date(next_year, next_month, 1) - timedelta(days=1))
+            result.append((year, month, self.total(month_start, month_end, type, category)))
+            year, month = next_year, next_month
+        return result
+
+    def yearly(self, type, category=None, month_day_end=None):
+        """Returns [(year, amount)] for every ledger year, optionally only up to a (month, day) in each year.
+
+        Passing today's (month, day) gives year-to-date figures that compare fairly year over year.
+        """
+        if self.first is None:
+            return []
+        result = []
+        for year in range(self.first_date.year, self.last_date.year + 1):
+            end = date(year, 12, 31)
+            if month_day_end:
+                month, day = month_day_end
+                end = _clamped_date(year, month, day)
+            result.append((year, self.total(date(year, 1, 1), end, type, category)))
+        return result
+
+    def rolling_12_months(self, end, type, category=None):
+        """Returns the total of the twelve months ending on end, inclusive."""
+        return self.total(_months_before(end, 12) + timedelta(days=1), end, type, category)
+
+def _clamped_date(year, month, day):
+    # Feb 29 in a year that doesn't have one becomes Feb 28
+    while True:
+        try:
+            return date(year, month, day)
+        except ValueError:
+            day -= 1
+
+def _months_before(day, months):
+    month_index = day.year * 12 + day.month - 1 - months
+    return _clamped_date(month_index // 12, month_index % 12 + 1, day.day)
+
+def shift_years(day, years):
+    """Returns the same calendar day a number of years away, clamping Feb 29."""
+    return _clamped_date(day.year + years, day.month, day.day)
+
+_engines = {}
+
+def get_range_engine(path=TRANSACTIONS_FILE):
+    """Returns the RangeEngine of a ledger, rebuilding it only after the ledger changed."""
+    version = ledger_version(path)
+    cached = _engines.get(path)
+    if cached and cached[0] == version:
+        return cached[1]
+    with stage("analytics.range_engine_build"):
+        daily = daily_totals(path)
+        engine = RangeEngine(daily)
+        count(rows=len(daily))
+    _engines[path] = (version, engine)
+    return engine
@@ -0,0 +1,64 @@
+from collections import namedtuple
+from datetime import date, timedelta
+
+from features.storage.storage import TRANSACTIONS_FILE, range_totals
+
+PERIODS = ["weekly", "monthly", "yearly"]
+
+# Utilization at or above which a budget is flagged, in percent
+WARNING_UTILIZATION = 70
+
+BudgetStatus = namedtuple("BudgetStatus", ["category", "budget", "spent", "remaining", "utilization", "status"])
+
+def period_range(period, day):
+    """Returns the (start, end) dates, inclusive, of the week (Monday first), month or year containing day."""
+    if period == "weekly":
+        start = day - timedelta(days=day.weekday())
+        return start, start + timedelta(days=6)
+    if period == "monthly":
+        start = day.replace(day=1)
+        return start, date(start.year + start.month // 12, start.month % 12 + 1, 1) - timedelta(days=1)
+    if period == "yearly":
+        return date(day.year, 1, 1), date(day.year, 12, 31)
+    raise ValueError(f"Budget period must be one of: {', '.join(PERIODS)}.")
+
+def status_for(utilization):
+    """Returns "OK", "Warning" or "Over" for a utilization in percent."""
+    if utilization < WARNING_UTILIZATION:
+        return "OK"
+    if utilization <= 100:
+        return "Warning"
+    return "Over"
+
+def evaluate(budgets, expenses, categories):
+    """Returns a BudgetStatus per category from budgets and expenses, both {category: paisa}."""
+    statuses = []
+    for category in categories:
+        budget = budgets.get(category, 0)
+        spent = expenses.get(category, 0)
+        utilization = spent / budget * 100 if budget > 0 else 0
+        statuses.append(BudgetStatus(category, budget, spent, budget - spent, utilization, status_for(utilization)))
+    return statuses
+
+def evaluate_periods(budgets_by_period, categories, day=None, path=TRANSACTIONS_FILE):
+    """Evaluates the budgets of several periods, returning {period: (start, end, [BudgetStatus])}.
+
+    Spending comes from storage.range_totals, so whole months are read from the
+    monthly rollup and only the rows of a partly covered month are decoded. The
+    ledger index and rollup are shared by every period, so asking for weekly,
+    monthly and yearly budgets together costs no extra scan.
+    """
+    day = day or date.today()
+    results = {}
+    for period in PERIODS:
+        budgets = budgets_by_period.get(period)
+        if not budgets:
+            continue
+        start, end = period_range(period, day)
+        expenses = {
+            category: amount
+            for (type, category), amount in range_totals(start, end, path).items()
+            if type == "expense"
+        }
+        results[period] = (start, end, evaluate(budgets, expenses, categories))
+    return results
@@ -0,0 +1,164 @@
+import csv
+import os
+import time
+from datetime import datetime
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+
+from rich.console import Console
+from rich.panel import Panel
+
+from features.instrumentation.instrumentation import count, instrumented
+from features.storage.storage import Transaction, append_transactions
+from features.transactions.transactions import EXPENSE_CATEGORIES, INCOME_CATEGORIES
+
+IMPORT_FIELDS = ["date", "type", "category", "description", "amount"]
+OPTIONAL_FIELDS = ["type", "category", "description"]
+IMPORT_BATCH_SIZE = 10_000
+
+TYPE_ALIASES = {
+    "expense": "expense", "debit": "expense", "dr": "expense", "withdrawal": "expense",
+    "income": "income", "credit": "income", "cr": "income", "deposit": "income",
+}
+
+console = Console()
+
+def parse_amount(text):
+    """Converts a statement amount such as '1,234.50', '-20' or '(20.00)' to signed paisa."""
+    text = text.strip().replace(",", "")
+    negative = text.startswith("(") and text.endswith(")")
+    if negative:
+        text = text[1:-1]
+    try:
+        amount = Decimal(text)
+    except InvalidOperation:
+        return None
+    if not amount.is_finite():
+        return None
+    paisa = int((amount * 100).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+    return -paisa if negative else paisa
+
+def _convert_row(row, columns, date_format, dates):
+    """Maps one CSV row to a Transaction, or returns None if it fails validation."""
+    try:
+        date_text = row[columns["date"]].strip()
+        date_str = dates.get(date_text)
+        if date_str is None:
+            # Statements repeat the same few dates, so each one is parsed once
+            date_str = dates[date_text] = datetime.strptime(date_text, date_format).strftime("%Y-%m-%d")
+        amount = parse_amount(row[columns["amount"]])
+    except (KeyError, ValueError, AttributeError):
+        return None
+    if not amount:
+        return None
+
+    if columns.get("type"):
+        type = TYPE_ALIASES.get((row.get(columns["type"]) or "").strip().lower())
+        if type is None:
+            return None
+        amount = abs(amount)
+    else:
+        # Without a type column, negative amounts are debits
+        type = "expense" if amount < 0 else "income"
+        amount = abs(amount)
+
+    categories = EXPENSE_CATEGORIES if type == "expense" else INCOME_CATEGORIES
+    category = (row.get(columns["category"]) or "").strip() if columns.get("category") else ""
+    if category not in categories:
+        category = "Other"
+    description = (row.get(columns["description"]) or "").strip() if columns.get("description") else ""
+
+    return Transaction(date_str, type, category, description or "Imported", amount)
+
+@instrumented("import_statement")
+def import_statement(csv_path, columns, date_format="%Y-%m-%d", batch_size=IMPORT_BATCH_SIZE, on_batch=None):
+    """Streams a CSV statement into the ledger in batches.
+
+    columns maps each of IMPORT_FIELDS to a CSV header; type, category and
+    description are optional. Only one batch is held in memory at a time.
+    Returns a dict with imported/failed counts, seconds and rows_per_second.
+    """
+    stats = {"imported": 0, "failed": 0}
+    start = time.perf_counter()
+    dates = {}
+
+    def flush(batch):
+        append_transactions(batch)
+        stats["imported"] += len(batch)
+        if on_batch:
+            on_batch(stats)
+
+    with open(csv_path, "r", newline="", encoding="utf-8-sig") as f:
+        batch = []
+        for row in csv.DictReader(f):
+            transaction = _convert_row(row, columns, date_format, dates)
+            if transaction is None:
+                stats["failed"] += 1
+                continue
+            batch.append(transaction)
+            if len(batch) >= batch_size:
+                flush(batch)
+                batch = []
+        if batch:
+            flush(batch)
+
+    count(rows=stats["imported"] + stats["failed"], bytes=os.path.getsize(csv_path))
+    stats["seconds"] = time.perf_counter() - start
+    stats["rows_per_second"] = stats["imported"] / stats["seconds"] if stats["seconds"] else 0
+    return stats
+
+def import_transactions():
+    """Imports transactions from a CSV file or bank statement."""
+    import questionary  # loaded lazily, batch commands never prompt
+
+    try:
+        csv_path = questionary.text("Enter the path of the CSV file:", qmark="📂").ask()
+        if not csv_path:
+            return
+
+        try:
+            with open(csv_path, "r", newline="", encoding="utf-8-sig") as f:
+                headers = next(csv.reader(f), [])
+        except FileNotFoundError:
+            console.print(Panel(f"[bold red]File '{csv_path}' not found.[/bold red]", title="Error"))
+            return
+        if not headers:
+            console.print(Panel("[bold red]The file has no header row.[/bold red]", title="Error"))
+            return
+
+        columns = {}
+        for field in IMPORT_FIELDS:
+            choices = headers + ["(none)"] if field in OPTIONAL_FIELDS else headers
+            default = next((h for h in headers if h.strip().lower() == field), None)
+            column = questionary.select(
+                f"Which column holds the {field}?",
+                choices=choices,
+                default=default,
+                qmark="🏷️"
+            ).ask()
+            if column is None:
+                return
+            if column != "(none)":
+                columns[field] = column
+
+        date_format = questionary.text("Enter the date format used in the file:", default="%Y-%m-%d", qmark="📅").ask()
+        if not date_format:
+            return
+
+        stats = import_statement(
+            csv_path,
+            columns,
+            date_format,
+            on_batch=lambda stats: console.print(f"[cyan]Imported {stats['imported']} rows...[/cyan]"),
+        )
+
+        console.print(Panel(
+            f"[green]Imported: {stats['imported']}[/green]\n"
+            f"[red]Failed: {stats['failed']}[/red]\n"
+            f"Time: {stats['seconds']:.2f}s ({stats['rows_per_second']:,.0f} rows/s)",
+            title="Import Summary"
+        ))
+
+    except KeyboardInterrupt:
+        console.print("\n[bold yellow]Operation cancelled.[/bold yellow]")
+    except Exception as e:
+        console.print(Panel(f"[bold red]An error occurred: {e}[/bold red]", title="Error"))
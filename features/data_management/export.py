@@ -0,0 +1,112 @@
+import csv
+import json
+import os
+from itertools import islice
+
+from features.instrumentation.instrumentation import count, instrumented
+from features.storage.codec import month_key
+from features.storage.storage import iter_filtered
+
+# Kept apart from data_management.py, which loads rich and the prompts, so
+# `python main.py export` starts fast.
+
+EXPORT_FORMATS = ["csv", "jsonl", "parquet"]
+EXPORT_FIELDS = ["Date", "Type", "Category", "Description", "Amount"]
+# Rows converted and written at a time
+EXPORT_CHUNK_ROWS = 10_000
+
+def format_for(path):
+    """Guesses the export format from a file name, defaulting to CSV."""
+    extension = os.path.splitext(path or "")[1].lower()
+    if extension == ".parquet":
+        return "parquet"
+    if extension in (".jsonl", ".ndjson"):
+        return "jsonl"
+    return "csv"
+
+def _amount(paisa):
+    return f"{paisa/100:.2f}"
+
+def _write_csv(output, transactions, chunk_rows):
+    writer = csv.writer(output)
+    writer.writerow(EXPORT_FIELDS)
+    rows = 0
+    while chunk := list(islice(transactions, chunk_rows)):
+        writer.writerows([date, type, category, description, _amount(amount)] for date, type, category, description, amount in chunk)
+        rows += len(chunk)
+    return rows
+
+def _write_jsonl(output, transactions, chunk_rows):
+    rows = 0
+    while chunk := list(islice(transactions, chunk_rows)):
+        # The amount goes out as a JSON number with exactly two decimals
+        output.writelines(
+            f'{{"Date": "{date}", "Type": {json.dumps(type)}, "Category": {json.dumps(category)}, '
+            f'"Description": {json.dumps(description)}, "Amount": {_amount(amount)}}}\n'
+            for date, type, category, description, amount in chunk
+        )
+        rows += len(chunk)
+    return rows
+
+def _write_parquet(output, transactions, chunk_rows):
+    # pyarrow comes with streamlit; imported lazily so the other formats work without it,
+    # and decimal with it, as the other formats format paisa directly
+    from decimal import Decimal
+
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([
+        ("Date", pa.date32()),
+        ("Type", pa.string()),
+        ("Category", pa.string()),
+        ("Description", pa.string()),
+        ("Amount", pa.decimal128(18, 2)),
+    ])
+    cents = Decimal("0.01")
+    rows = 0
+    with pq.ParquetWriter(output, schema) as writer:
+        chunk = []
+        chunk_month = None
+
+        def flush():
+            columns = list(zip(*chunk))
+            writer.write_table(pa.table([
+                pa.array(columns[0]).cast(pa.date32()),
+                pa.array(columns[1], pa.string()),
+                pa.array(columns[2], pa.string()),
+                pa.array(columns[3], pa.string()),
+                pa.array([Decimal(amount) * cents for amount in columns[4]], pa.decimal128(18, 2)),
+            ], schema=schema))
+            chunk.clear()
+
+        for transaction in transactions:
+            month = month_key(transaction.date)
+            # A row group never spans months, so readers can skip months by their statistics;
+            # an append-ordered ledger gets one group per month
+            if chunk and (month != chunk_month or len(chunk) >= chunk_rows):
+                flush()
+            chunk_month = month
+            chunk.append(transaction)
+            rows += 1
+        if chunk:
+            flush()
+    return rows
+
+WRITERS = {"csv": _write_csv, "jsonl": _write_jsonl, "parquet": _write_parquet}
+
+@instrumented("export_transactions")
+def export_transactions(output, format="csv", start=None, end=None, type=None, categories=None, chunk_rows=EXPORT_CHUNK_ROWS):
+    """Streams transactions, in ledger order, to an open file. Returns the number of rows written.
+
+    CSV and JSON Lines need a text file opened with newline="", Parquet a
+    binary one. The date range (YYYY-MM-DD, inclusive), type and categories
+    are handed to the ledger reader, which skips archived shards and, on
+    SQLite, rows they rule out. Rows are converted chunk_rows at a time, so
+    memory stays flat whatever the size of the ledger.
+    """
+    if format not in WRITERS:
+        raise ValueError(f"Export format must be one of: {', '.join(EXPORT_FORMATS)}.")
+    rows = WRITERS[format](output, iter_filtered(start, end, type, categories or None), chunk_rows)
+    count(rows=rows)
+    return rows
@@ -0,0 +1,149 @@
+import atexit
+import functools
+import os
+import sys
+import time
+from contextlib import nullcontext
+
+# Opt-in timing of the hot paths. Set FINANCE_TRACKER_PROFILE (or pass
+# `main.py --profile MODE`) to one of:
+#
+#     summary   print a table of stages to stderr when the process exits
+#     json      also write the stages to FINANCE_TRACKER_PROFILE_OUTPUT (default profile.json)
+#     cprofile  also run under cProfile and write the stats to FINANCE_TRACKER_PROFILE_OUTPUT
+#               (default profile.prof, view with `python -m pstats profile.prof`)
+#
+# Stage times are inclusive of nested stages. When disabled, stage() hands
+# back a shared no-op context manager and count() returns immediately.
+
+MODES = ["summary", "json", "cprofile"]
+DEFAULT_OUTPUTS = {"json": "profile.json", "cprofile": "profile.prof"}
+
+ENABLED = False
+MODE = None
+OUTPUT = None
+
+_NOOP = nullcontext()
+_stats = {}   # stage name -> [calls, seconds, rows, bytes]
+_active = []  # names of the open stages, innermost last
+_profiler = None
+
+class _Stage:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        _active.append(self.name)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        elapsed = time.perf_counter() - self.start
+        _active.pop()
+        record = _record(self.name)
+        record[0] += 1
+        record[1] += elapsed
+        return False
+
+def _record(name):
+    record = _stats.get(name)
+    if record is None:
+        record = _stats[name] = [0, 0.0, 0, 0]
+    return record
+
+def stage(name):
+    """Returns a context manager that times a named stage while instrumentation is on."""
+    if not ENABLED:
+        return _NOOP
+    return _Stage(name)
+
+def count(rows=0, bytes=0):
+    """Adds rows parsed and bytes read to the innermost open stage."""
+    if not ENABLED or not _active:
+        return
+    record = _record(_active[-1])
+    record[2] += rows
+    record[3] += bytes
+
+def instrumented(name):
+    """Decorator that times every call of a feature function as a stage."""
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not ENABLED:
+                return func(*args, **kwargs)
+            with _Stage(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+def enable(mode="summary", output=None):
+    """Turns instrumentation on and reports when the process exits."""
+    global ENABLED, MODE, OUTPUT, _profiler
+    if mode not in MODES:
+        raise ValueError(f"Profile mode must be one of: {', '.join(MODES)}.")
+    if ENABLED:
+        return
+    ENABLED, MODE, OUTPUT = True, mode, output or DEFAULT_OUTPUTS.get(mode)
+    if mode == "cprofile":
+        import cProfile
+        _profiler = cProfile.Profile()
+        _profiler.enable()
+    atexit.register(_report_at_exit)
+
+def reset():
+    """Forgets the stages recorded so far."""
+    _stats.clear()
+
+def report():
+    """Returns the recorded stages, slowest first."""
+    return [
+        {"stage": name, "calls": calls, "seconds": round(seconds, 6), "rows": rows, "bytes": bytes}
+        for name, (calls, seconds, rows, bytes) in sorted(_stats.items(), key=lambda item: -item[1][1])
+    ]
+
+def print_summary(file=None):
+    """Prints the recorded stages as a table."""
+    from rich.console import Console
+    from rich.table import Table
+
+    table = Table(title="Profile")
+    table.add_column("Stage", style="cyan")
+    table.add_column("Calls", justify="right")
+    table.add_column("Seconds", justify="right", style="magenta")
+    table.add_column("Rows", justify="right")
+    table.add_column("Bytes", justify="right")
+    for entry in report():
+        table.add_row(
+            entry["stage"],
+            str(entry["calls"]),
+            f"{entry['seconds']:.4f}",
+            f"{entry['rows']:,}" if entry["rows"] else "",
+            f"{entry['bytes']:,}" if entry["bytes"] else "",
+        )
+    Console(file=file or sys.stderr).print(table)
+
+def write_json(path):
+    """Writes the recorded stages as JSON."""
+    import json
+
+    with open(path, "w") as f:
+        json.dump({"argv": sys.argv, "stages": report()}, f, indent=2)
+
+def _report_at_exit():
+    if _profiler is not None:
+        _profiler.disable()
+        _profiler.dump_stats(OUTPUT)
+    if MODE == "json":
+        write_json(OUTPUT)
+    if _stats:
+        print_summary()
+    if OUTPUT:
+        print(f"Profile written to {OUTPUT}", file=sys.stderr)
+
+_env_mode = os.environ.get("FINANCE_TRACKER_PROFILE", "")
+if _env_mode not in ("", "0"):
+    # Any other value, e.g. "1", means the summary table
+    enable(_env_mode if _env_mode in MODES else "summary", os.environ.get("FINANCE_TRACKER_PROFILE_OUTPUT"))
@@ -0,0 +1,154 @@
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from rich.panel import Panel
+from rich.console import Console
+from rich.table import Table
+from features.storage.recurring_store import FREQUENCIES, Rule, add_rule, materialize, read_rules, remove_rule
+from features.transactions.transactions import EXPENSE_CATEGORIES, INCOME_CATEGORIES
+
+UNITS = {"daily": "day", "weekly": "week", "monthly": "month", "yearly": "year"}
+
+console = Console()
+
+def create_rule(type, amount_text, category, description, frequency, every=1, start=None, end=None):
+    """Validates and saves a recurring rule without prompting. Raises ValueError on bad input.
+
+    Returns (rule, number of transactions added). Occurrences from the start
+    date (default: today) up to today, past ones included, are added right
+    away, later ones whenever the CLI or dashboard starts after they fall due.
+    """
+    if type not in ("expense", "income"):
+        raise ValueError(f"Unknown transaction type '{type}'.")
+    categories = EXPENSE_CATEGORIES if type == "expense" else INCOME_CATEGORIES
+    if category not in categories:
+        raise ValueError(f"Category must be one of: {', '.join(categories)}.")
+    if not description:
+        raise ValueError("Description cannot be empty.")
+    try:
+        amount = int((Decimal(amount_text) * 100).quantize(Decimal(1)))  # Store as paisa/cents
+    except InvalidOperation:
+        raise ValueError(f"Invalid amount '{amount_text}'.")
+    rule = Rule(frequency, every, start or datetime.now().strftime('%Y-%m-%d'), end or None, None, type, category, description, amount)
+    add_rule(rule)
+    return rule, materialize()
+
+def describe_schedule(rule):
+    """Returns a rule's schedule in words, e.g. "every 2 weeks from 2024-01-05"."""
+    unit = UNITS[rule.frequency]
+    schedule = rule.frequency if rule.every == 1 else f"every {rule.every} {unit}s"
+    schedule += f" from {rule.start}"
+    if rule.end:
+        schedule += f" to {rule.end}"
+    return schedule
+
+def display_recurring():
+    """Displays the recurring rules with their numbers."""
+    rules = read_rules()
+    if not rules:
+        console.print(Panel("[bold yellow]No recurring transactions set up yet.[/bold yellow]", title="Recurring"))
+        return rules
+
+    table = Table(title="Recurring Transactions")
+    table.add_column("#", justify="right")
+    table.add_column("Schedule", style="cyan")
+    table.add_column("Type", style="magenta")
+    table.add_column("Category", style="yellow")
+    table.add_column("Description", style="blue")
+    table.add_column("Amount", justify="right", style="green")
+    table.add_column("Added through", style="dim")
+
+    for number, rule in enumerate(rules, 1):
+        style = "red" if rule.type == "expense" else "green"
+        table.add_row(
+            str(number),
+            describe_schedule(rule),
+            rule.type,
+            rule.category,
+            rule.description,
+            f"[{style}]{rule.amount/100:.2f}[/{style}]",
+            rule.through or "-",
+        )
+    console.print(table)
+    return rules
+
+def manage_recurring():
+    """Lists the recurring rules and lets the user add or remove one."""
+    import questionary  # loaded lazily, batch commands never prompt
+
+    try:
+        rules = display_recurring()
+        choices = ["Add a recurring transaction"] + (["Remove a recurring transaction"] if rules else []) + ["Back"]
+        action = questionary.select("What would you like to do?", choices=choices, qmark="🔁").ask()
+        if action == "Add a recurring transaction":
+            _add_recurring(questionary)
+        elif action == "Remove a recurring transaction":
+            choice = questionary.select(
+                "Select the rule to remove:",
+                choices=[f"{number}. {rule.description} ({describe_schedule(rule)})" for number, rule in enumerate(rules, 1)],
+                qmark="🗑️"
+            ).ask()
+            if not choice:
+                return
+            removed = remove_rule(int(choice.split(".", 1)[0]))
+            console.print(Panel(f"[bold green]Recurring '{removed.description}' removed. Transactions already added stay in the ledger.[/bold green]", title="Success"))
+
+    except KeyboardInterrupt:
+        console.print("\n[bold yellow]Operation cancelled.[/bold yellow]")
+    except Exception as e:
+        console.print(Panel(f"[bold red]An error occurred: {e}[/bold red]", title="Error"))
+
+def _add_recurring(questionary):
+    type = questionary.select("Expense or income?", choices=["expense", "income"], qmark="🏷️").ask()
+    if not type:
+        return
+
+    amount_str = questionary.text(
+        f"Enter the {type} amount:",
+        validate=lambda text: text.isdigit() and float(text) > 0,
+        qmark="💰"
+    ).ask()
+    if not amount_str:
+        console.print(Panel("[bold red]Amount cannot be empty.[/bold red]", title="Error"))
+        return
+
+    category = questionary.select(
+        "Select category:",
+        choices=EXPENSE_CATEGORIES if type == "expense" else INCOME_CATEGORIES,
+        qmark="🏷️"
+    ).ask()
+    if not category:
+        return
+
+    description = questionary.text("Enter a short description:", qmark="📝").ask()
+    if not description:
+        return
+
+    frequency = questionary.select("How often?", choices=FREQUENCIES, default="monthly", qmark="🔁").ask()
+    if not frequency:
+        return
+
+    every_str = questionary.text(
+        f"Repeat every how many {UNITS[frequency]}s?",
+        default="1",
+        validate=lambda text: text.isdigit() and int(text) > 0,
+        qmark="🔁"
+    ).ask()
+    if not every_str:
+        return
+
+    start = questionary.text(
+        f"Enter the first date (YYYY-MM-DD), leave empty for today ({datetime.now().strftime('%Y-%m-%d')}):",
+        qmark="📅"
+    ).ask()
+    end = questionary.text("Enter the last date (YYYY-MM-DD), leave empty to repeat indefinitely:", qmark="📅").ask()
+
+    try:
+        rule, added = create_rule(type, amount_str, category, description, frequency, int(every_str), start, end)
+    except ValueError as e:
+        console.print(Panel(f"[bold red]{e}[/bold red]", title="Error"))
+        return
+
+    message = f"Recurring {type} of {rule.amount/100:.2f} in '{category}', {describe_schedule(rule)}, added successfully!"
+    if added:
+        message += f" {added} transactions already due were added."
+    console.print(Panel(f"[bold green]{message}[/bold green]", title="Success"))
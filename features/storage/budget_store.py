@@ -0,0 +1,185 @@
+import os
+import re
+import sys
+from bisect import bisect_right
+from datetime import date
+
+# Budgets are kept as an append-only journal in database/budgets.txt:
+#
+#     YYYY-MM|period|category|amount_in_paisa
+#
+# Each line sets a category's weekly, monthly or yearly budget from that month
+# on, so setting a budget appends one line instead of rewriting the file and
+# older months keep the budget they had. An amount of 0 removes the budget.
+# Lines in the older category,amount[,period] layout count as budgets set
+# before any month. `python -m features.storage.budget_store compact` folds
+# the journal down to one line per month, period and category.
+
+ALWAYS = "0000-00"
+MONTH = re.compile(r"\d{4}-(0[1-9]|1[0-2])")
+
+def current_month():
+    """Returns the current month as YYYY-MM."""
+    return date.today().strftime("%Y-%m")
+
+def check_month(month):
+    """Raises ValueError unless month is a YYYY-MM month, so a bad one never reaches the journal."""
+    if not MONTH.fullmatch(month):
+        raise ValueError(f"Invalid month '{month}'. Please use YYYY-MM.")
+
+def _parse(line):
+    """Returns (month, period, category, amount) for a journal or legacy line, or None."""
+    line = line.strip()
+    if not line:
+        return None
+    try:
+        if "|" in line:
+            month, period, category, amount = line.split("|")
+        else:
+            category, amount, *period = line.split(",")
+            month, period = ALWAYS, period[0] if period else "monthly"
+        return month, period, category, int(amount)
+    except ValueError:
+        # Includes a line torn by a crash in the middle of an append
+        return None
+
+class BudgetStore:
+    """Budgets of one journal file, cached until the file changes."""
+
+    def __init__(self, path):
+        self.path = path
+        self.signature = None
+        self.history = {}  # (period, category) -> ([month, ...], [amount, ...]) sorted by month
+        self._views = {}   # (period, month) -> {category: amount}
+
+    def _signature(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return stat.st_size, stat.st_mtime_ns
+
+    def _refresh(self):
+        signature = self._signature()
+        if signature == self.signature:
+            return
+        entries = {}
+        if signature is not None:
+            with open(self.path, "r") as f:
+                for line in f:
+                    if not line.endswith("\n") and "|" in line:
+                        # A journal line cut short by a crash; the next append drops it
+                        continue
+                    parsed = _parse(line)
+                    if parsed is None:
+                        continue
+                    month, period, category, amount = parsed
+                    # A later line for the same month wins
+                    entries[(period, category, month)] = amount
+        history = {}
+        for (period, category, month), amount in sorted(entries.items()):
+            months, amounts = history.setdefault((period, category), ([], []))
+            months.append(month)
+            amounts.append(amount)
+        self.history = history
+        self._views = {}
+        self.signature = signature
+
+    def get(self, period="monthly", month=None):
+        """Returns {category: amount} of the budgets in effect for a period in a month (default: this month)."""
+        self._refresh()
+        key = (period, month or current_month())
+        view = self._views.get(key)
+        if view is None:
+            view = {}
+            for (budget_period, category), (months, amounts) in self.history.items():
+                if budget_period != period:
+                    continue
+                i = bisect_right(months, key[1])
+                if i and amounts[i - 1]:
+                    view[category] = amounts[i - 1]
+            self._views[key] = view
+        return dict(view)
+
+    def category_history(self, category, period="monthly"):
+        """Returns [(month, amount)] of every change to one budget, oldest first."""
+        self._refresh()
+        months, amounts = self.history.get((period, category), ([], []))
+        return list(zip(months, amounts))
+
+    def entries(self):
+        """Returns [(month, period, category, amount)] of every change to every budget, one per month."""
+        self._refresh()
+        return [
+            (month, period, category, amount)
+            for (period, category), (months, amounts) in sorted(self.history.items())
+            for month, amount in zip(months, amounts)
+        ]
+
+    def set_many(self, updates, period="monthly", month=None):
+        """Sets many budgets of one period from a month on with a single append. Raises ValueError on a bad month."""
+        month = month or current_month()
+        check_month(month)
+        if not updates:
+            return
+        data = "".join(f"{month}|{period}|{category}|{amount}\n" for category, amount in updates.items())
+        self._repair_tail()
+        with open(self.path, "ab") as f:
+            f.write(data.encode("utf-8"))
+
+    def _repair_tail(self):
+        """Drops a journal line left unterminated by a crash, or terminates a legacy last line."""
+        try:
+            f = open(self.path, "r+b")
+        except FileNotFoundError:
+            return
+        with f:
+            size = f.seek(0, os.SEEK_END)
+            if not size:
+                return
+            f.seek(max(0, size - 4096))
+            tail = f.read()
+            if tail.endswith(b"\n"):
+                return
+            last_line = tail[tail.rfind(b"\n") + 1:]
+            if b"|" in last_line:
+                f.truncate(size - len(last_line))
+            else:
+                f.write(b"\n")
+
+    def replace(self, budgets, period="monthly", month=None):
+        """Makes budgets the complete set of a period's budgets from a month on. Raises ValueError on a bad month."""
+        month = month or current_month()
+        check_month(month)
+        current = self.get(period, month)
+        updates = {category: 0 for category in current if category not in budgets}
+        updates.update({category: amount for category, amount in budgets.items() if current.get(category) != amount})
+        self.set_many(updates, period, month)
+
+    def compact(self):
+        """Rewrites the journal with one line per month, period and category, atomically."""
+        lines = [f"{month}|{period}|{category}|{amount}\n" for month, period, category, amount in self.entries()]
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            f.writelines(lines)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        return len(lines)
+
+_stores = {}
+
+def get_store(path):
+    """Returns the cached BudgetStore of a budgets file."""
+    store = _stores.get(path)
+    if store is None:
+        store = _stores[path] = BudgetStore(path)
+    return store
+
+if __name__ == "__main__":
+    from features.storage.storage import BUDGETS_FILE
+
+    if sys.argv[1:] != ["compact"]:
+        print("Usage: python -m features.storage.budget_store compact")
+        sys.exit(1)
+    print(f"Compacted {BUDGETS_FILE} to {get_store(BUDGETS_FILE).compact()} lines")
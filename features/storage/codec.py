@@ -0,0 +1,177 @@
+import re
+import sys
+from collections import namedtuple
+from datetime import date, datetime
+
+# Canonical ledger record:
+#
+#     YYYY-MM-DD|type|category|description|amount_in_paisa
+#
+# A '|', '\' or line break inside a text field is escaped with '\'. Rows
+# written before the pipe format used ',' and are still read, but can be
+# rewritten once with `python -m features.storage.codec migrate`. Pipe rows
+# written before escaping may hold a bare '\', e.g. in C:\temp: a '\' is only
+# an escape in front of '|', '\', 'n' or 'r', and a row that doesn't split
+# into five fields that way is split on every '|' as it was written.
+
+DELIMITER = "|"
+LEGACY_DELIMITER = ","
+ESCAPE = "\\"
+
+# Ledgers repeat the same few hundred dates, so each date string is parsed once
+DATE_CACHE_SIZE = 1 << 16
+
+Transaction = namedtuple("Transaction", ["date", "type", "category", "description", "amount"])
+
+_FIELD = re.compile(r"(?:[^|\\]|\\[|\\nr]|\\)*")
+_ESCAPED = re.compile(r"\\([|\\nr])")
+_ESCAPE_CHARS = {"\\": "\\\\", "|": "\\|", "\n": "\\n", "\r": "\\r"}
+_UNESCAPE_CHARS = {"n": "\n", "r": "\r"}
+_NEEDS_ESCAPE = re.compile(r"[\\|\n\r]")
+_dates = {}   # date string -> (year, month, day), or None if it isn't a date
+_months = {}  # canonical date string -> (year, month)
+_ordinal_dates = {}  # date ordinal -> canonical date string
+
+def escape(field):
+    """Escapes a text field for the ledger."""
+    if _NEEDS_ESCAPE.search(field) is None:
+        return field
+    return "".join(_ESCAPE_CHARS.get(char, char) for char in field)
+
+def unescape(field):
+    """Reverses escape()."""
+    return _ESCAPED.sub(lambda m: _UNESCAPE_CHARS.get(m.group(1), m.group(1)), field)
+
+def split_fields(line):
+    """Splits a line on unescaped '|' and unescapes every field."""
+    return _split_escaped(line.rstrip("\r\n"))
+
+def _split_escaped(line):
+    fields = []
+    pos = 0
+    while True:
+        match = _FIELD.match(line, pos)
+        fields.append(unescape(match.group()))
+        pos = match.end()
+        if pos >= len(line):
+            return fields
+        pos += 1  # skip the delimiter
+
+def _parse_date(date_str):
+    if len(date_str) == 10 and date_str[4] == "-" and date_str[7] == "-" and date_str.isascii():
+        # Fast path: fixed offsets of a canonical YYYY-MM-DD date
+        try:
+            year, month, day = int(date_str[:4]), int(date_str[5:7]), int(date_str[8:])
+            date(year, month, day)
+        except ValueError:
+            return None
+        if date_str[:4].isdigit() and date_str[5:7].isdigit() and date_str[8:].isdigit():
+            return year, month, day
+    # Anything else, e.g. an unpadded 2024-1-5 typed in by hand, gets the strict parser
+    try:
+        parsed = datetime.strptime(date_str, "%Y-%m-%d")
+    except ValueError:
+        return None
+    return parsed.year, parsed.month, parsed.day
+
+def parse_date(date_str):
+    """Returns (year, month, day) for a YYYY-MM-DD string, or None if it isn't a valid date."""
+    try:
+        return _dates[date_str]
+    except KeyError:
+        parsed = _parse_date(date_str)
+        if len(_dates) < DATE_CACHE_SIZE:
+            _dates[date_str] = parsed
+        return parsed
+
+def canonical_date(date_str):
+    """Returns a date string zero-padded as YYYY-MM-DD, or None if it isn't a valid date."""
+    parsed = parse_date(date_str)
+    if parsed is None:
+        return None
+    return date_str if len(date_str) == 10 and date_str.isascii() else "%04d-%02d-%02d" % parsed
+
+def month_key(date_str):
+    """Returns the (year, month) key of a canonical YYYY-MM-DD date string."""
+    try:
+        return _months[date_str]
+    except KeyError:
+        key = int(date_str[:4]), int(date_str[5:7])
+        if len(_months) < DATE_CACHE_SIZE:
+            _months[date_str] = key
+        return key
+
+def date_ordinal(date_str):
+    """Returns the proleptic Gregorian ordinal of a YYYY-MM-DD date string."""
+    return date(*parse_date(date_str)).toordinal()
+
+def ordinal_date(ordinal):
+    """Returns the canonical YYYY-MM-DD string of a date ordinal, reversing date_ordinal()."""
+    try:
+        return _ordinal_dates[ordinal]
+    except KeyError:
+        date_str = date.fromordinal(ordinal).isoformat()
+        if len(_ordinal_dates) < DATE_CACHE_SIZE:
+            _ordinal_dates[ordinal] = date_str
+        return date_str
+
+def encode_record(transaction):
+    """Formats a Transaction as a canonical ledger line."""
+    return (
+        f"{transaction.date}|{escape(transaction.type)}|{escape(transaction.category)}"
+        f"|{escape(transaction.description)}|{transaction.amount}\n"
+    )
+
+def split_record(line):
+    """Splits a ledger line into its raw fields, or returns None if it doesn't have five."""
+    line = line.strip()
+    if not line:
+        return None
+    if ESCAPE not in line:
+        # Fast path: a plain row written by the CLI
+        parts = line.split(DELIMITER)
+        if len(parts) == 5:
+            return parts
+    else:
+        parts = _split_escaped(line)
+        if len(parts) == 5:
+            return parts
+        # An unescaped row from before escaping, e.g. ending in a bare '\' before a '|'
+        parts = line.split(DELIMITER)
+        if len(parts) == 5:
+            return parts
+    parts = line.split(LEGACY_DELIMITER)
+    if len(parts) == 5:
+        return parts
+    return None
+
+def decode_record(line):
+    """Parses a ledger line into a Transaction, returning None for malformed rows."""
+    parts = split_record(line)
+    if parts is None:
+        return None
+
+    date_str, type, category, description, amount = [p.strip() for p in parts]
+    date_str = canonical_date(date_str)
+    if date_str is None:
+        return None
+    try:
+        amount = int(amount)
+    except ValueError:
+        return None
+    return Transaction(date_str, sys.intern(type.lower()), sys.intern(category), description, amount)
+
+def is_legacy_record(line):
+    """Checks whether a line is a valid row in the old comma-separated layout."""
+    return (
+        split_record(line) == line.strip().split(LEGACY_DELIMITER)
+        and decode_record(line) is not None
+    )
+
+if __name__ == "__main__":
+    from features.storage.storage import TRANSACTIONS_FILE, migrate_legacy_rows
+
+    if sys.argv[1:] != ["migrate"]:
+        print("Usage: python -m features.storage.codec migrate")
+        sys.exit(1)
+    print(f"Rewrote {migrate_legacy_rows()} legacy rows in {TRANSACTIONS_FILE}")
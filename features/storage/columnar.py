@@ -0,0 +1,198 @@
+import json
+import os
+import sys
+from datetime import date
+
+import numpy as np
+
+from features.storage.codec import Transaction, date_ordinal, decode_record, encode_record
+from features.storage.storage import COLUMNAR_DIR, TRANSACTIONS_FILE, file_signature
+
+# Fixed-width column files, one value per row
+COLUMNS = {
+    "date": np.int32,      # date.toordinal()
+    "type": np.uint8,      # index into meta["types"]
+    "category": np.uint16, # index into meta["categories"]
+    "amount": np.int64,    # paisa
+}
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+CHUNK_ROWS = 100_000
+
+def _column_path(directory, name):
+    return os.path.join(directory, f"{name}.bin")
+
+def _read_meta(directory):
+    with open(os.path.join(directory, "meta.json"), "r") as f:
+        return json.load(f)
+
+def text_to_columnar(txt_path=TRANSACTIONS_FILE, out_dir=COLUMNAR_DIR):
+    """Converts a text ledger into the columnar format, streaming in chunks."""
+    os.makedirs(out_dir, exist_ok=True)
+    types = {"expense": 0, "income": 1}
+    categories = {}
+    source = file_signature(txt_path)
+    rows = 0
+
+    files = {name: open(_column_path(out_dir, name), "wb") for name in COLUMNS}
+    files["desc_offsets"] = open(_column_path(out_dir, "desc_offsets"), "wb")
+    files["desc"] = open(_column_path(out_dir, "desc"), "wb")
+    try:
+        heap_end = 0
+        np.array([0], dtype=np.int64).tofile(files["desc_offsets"])
+        chunk = {name: [] for name in COLUMNS}
+        offsets = []
+        descriptions = []
+
+        def flush():
+            for name, dtype in COLUMNS.items():
+                np.array(chunk[name], dtype=dtype).tofile(files[name])
+                chunk[name].clear()
+            np.array(offsets, dtype=np.int64).tofile(files["desc_offsets"])
+            files["desc"].write(b"".join(descriptions))
+            offsets.clear()
+            descriptions.clear()
+
+        if os.path.exists(txt_path):
+            with open(txt_path, "r") as ledger:
+                for line in ledger:
+                    transaction = decode_record(line)
+                    if transaction is None:
+                        continue
+                    encoded = transaction.description.encode("utf-8")
+                    heap_end += len(encoded)
+                    chunk["date"].append(date_ordinal(transaction.date))
+                    chunk["type"].append(types.setdefault(transaction.type, len(types)))
+                    chunk["category"].append(categories.setdefault(transaction.category, len(categories)))
+                    chunk["amount"].append(transaction.amount)
+                    offsets.append(heap_end)
+                    descriptions.append(encoded)
+                    rows += 1
+                    if len(offsets) >= CHUNK_ROWS:
+                        flush()
+        flush()
+    finally:
+        for f in files.values():
+            f.close()
+
+    meta = {"rows": rows, "types": list(types), "categories": list(categories), "source": source}
+    with open(os.path.join(out_dir, "meta.json"), "w") as f:
+        json.dump(meta, f)
+    return rows
+
+def open_columnar(directory=COLUMNAR_DIR):
+    """Memory-maps a columnar ledger. Returns (columns, meta) without copying the data."""
+    meta = _read_meta(directory)
+    rows = meta["rows"]
+    columns = {}
+    for name, dtype in list(COLUMNS.items()) + [("desc_offsets", np.int64)]:
+        length = rows + 1 if name == "desc_offsets" else rows
+        if length == 0:
+            columns[name] = np.empty(0, dtype=dtype)
+        else:
+            columns[name] = np.memmap(_column_path(directory, name), dtype=dtype, mode="r", shape=(length,))
+    if os.path.getsize(_column_path(directory, "desc")) == 0:
+        columns["desc"] = np.empty(0, dtype=np.uint8)
+    else:
+        columns["desc"] = np.memmap(_column_path(directory, "desc"), dtype=np.uint8, mode="r")
+    return columns, meta
+
+def is_fresh(directory=COLUMNAR_DIR, txt_path=TRANSACTIONS_FILE):
+    """Checks whether the columnar ledger was built from the current text ledger."""
+    try:
+        meta = _read_meta(directory)
+    except FileNotFoundError:
+        return False
+    source = meta.get("source")
+    return source is not None and tuple(source) == file_signature(txt_path)
+
+def description(columns, row):
+    """Decodes the description of a single row from the heap."""
+    start, end = columns["desc_offsets"][row], columns["desc_offsets"][row + 1]
+    return bytes(columns["desc"][start:end]).decode("utf-8")
+
+def iter_transactions(directory=COLUMNAR_DIR):
+    """Yields every row of a columnar ledger as a Transaction."""
+    columns, meta = open_columnar(directory)
+    types, categories = meta["types"], meta["categories"]
+    for row in range(meta["rows"]):
+        yield Transaction(
+            date.fromordinal(int(columns["date"][row])).isoformat(),
+            types[columns["type"][row]],
+            categories[columns["category"][row]],
+            description(columns, row),
+            int(columns["amount"][row]),
+        )
+
+def columnar_to_text(directory=COLUMNAR_DIR, txt_path=TRANSACTIONS_FILE):
+    """Converts a columnar ledger back to the pipe-delimited text layout."""
+    rows = 0
+    with open(txt_path, "w") as f:
+        for transaction in iter_transactions(directory):
+            f.write(encode_record(transaction))
+            rows += 1
+    return rows
+
+def category_totals(columns, meta, start=None, end=None):
+    """Sums amounts per (type, category) for rows with start <= date < end (dates as date objects)."""
+    mask = np.ones(meta["rows"], dtype=bool)
+    if start is not None:
+        mask &= columns["date"] >= start.toordinal()
+    if end is not None:
+        mask &= columns["date"] < end.toordinal()
+
+    n_categories = max(len(meta["categories"]), 1)
+    keys = columns["type"][mask].astype(np.int64) * n_categories + columns["category"][mask]
+    totals = np.zeros(len(meta["types"]) * n_categories, dtype=np.int64)
+    np.add.at(totals, keys, columns["amount"][mask])
+
+    result = {}
+    for key in np.flatnonzero(totals):
+        type_id, category_id = divmod(int(key), n_categories)
+        result[(meta["types"][type_id], meta["categories"][category_id])] = int(totals[key])
+    return result
+
+def daily_totals(columns, meta):
+    """Sums amounts per (date, type, category), returned as {(date, type, category): paisa}."""
+    if meta["rows"] == 0:
+        return {}
+    n_types = len(meta["types"])
+    n_categories = max(len(meta["categories"]), 1)
+    keys = (columns["date"].astype(np.int64) * n_types + columns["type"]) * n_categories + columns["category"]
+    unique, inverse = np.unique(keys, return_inverse=True)
+    totals = np.zeros(len(unique), dtype=np.int64)
+    np.add.at(totals, inverse, columns["amount"])
+
+    result = {}
+    for key, amount in zip(unique.tolist(), totals.tolist()):
+        rest, category_id = divmod(key, n_categories)
+        ordinal, type_id = divmod(rest, n_types)
+        result[(date.fromordinal(ordinal).isoformat(), meta["types"][type_id], meta["categories"][category_id])] = amount
+    return result
+
+def monthly_totals(columns, meta):
+    """Sums amounts per (year, month, type), returned as {(year, month, type): paisa}."""
+    months = (columns["date"].astype(np.int64) - EPOCH_ORDINAL).astype("datetime64[D]").astype("datetime64[M]").astype(np.int64)
+    if months.size == 0:
+        return {}
+    first = months.min()
+    n_types = len(meta["types"])
+    keys = (months - first) * n_types + columns["type"]
+    totals = np.zeros(int(keys.max()) + 1, dtype=np.int64)
+    np.add.at(totals, keys, columns["amount"])
+
+    result = {}
+    for key in np.flatnonzero(totals):
+        month_offset, type_id = divmod(int(key), n_types)
+        year, month = divmod(int(first) + month_offset, 12)
+        result[(1970 + year, month + 1, meta["types"][type_id])] = int(totals[key])
+    return result
+
+if __name__ == "__main__":
+    usage = "Usage: python -m features.storage.columnar [to-columnar|to-text]"
+    if len(sys.argv) != 2 or sys.argv[1] not in ("to-columnar", "to-text"):
+        print(usage)
+        sys.exit(1)
+    if sys.argv[1] == "to-columnar":
+        print(f"Wrote {text_to_columnar()} rows to {COLUMNAR_DIR}")
+    else:
+        print(f"Wrote {columnar_to_text()} rows to {TRANSACTIONS_FILE}")
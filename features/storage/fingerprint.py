@@ -0,0 +1,79 @@
+import hashlib
+import os
+from collections import namedtuple
+
+# Caches built from a ledger file (the ledger index, the monthly rollup, the
+# dashboard frame, the search index) keep a Fingerprint of the file as they
+# read it: its size, mtime and inode, how far they read ("end", short of a
+# line still being written), and hashes of the first HEAD_BYTES and of the
+# TAIL_BYTES before end. Compared with the file now:
+#
+# - the same size, mtime and inode: unchanged
+# - another inode, e.g. after an os.replace: rewritten
+# - smaller, or the same size with another mtime (an edit in place): rewritten
+# - larger: appended to if both hashes still match, rewritten otherwise
+
+HEAD_BYTES = 4096
+TAIL_BYTES = 64
+
+UNCHANGED = "unchanged"
+APPENDED = "appended"
+REWRITTEN = "rewritten"
+
+Fingerprint = namedtuple("Fingerprint", ["size", "mtime_ns", "inode", "end", "head", "tail"])
+
+def state(path):
+    """Returns (size, mtime_ns, inode) of a file, or None if it doesn't exist."""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_size, stat.st_mtime_ns, stat.st_ino
+
+def _hashes(f, end):
+    f.seek(0)
+    head = hashlib.blake2b(f.read(min(end, HEAD_BYTES)), digest_size=16).hexdigest()
+    start = max(0, end - TAIL_BYTES)
+    f.seek(start)
+    tail = hashlib.blake2b(f.read(end - start), digest_size=16).hexdigest()
+    return head, tail
+
+def take(f, stat, end):
+    """Returns the Fingerprint of a file opened in binary mode and read up to byte end.
+
+    stat is the file's os.fstat() from before the read, so rows appended while
+    reading show up as growth next time.
+    """
+    return Fingerprint(stat.st_size, stat.st_mtime_ns, stat.st_ino, end, *_hashes(f, end))
+
+def is_current(fingerprint, path):
+    """Checks with a single stat whether a file is unchanged since its Fingerprint was taken."""
+    return fingerprint is not None and state(path) == tuple(fingerprint[:3])
+
+def compare(fingerprint, f):
+    """Returns UNCHANGED, APPENDED or REWRITTEN for a file opened in binary mode, against an earlier Fingerprint.
+
+    A missing fingerprint counts as rewritten.
+    """
+    stat = os.fstat(f.fileno())
+    if fingerprint is None or stat.st_ino != fingerprint.inode or stat.st_size < fingerprint.size:
+        return REWRITTEN
+    if stat.st_size == fingerprint.size:
+        return UNCHANGED if stat.st_mtime_ns == fingerprint.mtime_ns else REWRITTEN
+    if _hashes(f, fingerprint.end) != (fingerprint.head, fingerprint.tail):
+        return REWRITTEN
+    return APPENDED
+
+def encode(fingerprint):
+    """Formats a Fingerprint as one comma-separated field, for the files that persist it."""
+    return ",".join(str(value) for value in fingerprint)
+
+def decode(text):
+    """Parses encode() output, returning None for anything else."""
+    parts = text.strip().split(",")
+    if len(parts) != len(Fingerprint._fields):
+        return None
+    try:
+        return Fingerprint(int(parts[0]), int(parts[1]), int(parts[2]), int(parts[3]), parts[4], parts[5])
+    except ValueError:
+        return None
@@ -0,0 +1,269 @@
+import csv
+import io
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from features.instrumentation.instrumentation import count, instrumented, stage
+from features.storage import fingerprint
+from features.storage.codec import ESCAPE, split_record
+from features.storage.storage import COLUMNAR_DIR, SHARDS_DIR, TRANSACTIONS_FILE
+
+# Amount is int64 paisa, as in the ledger; it's divided by 100 only for display
+FRAME_COLUMNS = ["Date", "Type", "Category", "Description", "Amount"]
+
+def empty_frame():
+    """Returns an empty transactions DataFrame."""
+    return pd.DataFrame(columns=FRAME_COLUMNS)
+
+def _split_lines(buf):
+    """Returns (starts, ends) byte offsets of every line, ends pointing at the newline."""
+    ends = np.flatnonzero(buf == ord("\n"))
+    starts = np.concatenate(([0], ends[:-1] + 1))
+    return starts, ends
+
+# Amounts of up to 18 digits always fit int64 and are converted in bulk
+PLAIN_AMOUNT = r"[+-]?[0-9]{1,18}"
+INT64_MIN, INT64_MAX = np.iinfo(np.int64).min, np.iinfo(np.int64).max
+
+WHITESPACE = np.zeros(256, dtype=bool)
+WHITESPACE[list(b" \t\f\v")] = True
+
+def _separator_counts(positions, ends):
+    """Counts separators on every line."""
+    return np.diff(np.searchsorted(positions, ends), prepend=0)
+
+def _is_padded(buf, positions, starts, ends):
+    """Checks whether any field of the given lines has whitespace around it that needs stripping."""
+    # Step back over the newline and an optional '\r', which the CSV reader handles
+    line_ends = ends - 1 - (buf[np.maximum(ends - 1, 0)] == ord("\r"))
+    around = np.concatenate((positions - 1, positions + 1, starts, line_ends))
+    around = around[(around >= 0) & (around < len(buf))]
+    return bool(WHITESPACE[buf[around]].any())
+
+def _read_rows(data, sep, padded):
+    """Parses rows that all contain exactly four separators with the C CSV reader."""
+    def read(dtype):
+        return pd.read_csv(
+            io.BytesIO(data),
+            sep=sep,
+            header=None,
+            dtype=dtype,
+            quoting=csv.QUOTE_NONE,
+            keep_default_na=False,
+            skip_blank_lines=False,
+            engine="c",
+        )
+
+    if padded:
+        return read(str).apply(lambda column: column.str.strip())
+    # The C parser yields int64 amounts when every one is a plain integer in range
+    parts = read({0: str, 1: str, 2: str, 3: str})
+    if parts[4].dtype != np.int64:
+        # One odd amount turned the column float or text, which garbles the good ones; read it as text
+        parts = read(str)
+    return parts
+
+def _decode_rows(data, starts, ends, lines):
+    """Splits individual lines with the codec, for rows the bulk reader can't handle."""
+    rows, index = [], []
+    for line in lines:
+        parts = split_record(data[starts[line]:ends[line]].decode("utf-8"))
+        if parts is not None:
+            rows.append([p.strip() for p in parts])
+            index.append(line)
+    return pd.DataFrame(rows, index=index, columns=range(5), dtype=str)
+
+def _parse_amounts(texts):
+    """Converts amount strings to int64 like codec.decode_record. Returns (values, valid).
+
+    Plain integers go through in bulk; the rest, e.g. with a '_' separator,
+    through int() one by one. Amounts outside int64 are rejected.
+    """
+    plain = texts.str.fullmatch(PLAIN_AMOUNT).to_numpy(dtype=bool)
+    values = np.zeros(len(texts), dtype=np.int64)
+    values[plain] = texts[plain].to_numpy(dtype=np.int64)
+    valid = plain.copy()
+    for i in np.flatnonzero(~plain):
+        try:
+            value = int(texts.iloc[i])
+        except ValueError:
+            continue
+        if INT64_MIN <= value <= INT64_MAX:
+            values[i] = value
+            valid[i] = True
+    return values, valid
+
+def load_text_frame(path=TRANSACTIONS_FILE):
+    """Loads a text ledger into a DataFrame in bulk."""
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except FileNotFoundError:
+        return empty_frame()
+    return frame_from_bytes(data)
+
+def frame_from_bytes(data):
+    """Parses ledger bytes into a DataFrame in bulk.
+
+    Rows are accepted and rejected like codec.decode_record: '|' rows first,
+    ',' rows for older data, and rows with a bad date or a non-integer amount
+    are skipped, as are amounts too large for int64. Plain rows are split in bulk; the rare rows with escaped
+    characters go through the codec one by one.
+    """
+    with stage("frames.parse"):
+        frame = _frame_from_bytes(data)
+        count(rows=len(frame), bytes=len(data))
+    return frame
+
+def _frame_from_bytes(data):
+    if not data.endswith(b"\n"):
+        data += b"\n"
+
+    buf = np.frombuffer(data, dtype=np.uint8)
+    starts, ends = _split_lines(buf)
+    pipes = np.flatnonzero(buf == ord("|"))
+    commas = np.flatnonzero(buf == ord(","))
+    escaped_rows = _separator_counts(np.flatnonzero(buf == ord(ESCAPE)), ends) > 0
+    pipe_rows = ~escaped_rows & (_separator_counts(pipes, ends) == 4)
+    comma_rows = ~escaped_rows & ~pipe_rows & (_separator_counts(commas, ends) == 4)
+
+    groups = []
+    if escaped_rows.any():
+        groups.append(_decode_rows(data, starts, ends, np.flatnonzero(escaped_rows)))
+    for rows, sep, positions in [(pipe_rows, "|", pipes), (comma_rows, ",", commas)]:
+        if not rows.any():
+            continue
+        positions = positions[rows[np.searchsorted(ends, positions)]]
+        padded = _is_padded(buf, positions, starts[rows], ends[rows])
+        if rows.all():
+            group_data = data
+        else:
+            # Gather the bytes of the selected lines in one vectorized copy
+            group_data = buf[np.repeat(rows, ends - starts + 1)].tobytes()
+        parts = _read_rows(group_data, sep, padded)
+        parts.index = np.flatnonzero(rows)
+        groups.append(parts)
+    if not groups:
+        return empty_frame()
+    # Keep file order across the row groups
+    parts = groups[0] if len(groups) == 1 else pd.concat(groups).sort_index()
+
+    dates = pd.to_datetime(parts[0], format="%Y-%m-%d", errors="coerce")
+    if parts[4].dtype == np.int64:
+        amounts, valid_amounts = parts[4].to_numpy(), True
+    else:
+        amounts, valid_amounts = _parse_amounts(parts[4].astype(str))
+    valid = dates.notna().to_numpy() & valid_amounts
+    parts = parts[valid]
+    if parts.empty:
+        return empty_frame()
+
+    types = pd.Categorical(parts[1])
+    titles = np.array([t.lower().title() for t in types.categories], dtype=object)
+    return pd.DataFrame({
+        "Date": dates[valid].to_numpy(),
+        "Type": pd.Categorical(titles[types.codes]),
+        "Category": pd.Categorical(parts[2]),
+        "Description": parts[3].to_numpy(),
+        "Amount": amounts[valid],
+    })
+
+class LedgerFrameCache:
+    """Keeps a ledger DataFrame current, parsing only the rows appended since the last load.
+
+    The cached frame is reused while the ledger's size, mtime and inode are
+    unchanged. When the ledger only grew, as the fingerprint module tells, the
+    new tail alone is parsed and concatenated. Anything else, including an
+    edit in place that kept the size, is treated as a rewrite and reloaded in
+    full.
+    """
+
+    def __init__(self, path=TRANSACTIONS_FILE):
+        self.path = path
+        self.lock = threading.Lock()
+        self.fingerprint = None
+        self.frame = empty_frame()
+
+    @instrumented("frames.cache_get")
+    def get(self):
+        """Returns the up-to-date transactions DataFrame."""
+        with self.lock:
+            if fingerprint.is_current(self.fingerprint, self.path):
+                return self.frame
+            try:
+                f = open(self.path, "rb")
+            except FileNotFoundError:
+                self.fingerprint, self.frame = None, empty_frame()
+                return self.frame
+
+            with f:
+                stat = os.fstat(f.fileno())
+                appended = fingerprint.compare(self.fingerprint, f) == fingerprint.APPENDED
+                start = self.fingerprint.end if appended else 0
+                f.seek(start)
+                data = f.read()
+                # An unterminated last line may still be growing; it is parsed once complete
+                complete = data[:data.rfind(b"\n") + 1]
+                new_rows = frame_from_bytes(complete)
+                self.frame = _concat_frames(self.frame, new_rows) if appended else new_rows
+                self.fingerprint = fingerprint.take(f, stat, start + len(complete))
+            return self.frame
+
+def _concat_frames(frame, new_rows):
+    return concat_frames([frame, new_rows])
+
+def concat_frames(frames):
+    """Concatenates transaction frames in order, keeping Type and Category categorical."""
+    frames = [frame for frame in frames if not frame.empty]
+    if not frames:
+        return empty_frame()
+    if len(frames) == 1:
+        return frames[0]
+    combined = pd.concat(frames, ignore_index=True)
+    for column in ["Type", "Category"]:
+        combined[column] = combined[column].astype("category")
+    return combined
+
+def load_shard_frames(directory=SHARDS_DIR):
+    """Loads every archived ledger shard into one DataFrame, parsing the shards in parallel."""
+    from features.storage import shards
+    return concat_frames(shards.map_shards(load_text_frame, shards.shard_paths(directory)))
+
+@instrumented("frames.load_sqlite")
+def load_sqlite_frame():
+    """Loads the transactions DataFrame from the SQLite backend."""
+    from features.storage import sqlite_backend
+
+    frame = pd.read_sql_query(
+        "SELECT date, type, category, description, amount FROM transactions ORDER BY id",
+        sqlite_backend.connect(),
+    )
+    if frame.empty:
+        return empty_frame()
+    return pd.DataFrame({
+        "Date": pd.to_datetime(frame["date"], format="%Y-%m-%d"),
+        "Type": pd.Categorical(frame["type"].str.title()),
+        "Category": pd.Categorical(frame["category"]),
+        "Description": frame["description"],
+        "Amount": frame["amount"].astype(np.int64),
+    })
+
+@instrumented("frames.load_columnar")
+def load_columnar_frame(directory=COLUMNAR_DIR):
+    """Builds the transactions DataFrame straight from the memory-mapped columnar ledger."""
+    from features.storage import columnar
+
+    columns, meta = columnar.open_columnar(directory)
+    offsets = columns["desc_offsets"].tolist()
+    heap = bytes(columns["desc"])
+    return pd.DataFrame({
+        "Date": pd.to_datetime(columns["date"] - columnar.EPOCH_ORDINAL, unit="D"),
+        "Type": pd.Categorical.from_codes(columns["type"], [t.title() for t in meta["types"]]),
+        "Category": pd.Categorical.from_codes(columns["category"], meta["categories"]),
+        "Description": [heap[start:end].decode("utf-8") for start, end in zip(offsets, offsets[1:])],
+        # A copy, so the frame doesn't keep the memory map open
+        "Amount": np.array(columns["amount"], dtype=np.int64),
+    })
@@ -0,0 +1,201 @@
+import os
+import queue
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows has no flock; appends there are still single writes
+    fcntl = None
+
+# Seconds between fsyncs of the ledger when appending through a JournalWriter.
+# 0 syncs every group commit, a negative value leaves syncing to the OS.
+FSYNC_INTERVAL = float(os.environ.get("FINANCE_TRACKER_FSYNC_INTERVAL", "0.5"))
+MAX_GROUP_ROWS = 10_000
+
+def lock_path(path):
+    """Returns the lock file that guards appends to a ledger."""
+    return path + ".lock"
+
+def torn_path(path):
+    """Returns the file that keeps torn last lines recovered from a ledger."""
+    return path + ".torn"
+
+@contextmanager
+def ledger_lock(path):
+    """Holds an exclusive advisory lock on a ledger, shared by every process that appends to it."""
+    if fcntl is None:
+        yield
+        return
+    with open(lock_path(path), "a") as lock_file:
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+def recover_torn_tail(path):
+    """Moves an unterminated last line, left by a crash in the middle of an append, out of the ledger.
+
+    Every writer ends its records with a newline, so such a line was never
+    fully written. It is kept in <ledger>.torn rather than dropped. Call this
+    with the ledger lock held. Returns the number of bytes moved.
+    """
+    try:
+        f = open(path, "r+b")
+    except FileNotFoundError:
+        return 0
+    with f:
+        size = f.seek(0, os.SEEK_END)
+        if size == 0:
+            return 0
+        f.seek(size - 1)
+        if f.read(1) == b"\n":
+            return 0
+        # Walk back to the last complete line
+        start = size
+        while start > 0:
+            block = min(start, 4096)
+            f.seek(start - block)
+            newline = f.read(block).rfind(b"\n")
+            if newline >= 0:
+                start = start - block + newline + 1
+                break
+            start -= block
+        f.seek(start)
+        torn = f.read()
+        with open(torn_path(path), "ab") as torn_file:
+            torn_file.write(torn + b"\n")
+        f.truncate(start)
+        return len(torn)
+
+_STOP = object()
+
+class JournalWriter:
+    """Queues transactions and appends them to the ledger in groups from a background thread.
+
+    Whatever accumulates while one group is being written goes out as the
+    next group, in a single locked append and a single rollup update. The
+    ledger is fsynced at most every fsync_interval seconds and always on
+    close(). Use it as a context manager, or call close() when done.
+    """
+
+    def __init__(self, path=None, fsync_interval=None, max_group_rows=MAX_GROUP_ROWS):
+        from features.storage.storage import TRANSACTIONS_FILE
+
+        self.path = path or TRANSACTIONS_FILE
+        self.fsync_interval = FSYNC_INTERVAL if fsync_interval is None else fsync_interval
+        self.max_group_rows = max_group_rows
+        self.queue = queue.Queue()
+        self.error = None
+        self.groups = 0
+        self.last_fsync = time.monotonic()
+        with ledger_lock(self.path):
+            recover_torn_tail(self.path)
+        self.thread = threading.Thread(target=self._run, name="ledger-journal", daemon=True)
+        self.thread.start()
+
+    def submit(self, transaction):
+        """Queues a Transaction to be appended."""
+        if self.error:
+            raise self.error
+        self.queue.put(transaction)
+
+    def flush(self):
+        """Waits until every queued transaction has been written."""
+        self.queue.join()
+        if self.error:
+            raise self.error
+
+    def close(self):
+        """Writes what is queued, syncs the ledger to disk and stops the thread."""
+        if self.thread.is_alive():
+            self.queue.put(_STOP)
+            self.thread.join()
+        if self.error:
+            raise self.error
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+        return False
+
+    def _run(self):
+        from features.storage.storage import append_transactions
+
+        stopping = False
+        while not stopping:
+            group = []
+            item = self.queue.get()
+            taken = 1
+            while True:
+                if item is _STOP:
+                    stopping = True
+                else:
+                    group.append(item)
+                if stopping or len(group) >= self.max_group_rows:
+                    break
+                try:
+                    item = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                taken += 1
+
+            now = time.monotonic()
+            sync = stopping or (self.fsync_interval >= 0 and now - self.last_fsync >= self.fsync_interval)
+            try:
+                if group and not self.error:
+                    append_transactions(group, self.path, fsync=sync)
+                    self.groups += 1
+                    if sync:
+                        self.last_fsync = now
+                elif stopping and not self.error:
+                    sync_file(self.path)
+            except Exception as e:
+                # Reported to the producer by the next submit(), flush() or close()
+                self.error = e
+            finally:
+                for _ in range(taken):
+                    self.queue.task_done()
+
+def sync_file(path):
+    """Flushes a file's data to disk."""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except FileNotFoundError:
+        return
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+@contextmanager
+def replacing(path, mode="w"):
+    """Opens a temporary file next to path and atomically swaps it in for path when the block ends.
+
+    Each caller gets its own uniquely named file, so processes that rewrite the
+    same sidecar at once never os.replace() a temporary file the other has moved.
+    """
+    fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(path) + ".", suffix=".tmp",
+        dir=os.path.dirname(path) or ".")
+    try:
+        with os.fdopen(fd, mode) as f:
+            yield f
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
+
+def sync_dir(path):
+    """Flushes a directory's entries to disk, so files os.replace()d into it stay replaced after a crash."""
+    if os.name == "nt":
+        # Windows can't open a directory to sync it
+        return
+    sync_file(path)
@@ -0,0 +1,108 @@
+import os
+
+from features.storage import fingerprint, journal
+from features.storage.codec import decode_record, month_key
+
+# The month index records where each month's rows sit in a ledger, in a small
+# text file next to it (database/transactions.months, shards/2023.months):
+#
+#     # ledger=<fingerprint of the ledger as indexed>
+#     YYYY-MM|start-end start-end ...
+#
+# Each start-end is a byte range of the ledger holding a run of consecutive
+# rows of that month, plus any unparseable lines between them, which readers
+# skip. Rows are mostly entered in date order, so a month is one or a few runs
+# and a month's rows can be read without touching the rest of the ledger.
+# Like the rollup, the index is caught up from the ledger's tail when rows
+# were appended and rebuilt when the ledger was rewritten.
+
+def month_index_path(ledger_path):
+    """Returns the month index file that belongs to a ledger file."""
+    return os.path.splitext(ledger_path)[0] + ".months"
+
+def load(path):
+    """Returns (ledger Fingerprint, {(year, month): [[start, end], ...]}) from a month index file, or (None, {})."""
+    try:
+        f = open(path, "r")
+    except FileNotFoundError:
+        return None, {}
+    covered, months = None, {}
+    with f:
+        for line in f:
+            line = line.strip()
+            if line.startswith("# ledger="):
+                covered = fingerprint.decode(line.split("=", 1)[1])
+            elif line:
+                month, runs = line.split("|")
+                months[(int(month[:4]), int(month[5:7]))] = [
+                    [int(offset) for offset in run.split("-")] for run in runs.split()
+                ]
+    return covered, months
+
+def save(path, covered, months):
+    """Atomically writes a month index file, covered being the Fingerprint of the ledger as indexed."""
+    lines = [f"# ledger={fingerprint.encode(covered)}\n"]
+    for (year, month), runs in sorted(months.items()):
+        lines.append(f"{year:04d}-{month:02d}|{' '.join(f'{start}-{end}' for start, end in runs)}\n")
+    with journal.replacing(path) as f:
+        f.writelines(lines)
+
+def _scan(f, months, start):
+    """Adds the complete rows of a ledger opened in binary mode, from byte start on, to months.
+
+    Returns the offset after the last complete row.
+    """
+    # The run ending where the scan starts is extended by rows of the same month
+    last_key = next((key for key, runs in months.items() if runs[-1][1] == start), None)
+    last = months[last_key][-1] if last_key else None
+    f.seek(start)
+    offset = start
+    for raw in f:
+        if not raw.endswith(b"\n"):
+            # Still being written, or torn by a crash; indexed once complete
+            break
+        transaction = decode_record(raw.decode("utf-8"))
+        offset += len(raw)
+        if transaction is None:
+            if last is not None:
+                last[1] = offset
+            continue
+        key = month_key(transaction.date)
+        if key == last_key:
+            last[1] = offset
+        else:
+            last, last_key = [offset - len(raw), offset], key
+            months.setdefault(key, []).append(last)
+    return offset
+
+def sync(ledger_path):
+    """Returns {(year, month): [[start, end], ...]} of a ledger, catching its month index up first if it changed."""
+    path = month_index_path(ledger_path)
+    covered, months = load(path)
+    if fingerprint.is_current(covered, ledger_path):
+        return months
+    try:
+        f = open(ledger_path, "rb")
+    except FileNotFoundError:
+        return {}
+    with f:
+        stat = os.fstat(f.fileno())
+        if fingerprint.compare(covered, f) in (fingerprint.UNCHANGED, fingerprint.APPENDED):
+            start = covered.end
+        else:
+            months, start = {}, 0
+        end = _scan(f, months, start)
+        save(path, fingerprint.take(f, stat, end), months)
+    return months
+
+def read_month(ledger_path, runs, key):
+    """Reads the rows of one month from its runs, in file order."""
+    rows = []
+    with open(ledger_path, "rb") as f:
+        for start, end in runs:
+            f.seek(start)
+            for raw in f.read(end - start).split(b"\n"):
+                transaction = decode_record(raw.decode("utf-8"))
+                if transaction is not None and month_key(transaction.date) == key:
+                    rows.append(transaction)
+    return rows
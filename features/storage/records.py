@@ -0,0 +1,115 @@
+from array import array
+
+from features.storage.codec import Transaction, date_ordinal, ordinal_date
+
+# Transactions held in memory in bulk are stored column by column in typed
+# arrays rather than as one tuple of five objects per row:
+#
+#     dates         array('i')  date ordinals
+#     type_ids      array('H')  ids into TYPES
+#     category_ids  array('I')  ids into CATEGORIES
+#     amounts       array('q')  paisa
+#     descriptions  one UTF-8 bytearray, with array('q') end offsets
+#
+# Type and category ids come from vocabularies shared by every column set, so
+# ids of different ledgers and shards can be compared and merged directly.
+
+class Vocabulary:
+    """Interns strings as small integer ids."""
+
+    __slots__ = ("ids", "values")
+
+    def __init__(self):
+        self.ids = {}
+        self.values = []
+
+    def id(self, value):
+        """Returns the id of a string, assigning the next one on first sight."""
+        try:
+            return self.ids[value]
+        except KeyError:
+            self.ids[value] = len(self.values)
+            self.values.append(value)
+            return len(self.values) - 1
+
+TYPES = Vocabulary()
+CATEGORIES = Vocabulary()
+
+class TransactionColumns:
+    """A compact, append-only sequence of transactions.
+
+    Indexing and iterating give Transaction tuples back, built on the fly, so
+    it can be used wherever a list of transactions was.
+    """
+
+    __slots__ = ("dates", "type_ids", "category_ids", "amounts", "description_ends", "description_heap")
+
+    def __init__(self, transactions=()):
+        self.dates = array("i")
+        self.type_ids = array("H")
+        self.category_ids = array("I")
+        self.amounts = array("q")
+        self.description_ends = array("q")
+        self.description_heap = bytearray()
+        self.extend(transactions)
+
+    def append(self, transaction):
+        """Adds a Transaction at the end."""
+        self.dates.append(date_ordinal(transaction.date))
+        self.type_ids.append(TYPES.id(transaction.type))
+        self.category_ids.append(CATEGORIES.id(transaction.category))
+        self.amounts.append(transaction.amount)
+        self.description_heap += transaction.description.encode("utf-8")
+        self.description_ends.append(len(self.description_heap))
+
+    def extend(self, transactions):
+        """Adds Transactions, or the rows of another TransactionColumns, at the end."""
+        if not isinstance(transactions, TransactionColumns):
+            for transaction in transactions:
+                self.append(transaction)
+            return
+        # Ids are shared, so the columns are copied as they are
+        shift = len(self.description_heap)
+        self.dates.extend(transactions.dates)
+        self.type_ids.extend(transactions.type_ids)
+        self.category_ids.extend(transactions.category_ids)
+        self.amounts.extend(transactions.amounts)
+        self.description_ends.extend(end + shift for end in transactions.description_ends)
+        self.description_heap += transactions.description_heap
+
+    def __len__(self):
+        return len(self.amounts)
+
+    def description(self, row):
+        """Decodes the description of one row."""
+        start = self.description_ends[row - 1] if row else 0
+        return self.description_heap[start:self.description_ends[row]].decode("utf-8")
+
+    def __getitem__(self, row):
+        if row < 0:
+            row += len(self)
+        if not 0 <= row < len(self):
+            raise IndexError("transaction index out of range")
+        return Transaction(
+            ordinal_date(self.dates[row]),
+            TYPES.values[self.type_ids[row]],
+            CATEGORIES.values[self.category_ids[row]],
+            self.description(row),
+            self.amounts[row],
+        )
+
+    def __iter__(self):
+        types, categories, heap = TYPES.values, CATEGORIES.values, self.description_heap
+        start = 0
+        for ordinal, type_id, category_id, amount, end in zip(
+            self.dates, self.type_ids, self.category_ids, self.amounts, self.description_ends
+        ):
+            yield Transaction(
+                ordinal_date(ordinal), types[type_id], categories[category_id], heap[start:end].decode("utf-8"), amount
+            )
+            start = end
+
+    def nbytes(self):
+        """Returns the bytes held by the columns, leaving out the shared vocabularies."""
+        columns = (self.dates, self.type_ids, self.category_ids, self.amounts, self.description_ends)
+        return sum(column.itemsize * len(column) for column in columns) + len(self.description_heap)
@@ -0,0 +1,214 @@
+import calendar
+import os
+from collections import Counter, namedtuple
+from datetime import date, timedelta
+
+from features.instrumentation.instrumentation import count, instrumented
+from features.storage import journal
+from features.storage.codec import Transaction, canonical_date, decode_record, encode_record, escape, split_fields
+from features.storage.storage import RECURRING_FILE, TRANSACTIONS_FILE, append_transactions, ledger_position, transactions_since
+
+# Recurring rules are kept in database/recurring.txt, one per line:
+#
+#     frequency|every|start|end|through|type|category|description|amount_in_paisa
+#
+# A rule repeats its transaction every `every` days, weeks, months or years
+# from its start date, through its end date if it has one. A monthly rule
+# started on the 31st falls on the last day of shorter months. `through` is
+# the rule's watermark, the last day whose occurrences are in the ledger, so
+# only the occurrences after it are ever generated, however long the rule has
+# been running.
+#
+# Materializing appends the due occurrences of every rule in one batch. The
+# batch is first staged in the rules file, next to the advanced watermarks,
+# as lines of
+#
+#     pending|ledger_position|YYYY-MM-DD|type|category|description|amount_in_paisa
+#
+# and cleared once it is in the ledger. A run cut short in between finds the
+# pending lines next time and appends whichever of them didn't reach the
+# ledger, so every occurrence is added exactly once.
+
+FREQUENCIES = ["daily", "weekly", "monthly", "yearly"]
+
+Rule = namedtuple("Rule", [
+    "frequency",    # one of FREQUENCIES
+    "every",        # repeat every this many days, weeks, months or years
+    "start",        # YYYY-MM-DD of the first occurrence
+    "end",          # YYYY-MM-DD after which it stops, or None
+    "through",      # YYYY-MM-DD watermark, or None before the first materialization
+    "type",
+    "category",
+    "description",
+    "amount",       # paisa
+])
+
+PENDING = "pending"
+
+def encode_rule(rule):
+    """Formats a Rule as a line of the rules file."""
+    return (
+        f"{rule.frequency}|{rule.every}|{rule.start}|{rule.end or ''}|{rule.through or ''}"
+        f"|{escape(rule.type)}|{escape(rule.category)}|{escape(rule.description)}|{rule.amount}\n"
+    )
+
+def _decode_rule(line):
+    """Parses a rules file line into a Rule, returning None for malformed lines."""
+    fields = split_fields(line)
+    if len(fields) != 9:
+        return None
+    frequency, every, start, end, through, type, category, description, amount = fields
+    try:
+        rule = Rule(frequency, int(every), start, end or None, through or None, type, category, description, int(amount))
+    except ValueError:
+        return None
+    if frequency not in FREQUENCIES or rule.every < 1 or canonical_date(start) != start:
+        return None
+    return rule
+
+def load(path=RECURRING_FILE):
+    """Returns (rules, pending) from a rules file, pending being (ledger_position, [Transaction, ...]) or None."""
+    rules = []
+    position, staged = None, []
+    try:
+        f = open(path, "r")
+    except FileNotFoundError:
+        return rules, None
+    with f:
+        for line in f:
+            if line.startswith(PENDING + "|"):
+                _, marker, record = line.split("|", 2)
+                transaction = decode_record(record)
+                if transaction is not None and marker.isdigit():
+                    staged.append(transaction)
+                    position = int(marker)
+                continue
+            rule = _decode_rule(line)
+            if rule is not None:
+                rules.append(rule)
+    return rules, (position, staged) if staged else None
+
+def save(rules, path=RECURRING_FILE, pending=None):
+    """Rewrites a rules file atomically, with a (ledger_position, [Transaction, ...]) batch staged if pending."""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        f.writelines(encode_rule(rule) for rule in rules)
+        if pending:
+            position, transactions = pending
+            f.writelines(f"{PENDING}|{position}|{encode_record(t)}" for t in transactions)
+    if pending:
+        # The staged batch has to survive a crash during the append that follows
+        journal.sync_file(tmp_path)
+    os.replace(tmp_path, path)
+
+def read_rules(path=RECURRING_FILE):
+    """Returns the Rules of a rules file, in the order they were added."""
+    return load(path)[0]
+
+def add_rule(rule, path=RECURRING_FILE):
+    """Validates a Rule and adds it. Raises ValueError on bad input."""
+    if rule.frequency not in FREQUENCIES:
+        raise ValueError(f"Frequency must be one of: {', '.join(FREQUENCIES)}.")
+    if rule.every < 1:
+        raise ValueError("Repeat interval must be at least 1.")
+    for field in (rule.start, rule.end):
+        if field and canonical_date(field) != field:
+            raise ValueError("Invalid date format. Please use YYYY-MM-DD.")
+    if rule.end and rule.end < rule.start:
+        raise ValueError("End date can't be before the start date.")
+    if rule.amount <= 0:
+        raise ValueError("Amount must be positive.")
+    with journal.ledger_lock(path):
+        with open(path, "a") as f:
+            f.write(encode_rule(rule._replace(through=None)))
+
+def remove_rule(number, path=RECURRING_FILE):
+    """Removes the rule at a 1-based position of read_rules() and returns it. Raises ValueError if there is none."""
+    with journal.ledger_lock(path):
+        rules, pending = load(path)
+        if not 1 <= number <= len(rules):
+            raise ValueError(f"There is no recurring rule {number}.")
+        removed = rules.pop(number - 1)
+        save(rules, path, pending)
+    return removed
+
+def occurrence(rule, n):
+    """Returns the date of a rule's n-th occurrence, counting from 0, ignoring its end."""
+    start = date.fromisoformat(rule.start)
+    if rule.frequency in ("daily", "weekly"):
+        return start + timedelta(days=n * rule.every * (7 if rule.frequency == "weekly" else 1))
+    months = n * rule.every * (12 if rule.frequency == "yearly" else 1)
+    year, month = divmod(start.month - 1 + months, 12)
+    year += start.year
+    return date(year, month + 1, min(start.day, calendar.monthrange(year, month + 1)[1]))
+
+def _first_after(rule, day):
+    """Returns the number of the first occurrence of a rule after a date, without walking the ones before."""
+    start = date.fromisoformat(rule.start)
+    if day < start:
+        return 0
+    if rule.frequency in ("daily", "weekly"):
+        return (day - start).days // (rule.every * (7 if rule.frequency == "weekly" else 1)) + 1
+    step = rule.every * (12 if rule.frequency == "yearly" else 1)
+    n = ((day.year - start.year) * 12 + day.month - start.month) // step
+    while occurrence(rule, n) <= day:
+        n += 1
+    return n
+
+def due(rule, today):
+    """Returns the dates of a rule's occurrences after its watermark, up to today."""
+    last = min(today, date.fromisoformat(rule.end)) if rule.end else today
+    n = _first_after(rule, date.fromisoformat(rule.through)) if rule.through else 0
+    dates = []
+    while (day := occurrence(rule, n)) <= last:
+        dates.append(day.isoformat())
+        n += 1
+    return dates
+
+def _append_missing(pending, ledger):
+    """Appends the staged transactions that aren't in the ledger after their recorded position yet."""
+    position, staged = pending
+    present = Counter(transactions_since(position, ledger))
+    missing = []
+    for transaction in staged:
+        if present[transaction]:
+            present[transaction] -= 1
+        else:
+            missing.append(transaction)
+    if missing:
+        append_transactions(missing, ledger)
+    return len(missing)
+
+@instrumented("recurring.materialize")
+def materialize(today=None, path=RECURRING_FILE, ledger=TRANSACTIONS_FILE):
+    """Appends every occurrence that came due since the rules' watermarks, in one batch.
+
+    Returns the number of transactions appended. Cheap enough to run on every
+    start: with nothing due, it only reads the rules file.
+    """
+    if not os.path.exists(path):
+        return 0
+    today = today or date.today()
+    with journal.ledger_lock(path):
+        rules, pending = load(path)
+        appended = 0
+        if pending:
+            appended += _append_missing(pending, ledger)
+            save(rules, path)
+
+        batch = []
+        for rule in rules:
+            batch.extend(
+                Transaction(day, rule.type, rule.category, rule.description, rule.amount)
+                for day in due(rule, today)
+            )
+        if batch:
+            batch.sort(key=lambda t: t.date)
+            through = today.isoformat()
+            rules = [rule._replace(through=max(rule.through or through, through)) for rule in rules]
+            save(rules, path, (ledger_position(ledger), batch))
+            append_transactions(batch, ledger)
+            save(rules, path)
+            appended += len(batch)
+        count(rows=appended)
+    return appended
@@ -0,0 +1,124 @@
+import os
+import sys
+
+from features.storage import fingerprint, journal
+from features.storage.codec import decode_record, month_key
+
+# The rollup stores month x type x category sums of a ledger in a small text
+# file next to it:
+#
+#     # ledger=<fingerprint of the ledger as summed: size,mtime_ns,inode,end,head,tail>
+#     YYYY-MM|type|category|amount
+#
+# Rollups written before the fingerprint, with a "# ledger_size=" header, are
+# treated as stale and summed again.
+
+_cache = {}
+
+def rollup_path(ledger_path):
+    """Returns the rollup file that belongs to a ledger file."""
+    return os.path.join(os.path.dirname(ledger_path), "rollup.txt")
+
+def add(totals, key, transaction):
+    """Adds a Transaction to the (year, month) bucket of a totals dict."""
+    month_totals = totals.setdefault(key, {})
+    total_key = (transaction.type, transaction.category)
+    month_totals[total_key] = month_totals.get(total_key, 0) + transaction.amount
+
+def load(path):
+    """Returns (ledger Fingerprint, totals) from a rollup file, or (None, {}) if it doesn't exist."""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None, {}
+    signature = (stat.st_size, stat.st_mtime_ns)
+    cached = _cache.get(path)
+    if cached and cached[0] == signature:
+        return cached[1], cached[2]
+
+    covered = None
+    totals = {}
+    with open(path, "r") as f:
+        for line in f:
+            line = line.strip()
+            if line.startswith("# ledger="):
+                covered = fingerprint.decode(line.split("=", 1)[1])
+            elif line.startswith("#"):
+                continue
+            elif line:
+                month, type, category, amount = line.split("|")
+                key = (int(month[:4]), int(month[5:7]))
+                totals.setdefault(key, {})[(type, category)] = int(amount)
+    _cache[path] = (signature, covered, totals)
+    return covered, totals
+
+def save(path, covered, totals):
+    """Atomically writes the rollup file, covered being the Fingerprint of the ledger as summed."""
+    lines = [f"# ledger={fingerprint.encode(covered)}\n"]
+    for (year, month), month_totals in sorted(totals.items()):
+        for (type, category), amount in sorted(month_totals.items()):
+            lines.append(f"{year:04d}-{month:02d}|{type}|{category}|{amount}\n")
+    with journal.replacing(path) as f:
+        f.writelines(lines)
+        f.flush()
+        # Our own file's stat, even if another process swaps in its rollup right after
+        stat = os.fstat(f.fileno())
+    _cache[path] = ((stat.st_size, stat.st_mtime_ns), covered, totals)
+
+def scan(f, totals, start=0):
+    """Adds the complete rows of a ledger opened in binary mode, from byte start on, to totals.
+
+    Returns the offset after the last complete row.
+    """
+    f.seek(start)
+    offset = start
+    for raw in f:
+        if not raw.endswith(b"\n"):
+            # Still being written, or torn by a crash; summed once complete
+            break
+        transaction = decode_record(raw.decode("utf-8"))
+        if transaction is not None:
+            add(totals, month_key(transaction.date), transaction)
+        offset += len(raw)
+    return offset
+
+def sync(ledger_path, path):
+    """Returns the totals of a ledger from its rollup file, catching the file up first if the ledger changed.
+
+    Only the rows appended since the rollup was saved are read, unless the
+    ledger was rewritten, in which case it is summed again from the start.
+    """
+    covered, totals = load(path)
+    if fingerprint.is_current(covered, ledger_path):
+        return totals
+    try:
+        f = open(ledger_path, "rb")
+    except FileNotFoundError:
+        return {}
+    with f:
+        stat = os.fstat(f.fileno())
+        if fingerprint.compare(covered, f) == fingerprint.APPENDED:
+            totals = {key: dict(month_totals) for key, month_totals in totals.items()}
+            start = covered.end
+        else:
+            totals, start = {}, 0
+        end = scan(f, totals, start)
+        save(path, fingerprint.take(f, stat, end), totals)
+    return totals
+
+if __name__ == "__main__":
+    from features.storage.storage import TRANSACTIONS_FILE, rebuild_rollup, verify_rollup
+
+    usage = "Usage: python -m features.storage.rollup [verify|rebuild]"
+    if len(sys.argv) != 2 or sys.argv[1] not in ("verify", "rebuild"):
+        print(usage)
+        sys.exit(1)
+    if sys.argv[1] == "rebuild":
+        rebuild_rollup()
+        print(f"Rebuilt {rollup_path(TRANSACTIONS_FILE)}")
+    else:
+        mismatched = verify_rollup()
+        if mismatched:
+            print("Rollup out of date for: " + ", ".join(f"{y:04d}-{m:02d}" for y, m in mismatched))
+            sys.exit(1)
+        print("Rollup matches the ledger.")
@@ -0,0 +1,304 @@
+import heapq
+import json
+import os
+import re
+import sys
+import threading
+from array import array
+from bisect import bisect_left
+from collections import Counter, namedtuple
+
+from features.instrumentation.instrumentation import count, stage
+from features.storage import fingerprint, journal
+from features.storage.codec import date_ordinal, decode_record
+from features.storage.records import Vocabulary
+
+# A ledger's search index lives next to it as <ledger>.search, e.g.
+# database/transactions.search, in one binary file:
+#
+#     FTSIDX2\n
+#     {"ledger": ..., "rows": ..., "tokens": [...], ...}\n
+#     offsets, dates, type_ids, category_ids, posting_ends, postings
+#
+# Row n of the index is the n-th valid row of the ledger, found at offsets[n].
+# The dates, types and categories of every row are kept as facets, and the
+# postings of token i are the rows postings[posting_ends[i - 1]:posting_ends[i]]
+# whose description contains it. "ledger" is the encoded fingerprint of the
+# ledger the snapshot covers. Rows appended after the snapshot are indexed
+# from the ledger's tail when the index is opened, and the snapshot is
+# rewritten once enough of them piled up; any other change to the ledger
+# rebuilds the index.
+
+MAGIC = b"FTSIDX2\n"
+# Rows indexed from the ledger's tail after which the snapshot is rewritten
+SNAPSHOT_ROWS = 10_000
+DEFAULT_LIMIT = 50
+
+SearchResult = namedtuple("SearchResult", ["transactions", "total", "categories"])
+
+_TOKEN = re.compile(r"[^\W_]+")
+
+def tokenize(text):
+    """Splits text into lowercase words, the way queries and descriptions are matched."""
+    return _TOKEN.findall(text.casefold())
+
+def index_path(ledger_path):
+    """Returns the search index file that belongs to a ledger file."""
+    return os.path.splitext(ledger_path)[0] + ".search"
+
+class SearchIndex:
+    """Inverted index over the descriptions of one ledger file, with date, type and category facets."""
+
+    def __init__(self, path):
+        self.path = path
+        self._reset()
+        self._load()
+
+    def _reset(self):
+        self.fingerprint = None   # of the ledger, up to the bytes indexed
+        self.offsets = array("q")
+        self.dates = array("i")   # date ordinals
+        self.type_ids = array("H")
+        self.category_ids = array("I")
+        self.types = Vocabulary()
+        self.categories = Vocabulary()
+        self.tokens = []          # snapshot tokens, sorted
+        self.posting_ends = array("q")
+        self.postings = array("i")
+        self.delta = {}           # token -> array of rows indexed after the snapshot
+        self.snapshot_rows = 0
+
+    def _load(self):
+        try:
+            f = open(index_path(self.path), "rb")
+        except FileNotFoundError:
+            return
+        with stage("search.load"), f:
+            if f.readline() != MAGIC:
+                return
+            header = json.loads(f.readline())
+            rows, postings = header["rows"], header["postings"]
+            columns = [
+                (self.offsets, rows),
+                (self.dates, rows),
+                (self.type_ids, rows),
+                (self.category_ids, rows),
+                (self.posting_ends, len(header["tokens"])),
+                (self.postings, postings),
+            ]
+            try:
+                for column, length in columns:
+                    column.fromfile(f, length)
+            except EOFError:
+                # A snapshot cut short; start over from the ledger
+                self._reset()
+                return
+            self.fingerprint = fingerprint.decode(header["ledger"])
+            self.tokens = header["tokens"]
+            for value in header["types"]:
+                self.types.id(value)
+            for value in header["categories"]:
+                self.categories.id(value)
+            self.snapshot_rows = rows
+            count(rows=rows, bytes=f.tell())
+
+    def refresh(self):
+        """Indexes rows appended to the ledger since the last refresh, or rebuilds after a rewrite."""
+        if fingerprint.is_current(self.fingerprint, self.path):
+            return
+        try:
+            f = open(self.path, "rb")
+        except FileNotFoundError:
+            self._reset()
+            return
+        with stage("search.refresh"), f:
+            stat = os.fstat(f.fileno())
+            if fingerprint.compare(self.fingerprint, f) not in (fingerprint.UNCHANGED, fingerprint.APPENDED):
+                self._reset()
+            covered = self.fingerprint.end if self.fingerprint else 0
+            f.seek(covered)
+            offset = covered
+            for raw in f:
+                if not raw.endswith(b"\n"):
+                    # Still being written, or torn by a crash
+                    break
+                self._add(offset, raw)
+                offset += len(raw)
+            count(rows=len(self.offsets) - self.snapshot_rows, bytes=offset - covered)
+            self.fingerprint = fingerprint.take(f, stat, offset)
+        if len(self.offsets) - self.snapshot_rows >= SNAPSHOT_ROWS or (self.offsets and not self.snapshot_rows):
+            self.save()
+
+    def _add(self, offset, raw):
+        transaction = decode_record(raw.decode("utf-8"))
+        if transaction is None:
+            return
+        row = len(self.offsets)
+        self.offsets.append(offset)
+        self.dates.append(date_ordinal(transaction.date))
+        self.type_ids.append(self.types.id(transaction.type))
+        self.category_ids.append(self.categories.id(transaction.category))
+        for token in set(tokenize(transaction.description)):
+            rows = self.delta.get(token)
+            if rows is None:
+                rows = self.delta[token] = array("i")
+            rows.append(row)
+
+    def save(self):
+        """Writes the whole index as a new snapshot, atomically."""
+        with stage("search.save"):
+            merged = {token: self._snapshot_postings(i) for i, token in enumerate(self.tokens)}
+            for token, rows in self.delta.items():
+                if token in merged:
+                    merged[token] = merged[token] + rows
+                else:
+                    merged[token] = rows
+            tokens = sorted(merged)
+            postings = array("i")
+            posting_ends = array("q")
+            for token in tokens:
+                postings.extend(merged[token])
+                posting_ends.append(len(postings))
+
+            header = {
+                "ledger": fingerprint.encode(self.fingerprint) if self.fingerprint else "",
+                "rows": len(self.offsets),
+                "postings": len(postings),
+                "tokens": tokens,
+                "types": self.types.values,
+                "categories": self.categories.values,
+            }
+            # Searches in other processes may save a snapshot of the same ledger at the same time
+            with journal.replacing(index_path(self.path), "wb") as f:
+                f.write(MAGIC)
+                f.write(json.dumps(header).encode("utf-8") + b"\n")
+                for column in (self.offsets, self.dates, self.type_ids, self.category_ids, posting_ends, postings):
+                    column.tofile(f)
+            count(rows=len(self.offsets))
+        self.tokens, self.postings, self.posting_ends = tokens, postings, posting_ends
+        self.delta = {}
+        self.snapshot_rows = len(self.offsets)
+
+    def _snapshot_postings(self, i):
+        return self.postings[self.posting_ends[i - 1] if i else 0:self.posting_ends[i]]
+
+    def _prefix_rows(self, prefix):
+        """Returns the set of rows whose description has a word starting with prefix."""
+        rows = set()
+        i = bisect_left(self.tokens, prefix)
+        while i < len(self.tokens) and self.tokens[i].startswith(prefix):
+            rows.update(self._snapshot_postings(i))
+            i += 1
+        for token, delta_rows in self.delta.items():
+            if token.startswith(prefix):
+                rows.update(delta_rows)
+        return rows
+
+    def matches(self, query, start=None, end=None, type=None, category=None):
+        """Returns the rows matching every word of a query as a prefix, and the facets given.
+
+        start and end are inclusive YYYY-MM-DD dates, category is one category or a list of them.
+        """
+        words = tokenize(query)
+        if not words:
+            return []
+        candidates = None
+        # Rarest-looking words first, so the intersection shrinks early
+        for word in sorted(set(words), key=len, reverse=True):
+            rows = self._prefix_rows(word)
+            candidates = rows if candidates is None else candidates & rows
+            if not candidates:
+                return []
+
+        if not (start or end or type or category):
+            return list(candidates)
+        first = date_ordinal(start) if start else None
+        last = date_ordinal(end) if end else None
+        type_id = self.types.ids.get(type, -1) if type else None
+        if category:
+            names = [category] if isinstance(category, str) else category
+            category_ids = {self.categories.ids[name] for name in names if name in self.categories.ids}
+        else:
+            category_ids = None
+        matched = []
+        for row in candidates:
+            day = self.dates[row]
+            if first is not None and day < first or last is not None and day > last:
+                continue
+            if type_id is not None and self.type_ids[row] != type_id:
+                continue
+            if category_ids is not None and self.category_ids[row] not in category_ids:
+                continue
+            matched.append(row)
+        return matched
+
+    def newest(self, rows, limit):
+        """Returns the limit newest of the given rows as (date ordinal, row) pairs, newest first."""
+        # Going through the rows backwards makes later entries of a day win ties
+        newest = heapq.nlargest(limit, sorted(rows, reverse=True), key=self.dates.__getitem__)
+        return [(self.dates[row], row) for row in newest]
+
+    def category_counts(self, rows):
+        """Returns {category: number of rows} of the given rows."""
+        counts = Counter(map(self.category_ids.__getitem__, rows))
+        return {self.categories.values[category_id]: n for category_id, n in counts.items()}
+
+    def read(self, rows):
+        """Reads the transactions of the given rows."""
+        transactions = []
+        with open(self.path, "rb") as f:
+            for row in rows:
+                f.seek(self.offsets[row])
+                transactions.append(decode_record(f.readline().decode("utf-8")))
+        return transactions
+
+_indexes = {}
+# The dashboard searches from several sessions' threads at once
+_lock = threading.RLock()
+
+def get_search_index(path):
+    """Returns the up-to-date search index of a ledger file."""
+    with _lock:
+        index = _indexes.get(path)
+        if index is None:
+            index = _indexes[path] = SearchIndex(path)
+        index.refresh()
+        return index
+
+def search_files(paths, query, start=None, end=None, type=None, category=None, limit=DEFAULT_LIMIT):
+    """Searches several ledger files, returning a SearchResult of the newest limit matches.
+
+    categories counts the matches per category, over all matches rather than
+    only the ones returned.
+    """
+    with stage("search.query"), _lock:
+        newest = []
+        total = 0
+        categories = {}
+        for position, path in enumerate(paths):
+            index = get_search_index(path)
+            rows = index.matches(query, start, end, type, category)
+            total += len(rows)
+            for name, matches in index.category_counts(rows).items():
+                categories[name] = categories.get(name, 0) + matches
+            # Later files hold later entries, so they win ties on the same day
+            newest.extend((day, position, row, index) for day, row in index.newest(rows, limit))
+        newest.sort(key=lambda match: match[:3], reverse=True)
+
+        transactions = [index.read([row])[0] for _, _, row, index in newest[:limit]]
+        count(rows=total)
+    return SearchResult(transactions, total, categories)
+
+if __name__ == "__main__":
+    from features.storage.storage import TRANSACTIONS_FILE
+
+    if sys.argv[1:] != ["rebuild"]:
+        print("Usage: python -m features.storage.search_index rebuild")
+        sys.exit(1)
+    try:
+        os.remove(index_path(TRANSACTIONS_FILE))
+    except FileNotFoundError:
+        pass
+    index = get_search_index(TRANSACTIONS_FILE)
+    index.save()
+    print(f"Indexed {len(index.offsets)} rows into {index_path(TRANSACTIONS_FILE)}")
@@ -0,0 +1,260 @@
+import glob
+import os
+import sys
+from datetime import date
+
+from features.storage import fingerprint, journal, rollup
+from features.storage.codec import decode_record, month_key
+from features.storage.storage import SHARDS_DIR, TRANSACTIONS_FILE, file_signature
+
+# Archived ledger shards live next to the live ledger as database/shards/*.txt,
+# one file per year (2023.txt) or per account (savings-2024.txt), in the same
+# record format. New transactions are still appended to the live ledger; the
+# shards are read-only history that every aggregation adds on top of it.
+#
+# Each shard keeps its monthly sums in a sibling <name>.rollup file and its
+# daily sums in <name>.daily, both headed by the fingerprint of the shard they
+# were summed from, so an unchanged archive is never parsed twice. Stale
+# shards are aggregated in a process pool and the per-shard partial sums are
+# merged in shard order.
+#
+# archive() writes every shard it adds to, and then the live ledger, through
+# a synced temporary file swapped in with os.replace. Before touching any
+# shard it records the live ledger's inode and each shard's size in
+# shards/.archive; the marker is removed once the new ledger is on disk. A
+# run cut short in between is finished or undone by recover_archive(): if the
+# ledger wasn't replaced yet, the shards are cut back to their old sizes, so
+# archiving again never copies a row twice.
+
+# Worker processes for shard aggregation, 0 means one per CPU
+WORKERS = int(os.environ.get("FINANCE_TRACKER_WORKERS", "0"))
+
+# Daily sums already read in this process, by shard path: (shard Fingerprint, totals)
+_daily_cache = {}
+
+def shard_paths(directory=SHARDS_DIR):
+    """Returns the shard files of a directory in a stable order."""
+    return sorted(glob.glob(os.path.join(directory, "*.txt")))
+
+def shard_rollup_path(path):
+    """Returns the file holding a shard's monthly sums."""
+    return os.path.splitext(path)[0] + ".rollup"
+
+def shard_daily_path(path):
+    """Returns the file holding a shard's daily sums."""
+    return os.path.splitext(path)[0] + ".daily"
+
+def archive_marker_path(directory=SHARDS_DIR):
+    """Returns the file that marks an archive() in progress."""
+    return os.path.join(directory, ".archive")
+
+def may_match(path, start=None, end=None, type=None, category=None):
+    """Checks a shard's rollup for a month, type and category the filters let through.
+
+    Returns True for a shard without an up-to-date rollup, which has to be read to tell.
+    """
+    covered, totals = rollup.load(shard_rollup_path(path))
+    if not fingerprint.is_current(covered, path):
+        return True
+    first = month_key(start) if start else None
+    last = month_key(end) if end else None
+    categories = {category} if isinstance(category, str) else set(category or ())
+    for key, month in totals.items():
+        if (first and key < first) or (last and key > last):
+            continue
+        for row_type, row_category in month:
+            if (not type or row_type == type) and (not categories or row_category in categories):
+                return True
+    return False
+
+def signature(directory=SHARDS_DIR):
+    """Returns the (path, size, mtime) of every shard, which changes whenever any shard does."""
+    return tuple((path,) + (file_signature(path) or ()) for path in shard_paths(directory))
+
+def map_shards(func, paths):
+    """Applies func to every shard path, in a process pool when more than one worker helps.
+
+    Results come back in the order of paths, whatever order the workers finish in.
+    """
+    workers = min(WORKERS or os.cpu_count() or 1, len(paths))
+    if workers <= 1:
+        return [func(path) for path in paths]
+    # Imported lazily so CLI commands that never touch shards start fast
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(workers) as pool:
+        return list(pool.map(func, paths))
+
+def _monthly_partial(path):
+    """Sums one shard per month and persists the sums next to it."""
+    return rollup.sync(path, shard_rollup_path(path))
+
+def _load_daily(path):
+    """Returns (shard Fingerprint, totals) from a shard's daily sums file, or (None, {}) if it doesn't exist."""
+    try:
+        f = open(shard_daily_path(path), "r")
+    except FileNotFoundError:
+        return None, {}
+    covered, totals = None, {}
+    with f:
+        for line in f:
+            line = line.strip()
+            if line.startswith("# ledger="):
+                covered = fingerprint.decode(line.split("=", 1)[1])
+            elif line:
+                day, type, category, amount = line.split("|")
+                totals[(day, type, category)] = int(amount)
+    return covered, totals
+
+def _daily_partial(path):
+    """Sums one shard per day and persists the sums next to it. Returns (shard Fingerprint, totals)."""
+    totals = {}
+    with open(path, "rb") as f:
+        stat = os.fstat(f.fileno())
+        offset = 0
+        for raw in f:
+            if not raw.endswith(b"\n"):
+                break
+            transaction = decode_record(raw.decode("utf-8"))
+            if transaction is not None:
+                key = (transaction.date, transaction.type, transaction.category)
+                totals[key] = totals.get(key, 0) + transaction.amount
+            offset += len(raw)
+        covered = fingerprint.take(f, stat, offset)
+    lines = [f"# ledger={fingerprint.encode(covered)}\n"]
+    lines.extend(f"{day}|{type}|{category}|{amount}\n" for (day, type, category), amount in sorted(totals.items()))
+    # Also run by readers that don't hold the ledger lock, so through a uniquely named file
+    with journal.replacing(shard_daily_path(path)) as f:
+        f.writelines(lines)
+    return covered, totals
+
+def monthly_totals(directory=SHARDS_DIR):
+    """Returns {(year, month): {(type, category): amount}} summed over every shard."""
+    paths = shard_paths(directory)
+    partials = {}
+    stale = []
+    for path in paths:
+        covered, totals = rollup.load(shard_rollup_path(path))
+        if fingerprint.is_current(covered, path):
+            partials[path] = totals
+        else:
+            stale.append(path)
+    for path, totals in zip(stale, map_shards(_monthly_partial, stale)):
+        partials[path] = totals
+
+    merged = {}
+    for path in paths:
+        for key, month_totals in partials[path].items():
+            merged_month = merged.setdefault(key, {})
+            for total_key, amount in month_totals.items():
+                merged_month[total_key] = merged_month.get(total_key, 0) + amount
+    return merged
+
+def daily_totals(directory=SHARDS_DIR):
+    """Returns {(date, type, category): amount} summed over every shard."""
+    paths = shard_paths(directory)
+    stale = []
+    for path in paths:
+        partial = _daily_cache.get(path) or _load_daily(path)
+        if fingerprint.is_current(partial[0], path):
+            _daily_cache[path] = partial
+        else:
+            stale.append(path)
+    for path, partial in zip(stale, map_shards(_daily_partial, stale)):
+        _daily_cache[path] = partial
+
+    merged = {}
+    for path in paths:
+        for key, amount in _daily_cache[path][1].items():
+            merged[key] = merged.get(key, 0) + amount
+    return merged
+
+def _replace_synced(path, data):
+    """Atomically replaces a file with bytes that are on disk before it is swapped in."""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+def recover_archive(path=TRANSACTIONS_FILE, directory=SHARDS_DIR):
+    """Finishes or undoes an archive() cut short by a crash. Returns True if there was one.
+
+    If the live ledger wasn't replaced yet it still holds every row, so the
+    shards are cut back to their sizes from before the archive.
+    """
+    marker = archive_marker_path(directory)
+    try:
+        with open(marker, "r") as f:
+            lines = f.read().splitlines()
+    except FileNotFoundError:
+        return False
+    state = fingerprint.state(path)
+    if lines and state is not None and lines[0] == f"# ledger_inode={state[2]}":
+        for line in lines[1:]:
+            name, _, size = line.rpartition("|")
+            shard = os.path.join(directory, name)
+            if int(size):
+                with open(shard, "r+b") as f:
+                    f.truncate(int(size))
+            elif os.path.exists(shard):
+                os.remove(shard)
+    os.remove(marker)
+    return True
+
+def archive(before_year, path=TRANSACTIONS_FILE, directory=SHARDS_DIR):
+    """Moves rows dated before a year out of the live ledger into one shard per year.
+
+    Returns the number of rows moved. Rows that don't parse stay in the ledger.
+    Safe to run again after a crash, see recover_archive().
+    """
+    # Held from the read to the replace, so a row appended meanwhile by another process isn't lost
+    with journal.ledger_lock(path):
+        return _archive(before_year, path, directory)
+
+def _archive(before_year, path, directory):
+    recover_archive(path, directory)
+    state = fingerprint.state(path)
+    try:
+        with open(path, "r") as f:
+            lines = f.readlines()
+    except FileNotFoundError:
+        return 0
+
+    kept = []
+    by_year = {}
+    for line in lines:
+        transaction = decode_record(line)
+        if transaction is not None and int(transaction.date[:4]) < before_year:
+            by_year.setdefault(transaction.date[:4], []).append(line if line.endswith("\n") else line + "\n")
+        else:
+            kept.append(line)
+    if not by_year:
+        return 0
+
+    os.makedirs(directory, exist_ok=True)
+    shards = {}
+    for year in sorted(by_year):
+        try:
+            with open(os.path.join(directory, f"{year}.txt"), "rb") as f:
+                shards[year] = f.read()
+        except FileNotFoundError:
+            shards[year] = b""
+    marker = [f"# ledger_inode={state[2]}\n"] + [f"{year}.txt|{len(data)}\n" for year, data in shards.items()]
+    _replace_synced(archive_marker_path(directory), "".join(marker).encode("utf-8"))
+
+    for year, data in shards.items():
+        _replace_synced(os.path.join(directory, f"{year}.txt"), data + "".join(by_year[year]).encode("utf-8"))
+    _replace_synced(path, "".join(kept).encode("utf-8"))
+    journal.sync_dir(directory)
+    journal.sync_dir(os.path.dirname(path) or ".")
+    os.remove(archive_marker_path(directory))
+    return sum(len(year_lines) for year_lines in by_year.values())
+
+if __name__ == "__main__":
+    usage = "Usage: python -m features.storage.shards archive [YEAR]"
+    if not sys.argv[1:] or sys.argv[1] != "archive" or len(sys.argv) > 3:
+        print(usage)
+        sys.exit(1)
+    year = int(sys.argv[2]) if len(sys.argv) == 3 else date.today().year
+    print(f"Moved {archive(year)} rows dated before {year} into {SHARDS_DIR}")
@@ -0,0 +1,288 @@
+import sqlite3
+import sys
+import threading
+from datetime import date
+
+from features.storage.budget_store import check_month, current_month
+from features.storage.codec import Transaction
+
+SQLITE_FILE = "database/finance.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS transactions (
+    id INTEGER PRIMARY KEY,
+    date TEXT NOT NULL,
+    type TEXT NOT NULL,
+    category TEXT NOT NULL,
+    description TEXT NOT NULL,
+    amount INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_transactions_date ON transactions (date);
+CREATE INDEX IF NOT EXISTS idx_transactions_type_date ON transactions (type, date);
+CREATE INDEX IF NOT EXISTS idx_transactions_category_date ON transactions (category, date);
+CREATE TABLE IF NOT EXISTS budgets (
+    month TEXT NOT NULL DEFAULT '0000-00',
+    period TEXT NOT NULL DEFAULT 'monthly',
+    category TEXT NOT NULL,
+    amount INTEGER NOT NULL,
+    PRIMARY KEY (period, category, month)
+);
+"""
+
+# Budgets from databases created before budgets had a month (and maybe a
+# period) are kept as budgets set before any month
+MIGRATE_BUDGETS = """
+ALTER TABLE budgets RENAME TO budgets_before_history;
+CREATE TABLE budgets (
+    month TEXT NOT NULL DEFAULT '0000-00',
+    period TEXT NOT NULL DEFAULT 'monthly',
+    category TEXT NOT NULL,
+    amount INTEGER NOT NULL,
+    PRIMARY KEY (period, category, month)
+);
+INSERT INTO budgets (period, category, amount) SELECT {period}, category, amount FROM budgets_before_history;
+DROP TABLE budgets_before_history;
+"""
+
+# Full-text index of descriptions, kept in step with the transactions table by triggers
+SEARCH_SCHEMA = """
+CREATE VIRTUAL TABLE transactions_fts USING fts5(
+    description, content='transactions', content_rowid='id', tokenize='unicode61 remove_diacritics 0'
+);
+CREATE TRIGGER transactions_fts_insert AFTER INSERT ON transactions BEGIN
+    INSERT INTO transactions_fts (rowid, description) VALUES (new.id, new.description);
+END;
+CREATE TRIGGER transactions_fts_delete AFTER DELETE ON transactions BEGIN
+    INSERT INTO transactions_fts (transactions_fts, rowid, description) VALUES ('delete', old.id, old.description);
+END;
+INSERT INTO transactions_fts (transactions_fts) VALUES ('rebuild');
+"""
+
+_local = threading.local()
+
+def connect(path=SQLITE_FILE):
+    """Returns this thread's connection, creating the schema on first use.
+
+    WAL mode lets the dashboard read while the CLI writes.
+    """
+    connections = getattr(_local, "connections", None)
+    if connections is None:
+        connections = _local.connections = {}
+    connection = connections.get(path)
+    if connection is None:
+        connection = sqlite3.connect(path, timeout=10)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.executescript(SCHEMA)
+        columns = [row[1] for row in connection.execute("PRAGMA table_info(budgets)")]
+        if "month" not in columns:
+            connection.executescript(MIGRATE_BUDGETS.format(period="period" if "period" in columns else "'monthly'"))
+        has_search = connection.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'transactions_fts'"
+        ).fetchone()
+        if not has_search:
+            try:
+                connection.executescript(SEARCH_SCHEMA)
+            except sqlite3.OperationalError:
+                # SQLite built without FTS5; search() falls back to LIKE
+                connection.rollback()
+        connections[path] = connection
+    return connection
+
+def _month_range(year, month):
+    start = date(year, month, 1)
+    end = date(year + month // 12, month % 12 + 1, 1)
+    return start.isoformat(), end.isoformat()
+
+def has_transactions(path=SQLITE_FILE):
+    return connect(path).execute("SELECT 1 FROM transactions LIMIT 1").fetchone() is not None
+
+def ledger_version(path=SQLITE_FILE):
+    """Returns (row count, highest id), which changes whenever transactions are added or removed."""
+    return connect(path).execute("SELECT COUNT(*), MAX(id) FROM transactions").fetchone()
+
+def read_transactions(path=SQLITE_FILE):
+    rows = connect(path).execute(
+        "SELECT date, type, category, description, amount FROM transactions ORDER BY id"
+    )
+    return [Transaction(*row) for row in rows]
+
+def _filters(start=None, end=None, type=None, category=None):
+    """Returns ([condition, ...], params) for the usual filters; category may be a list."""
+    conditions, params = [], []
+    for clause, value in [("date >= ?", start), ("date <= ?", end), ("type = ?", type)]:
+        if value:
+            conditions.append(clause)
+            params.append(value)
+    if category:
+        names = [category] if isinstance(category, str) else list(category)
+        conditions.append(f"category IN ({', '.join('?' * len(names))})")
+        params.extend(names)
+    return conditions, params
+
+def _iter_ordered(order, start, end, type, category, path):
+    conditions, params = _filters(start, end, type, category)
+    where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+    rows = connect(path).execute(
+        f"SELECT date, type, category, description, amount FROM transactions{where} ORDER BY {order}",
+        params,
+    )
+    for row in rows:
+        yield Transaction(*row)
+
+def iter_newest_first(start=None, end=None, type=None, category=None, path=SQLITE_FILE):
+    """Streams filtered transactions newest first, using the date indexes."""
+    return _iter_ordered("date DESC, id DESC", start, end, type, category, path)
+
+def iter_filtered(start=None, end=None, type=None, category=None, path=SQLITE_FILE):
+    """Streams filtered transactions in the order they were added."""
+    return _iter_ordered("id", start, end, type, category, path)
+
+def month_totals(year, month, path=SQLITE_FILE):
+    """Returns {(type, category): amount} for one month, summed in SQL over the date index."""
+    rows = connect(path).execute(
+        "SELECT type, category, SUM(amount) FROM transactions"
+        " WHERE date >= ? AND date < ? GROUP BY type, category",
+        _month_range(year, month),
+    )
+    return {(type, category): amount for type, category, amount in rows}
+
+def monthly_totals(path=SQLITE_FILE):
+    """Returns {(year, month): {(type, category): amount}} over the whole ledger."""
+    rows = connect(path).execute(
+        "SELECT substr(date, 1, 7), type, category, SUM(amount) FROM transactions"
+        " GROUP BY substr(date, 1, 7), type, category"
+    )
+    totals = {}
+    for month, type, category, amount in rows:
+        totals.setdefault((int(month[:4]), int(month[5:7])), {})[(type, category)] = amount
+    return totals
+
+def search(query, start=None, end=None, type=None, category=None, limit=50, path=SQLITE_FILE):
+    """Returns (newest limit matches, number of matches, {category: matches}) of a description search.
+
+    Every word of the query has to start a word of the description. category
+    is one category or a list of them.
+    """
+    from features.storage.search_index import tokenize
+
+    words = tokenize(query)
+    if not words:
+        return [], 0, {}
+    connection = connect(path)
+    conditions, params = _filters(start, end, type, category)
+    if connection.execute("SELECT 1 FROM sqlite_master WHERE name = 'transactions_fts'").fetchone():
+        conditions.append("id IN (SELECT rowid FROM transactions_fts WHERE transactions_fts MATCH ?)")
+        params.append(" ".join(f'"{word}"*' for word in words))
+    else:
+        for word in words:
+            conditions.append("description LIKE ?")
+            params.append(f"%{word}%")
+    where = " AND ".join(conditions)
+    categories = dict(connection.execute(
+        f"SELECT category, COUNT(*) FROM transactions WHERE {where} GROUP BY category", params
+    ))
+    rows = connection.execute(
+        "SELECT date, type, category, description, amount FROM transactions"
+        f" WHERE {where} ORDER BY date DESC, id DESC LIMIT ?",
+        params + [limit],
+    )
+    return [Transaction(*row) for row in rows], sum(categories.values()), categories
+
+def daily_totals(path=SQLITE_FILE):
+    """Returns {(date, type, category): amount} over the whole ledger."""
+    rows = connect(path).execute(
+        "SELECT date, type, category, SUM(amount) FROM transactions GROUP BY date, type, category"
+    )
+    return {(date, type, category): amount for date, type, category, amount in rows}
+
+def append_transactions(transactions, path=SQLITE_FILE):
+    connection = connect(path)
+    with connection:
+        connection.executemany(
+            "INSERT INTO transactions (date, type, category, description, amount) VALUES (?, ?, ?, ?, ?)",
+            transactions,
+        )
+
+def transactions_since(last_id, path=SQLITE_FILE):
+    """Returns the transactions added after the one with id last_id, in order."""
+    rows = connect(path).execute(
+        "SELECT date, type, category, description, amount FROM transactions WHERE id > ? ORDER BY id", (last_id,)
+    )
+    return [Transaction(*row) for row in rows]
+
+def append_transaction(transaction, path=SQLITE_FILE):
+    append_transactions([transaction], path)
+
+def read_budgets(period="monthly", month=None, path=SQLITE_FILE):
+    """Returns {category: amount} of the budgets in effect for a period in a month (default: this month)."""
+    rows = connect(path).execute(
+        "SELECT category, amount FROM budgets AS b WHERE period = ? AND amount != 0 AND month = ("
+        " SELECT MAX(month) FROM budgets WHERE period = b.period AND category = b.category AND month <= ?)",
+        (period, month or current_month()),
+    )
+    return dict(rows)
+
+def set_budgets(updates, period="monthly", month=None, path=SQLITE_FILE):
+    connection = connect(path)
+    month = month or current_month()
+    check_month(month)
+    with connection:
+        connection.executemany(
+            "INSERT INTO budgets (month, period, category, amount) VALUES (?, ?, ?, ?)"
+            " ON CONFLICT (period, category, month) DO UPDATE SET amount = excluded.amount",
+            [(month, period, category, amount) for category, amount in updates.items()],
+        )
+
+def write_budgets(budgets, period="monthly", month=None, path=SQLITE_FILE):
+    check_month(month or current_month())
+    updates = {category: 0 for category in read_budgets(period, month, path) if category not in budgets}
+    updates.update(budgets)
+    set_budgets(updates, period, month, path)
+
+def budget_history(category, period="monthly", path=SQLITE_FILE):
+    rows = connect(path).execute(
+        "SELECT month, amount FROM budgets WHERE period = ? AND category = ? ORDER BY month",
+        (period, category),
+    )
+    return rows.fetchall()
+
+def import_text_files(path=SQLITE_FILE, force=False):
+    """Copies database/transactions.txt and the whole budgets.txt journal into SQLite. Returns the number of transactions imported.
+
+    Raises ValueError if the database already has transactions, so running the
+    import twice can't duplicate them; with force, they are replaced instead.
+    Everything is copied in one SQLite transaction, so an import that fails
+    halfway leaves the database as it was.
+    """
+    from features.storage import budget_store, storage
+
+    connection = connect(path)
+    with connection:
+        if has_transactions(path):
+            if not force:
+                raise ValueError(f"{path} already has transactions; use --force to replace them.")
+            connection.execute("DELETE FROM transactions")
+            connection.execute("DELETE FROM budgets")
+        imported = connection.executemany(
+            "INSERT INTO transactions (date, type, category, description, amount) VALUES (?, ?, ?, ?, ?)",
+            storage.iter_text_transactions(),
+        ).rowcount
+        connection.executemany(
+            "INSERT INTO budgets (month, period, category, amount) VALUES (?, ?, ?, ?)"
+            " ON CONFLICT (period, category, month) DO UPDATE SET amount = excluded.amount",
+            # Every month's entry, so budget history and past months' budgets carry over
+            budget_store.get_store(storage.BUDGETS_FILE).entries(),
+        )
+    return imported
+
+if __name__ == "__main__":
+    if sys.argv[1:] not in (["import"], ["import", "--force"]):
+        print("Usage: python -m features.storage.sqlite_backend import [--force]")
+        sys.exit(1)
+    try:
+        imported = import_text_files(force=sys.argv[2:] == ["--force"])
+    except ValueError as e:
+        print(e)
+        sys.exit(1)
+    print(f"Imported {imported} transactions into {SQLITE_FILE}")
@@ -0,0 +1,524 @@
+import heapq
+import os
+from array import array
+from datetime import date, timedelta
+from features.instrumentation.instrumentation import count, instrumented, stage
+from features.storage import budget_store, fingerprint, journal, month_index, rollup
+from features.storage.codec import Transaction, decode_record, encode_record, is_legacy_record, month_key
+from features.storage.records import TransactionColumns
+
+TRANSACTIONS_FILE = "database/transactions.txt"
+BUDGETS_FILE = "database/budgets.txt"
+RECURRING_FILE = "database/recurring.txt"
+COLUMNAR_DIR = "database/columnar"
+SHARDS_DIR = "database/shards"
+
+WRITE_BUFFER_BYTES = 1 << 20
+BUDGET_PERIODS = ["weekly", "monthly", "yearly"]
+
+# "text" keeps the ledger in the files above, "sqlite" in database/finance.db
+BACKEND = os.environ.get("FINANCE_TRACKER_BACKEND", "text")
+
+def _sqlite(path, default):
+    """Returns the SQLite backend when it is selected and the default file is requested."""
+    if BACKEND != "sqlite" or path != default:
+        return None
+    from features.storage import sqlite_backend
+    return sqlite_backend
+
+def _shards(path):
+    """Returns the shards module when archived ledger shards sit next to the default ledger."""
+    if path != TRANSACTIONS_FILE or not os.path.isdir(SHARDS_DIR):
+        return None
+    from features.storage import shards
+    return shards
+
+def file_signature(path):
+    """Returns (size, mtime_ns) of a file, or None if it doesn't exist."""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+class LedgerIndex:
+    """Byte-offset index of a ledger file, grouped by month and category.
+
+    The ledger is append-only, so refreshing only parses the bytes added since
+    the last refresh. A file the fingerprint module doesn't see as merely
+    appended to, e.g. one edited in place or replaced, is indexed again from
+    the start.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.fingerprint = None
+        self._reset()
+
+    def _reset(self):
+        self.end = 0          # byte offset up to which the file is indexed
+        self.offsets = array("q")  # every valid row, in file order
+        self.months = {}      # (year, month) -> array of offsets
+        self.categories = {}  # (year, month, category) -> array of offsets
+        self.totals = {}      # (year, month) -> {(type, category): amount}
+        self.daily = {}       # (date, type, category) -> amount
+
+    def refresh(self):
+        """Indexes rows appended since the last refresh, or rebuilds if the file was rewritten."""
+        if fingerprint.is_current(self.fingerprint, self.path):
+            return
+        try:
+            f = open(self.path, "rb")
+        except FileNotFoundError:
+            self._reset()
+            self.fingerprint = None
+            return
+
+        with stage("storage.index_refresh"), f:
+            stat = os.fstat(f.fileno())
+            if fingerprint.compare(self.fingerprint, f) != fingerprint.APPENDED:
+                self._reset()
+            f.seek(self.end)
+            offset = self.end
+            rows_before = len(self.offsets)
+            for raw in f:
+                if not raw.endswith(b"\n"):
+                    # Still being written, or torn by a crash; picked up once complete
+                    break
+                self._add(offset, raw)
+                offset += len(raw)
+            count(rows=len(self.offsets) - rows_before, bytes=offset - self.end)
+            self.end = offset
+            self.fingerprint = fingerprint.take(f, stat, offset)
+
+    def _add(self, offset, raw):
+        transaction = decode_record(raw.decode("utf-8"))
+        if transaction is None:
+            return
+        key = month_key(transaction.date)
+        self.offsets.append(offset)
+        month_offsets = self.months.get(key)
+        if month_offsets is None:
+            month_offsets = self.months[key] = array("q")
+        month_offsets.append(offset)
+        category_key = key + (transaction.category,)
+        category_offsets = self.categories.get(category_key)
+        if category_offsets is None:
+            category_offsets = self.categories[category_key] = array("q")
+        category_offsets.append(offset)
+        rollup.add(self.totals, key, transaction)
+        day_key = (transaction.date, transaction.type, transaction.category)
+        self.daily[day_key] = self.daily.get(day_key, 0) + transaction.amount
+
+    def read(self, offsets):
+        """Reads the rows stored at the given byte offsets."""
+        if not offsets:
+            return []
+        rows = []
+        read = 0
+        with stage("storage.read_rows"), open(self.path, "rb") as f:
+            for offset in offsets:
+                f.seek(offset)
+                raw = f.readline()
+                read += len(raw)
+                rows.append(decode_record(raw.decode("utf-8")))
+            count(rows=len(rows), bytes=read)
+        return rows
+
+_indexes = {}
+
+def get_index(path=TRANSACTIONS_FILE):
+    """Returns the up-to-date index for a ledger file."""
+    index = _indexes.get(path)
+    if index is None:
+        index = _indexes[path] = LedgerIndex(path)
+    index.refresh()
+    return index
+
+def has_transactions(path=TRANSACTIONS_FILE):
+    """Checks whether the ledger holds at least one valid transaction."""
+    db = _sqlite(path, TRANSACTIONS_FILE)
+    if db:
+        found = db.has_transactions()
+    else:
+        # From the persisted rollup, so no process has to index the ledger to ask
+        found = bool(_synced_rollup(path))
+    archived = _shards(path)
+    return found or bool(archived and archived.monthly_totals())
+
+@instrumented("storage.read_transactions")
+def read_transactions(path=TRANSACTIONS_FILE):
+    """Returns every valid transaction in file order, archived shards first, as TransactionColumns."""
+    archived = _shards(path)
+    transactions = TransactionColumns()
+    if archived:
+        for shard in archived.shard_paths():
+            transactions.extend(read_text_transactions(shard))
+    db = _sqlite(path, TRANSACTIONS_FILE)
+    transactions.extend(db.read_transactions() if db else read_text_transactions(path))
+    return transactions
+
+def read_text_transactions(path=TRANSACTIONS_FILE):
+    """Returns every valid transaction of a text ledger in file order, as TransactionColumns."""
+    return TransactionColumns(iter_text_transactions(path))
+
+def iter_text_transactions(path=TRANSACTIONS_FILE):
+    """Yields every valid transaction of a text ledger in file order without holding them all."""
+    try:
+        f = open(path, "r")
+    except FileNotFoundError:
+        return
+    with stage("storage.read_text"), f:
+        rows = 0
+        for line in f:
+            transaction = decode_record(line)
+            if transaction is not None:
+                rows += 1
+                yield transaction
+        count(rows=rows, bytes=f.tell())
+
+def read_month(year, month, category=None, path=TRANSACTIONS_FILE):
+    """Returns only the transactions of one month, optionally for a single category."""
+    index = get_index(path)
+    if category is None:
+        return index.read(index.months.get((year, month)))
+    return index.read(index.categories.get((year, month, category)))
+
+def iter_newest_first(start=None, end=None, type=None, category=None, path=TRANSACTIONS_FILE):
+    """Yields transactions newest first, optionally filtered by date range (YYYY-MM-DD, inclusive), type and category.
+
+    Months are visited from the newest down through the persisted month index
+    and only one month's rows are read at a time, so the first page neither
+    scans nor indexes the whole ledger. Archived shards are merged in by date.
+    """
+    archived = _shards(path)
+    if archived:
+        streams = [_iter_newest_first(start, end, type, category, path)] + [
+            _iter_newest_first(start, end, type, category, shard) for shard in reversed(archived.shard_paths())
+        ]
+        yield from heapq.merge(*streams, key=lambda t: t.date, reverse=True)
+        return
+    yield from _iter_newest_first(start, end, type, category, path)
+
+def _iter_newest_first(start, end, type, category, path):
+    db = _sqlite(path, TRANSACTIONS_FILE)
+    if db:
+        yield from db.iter_newest_first(start, end, type, category)
+        return
+
+    with stage("storage.month_index"):
+        months = month_index.sync(path)
+    first_month = month_key(start) if start else None
+    last_month = month_key(end) if end else None
+    for key in sorted(months, reverse=True):
+        if last_month and key > last_month:
+            continue
+        if first_month and key < first_month:
+            break
+        # Rows are appended in entry order, so reverse first to put the latest entry of a day on top
+        rows = month_index.read_month(path, months[key], key)[::-1]
+        rows.sort(key=lambda t: t.date, reverse=True)
+        for transaction in rows:
+            if (start and transaction.date < start) or (end and transaction.date > end):
+                continue
+            if (type and transaction.type != type) or (category and transaction.category != category):
+                continue
+            yield transaction
+
+def iter_filtered(start=None, end=None, type=None, category=None, path=TRANSACTIONS_FILE):
+    """Yields transactions in ledger order, archived shards first, with the filters of iter_newest_first.
+
+    category may also be a list. Nothing is indexed or held beyond the current
+    row, so memory stays flat however large the ledger grows. Shards whose
+    rollups show no matching month, type or category are skipped unread.
+    """
+    archived = _shards(path)
+    if archived:
+        for shard in archived.shard_paths():
+            if archived.may_match(shard, start, end, type, category):
+                yield from _filter_rows(iter_text_transactions(shard), start, end, type, category)
+    db = _sqlite(path, TRANSACTIONS_FILE)
+    if db:
+        yield from db.iter_filtered(start, end, type, category)
+        return
+    yield from _filter_rows(iter_text_transactions(path), start, end, type, category)
+
+def _filter_rows(transactions, start, end, type, category):
+    categories = {category} if isinstance(category, str) else set(category or ())
+    for transaction in transactions:
+        if (start and transaction.date < start) or (end and transaction.date > end):
+            continue
+        if type and transaction.type != type:
+            continue
+        if categories and transaction.category not in categories:
+            continue
+        yield transaction
+
+@instrumented("storage.month_totals")
+def month_totals(year, month, path=TRANSACTIONS_FILE):
+    """Returns {(type, category): amount} for one month, including archived shards."""
+    totals = _live_month_totals(year, month, path)
+    archived = _shards(path)
+    if archived:
+        for key, amount in archived.monthly_totals().get((year, month), {}).items():
+            totals[key] = totals.get(key, 0) + amount
+    return totals
+
+def monthly_totals(path=TRANSACTIONS_FILE):
+    """Returns {(year, month): {(type, category): amount}} for every month, including archived shards."""
+    db = _sqlite(path, TRANSACTIONS_FILE)
+    if db:
+        totals = db.monthly_totals()
+    else:
+        totals = {key: dict(month_totals) for key, month_totals in _synced_rollup(path).items()}
+    archived = _shards(path)
+    if archived:
+        for key, shard_totals in archived.monthly_totals().items():
+            merged = totals.setdefault(key, {})
+            for total_key, amount in shard_totals.items():
+                merged[total_key] = merged.get(total_key, 0) + amount
+    return totals
+
+def search(query, start=None, end=None, type=None, category=None, limit=50, path=TRANSACTIONS_FILE):
+    """Finds transactions whose description has a word starting with every word of query.
+
+    start and end are inclusive YYYY-MM-DD dates and category is one category
+    or a list of them. Returns a SearchResult with
+    the newest limit matches, the number of matches and the matches per
+    category, including archived shards.
+    """
+    from features.storage import search_index
+
+    paths = []
+    archived = _shards(path)
+    if archived:
+        paths.extend(archived.shard_paths())
+    db = _sqlite(path, TRANSACTIONS_FILE)
+    if not db:
+        paths.append(path)
+    result = search_index.search_files(paths, query, start, end, type, category, limit)
+    if not db:
+        return result
+
+    transactions, total, categories = db.search(query, start, end, type, category, limit)
+    for name, matches in result.categories.items():
+        categories[name] = categories.get(name, 0) + matches
+    # Live rows go first among rows of the same day
+    transactions = sorted(transactions + result.transactions, key=lambda t: t.date, reverse=True)[:limit]
+    return search_index.SearchResult(transactions, total + result.total, categories)
+
+def _live_month_totals(year, month, path):
+    db = _sqlite(path, TRANSACTIONS_FILE)
+    if db:
+        return db.month_totals(year, month)
+    if path == TRANSACTIONS_FILE and os.path.isdir(COLUMNAR_DIR):
+        # Imported lazily so the text ledger works without NumPy
+        from features.storage import columnar
+        if columnar.is_fresh():
+            columns, meta = columnar.open_columnar()
+            start = date(year, month, 1)
+            end = date(year + month // 12, month % 12 + 1, 1)
+            return columnar.category_totals(columns, meta, start, end)
+
+    return dict(_synced_rollup(path).get((year, month), {}))
+
+@instrumented("storage.range_totals")
+def range_totals(start, end, path=TRANSACTIONS_FILE):
+    """Returns {(type, category): amount} from start to end inclusive (dates as date objects).
+
+    Whole months come from month_totals; only the rows of the partly covered
+    months at either end of the range are read.
+    """
+    totals = {}
+    year, month = start.year, start.month
+    while (year, month) <= (end.year, end.month):
+        first = date(year, month, 1)
+        next_year, next_month = year + month // 12, month % 12 + 1
+        last = date(next_year, next_month, 1) - timedelta(days=1)
+        if start <= first and last <= end:
+            part = month_totals(year, month, path)
+        else:
+            part = {}
+            for transaction in iter_newest_first(max(start, first).isoformat(), min(end, last).isoformat(), path=path):
+                key = (transaction.type, transaction.category)
+                part[key] = part.get(key, 0) + transaction.amount
+        for key, amount in part.items():
+            totals[key] = totals.get(key, 0) + amount
+        year, month = next_year, next_month
+    return totals
+
+def daily_totals(path=TRANSACTIONS_FILE):
+    """Returns {(date, type, category): amount} over the whole ledger, including archived shards."""
+    totals = _live_daily_totals(path)
+    archived = _shards(path)
+    if archived:
+        for key, amount in archived.daily_totals().items():
+            totals[key] = totals.get(key, 0) + amount
+    return totals
+
+def _live_daily_totals(path):
+    db = _sqlite(path, TRANSACTIONS_FILE)
+    if db:
+        return db.daily_totals()
+    if path == TRANSACTIONS_FILE and os.path.isdir(COLUMNAR_DIR):
+        from features.storage import columnar
+        if columnar.is_fresh():
+            return columnar.daily_totals(*columnar.open_columnar())
+    return dict(get_index(path).daily)
+
+def ledger_version(path=TRANSACTIONS_FILE):
+    """Returns a value that changes whenever the ledger does, for keying caches."""
+    db = _sqlite(path, TRANSACTIONS_FILE)
+    if db:
+        version = ("sqlite",) + tuple(db.ledger_version())
+    else:
+        version = ("text",) + (file_signature(path) or ())
+    archived = _shards(path)
+    return version + (archived.signature(),) if archived else version
+
+def _synced_rollup(path):
+    """Returns the persisted monthly rollup, catching it up if the ledger changed behind its back."""
+    with stage("storage.rollup_sync"):
+        return rollup.sync(path, rollup_path(path))
+
+def rollup_path(path=TRANSACTIONS_FILE):
+    """Returns the monthly rollup file stored next to a ledger."""
+    return rollup.rollup_path(path)
+
+def rebuild_rollup(path=TRANSACTIONS_FILE):
+    """Recomputes the monthly rollup from the raw ledger."""
+    try:
+        os.remove(rollup_path(path))
+    except FileNotFoundError:
+        pass
+    _synced_rollup(path)
+
+def verify_rollup(path=TRANSACTIONS_FILE):
+    """Compares the monthly rollup with the raw ledger and returns the months that differ."""
+    expected = {}
+    for transaction in iter_text_transactions(path):
+        rollup.add(expected, month_key(transaction.date), transaction)
+    _, stored = rollup.load(rollup_path(path))
+    return sorted(key for key in expected.keys() | stored.keys() if expected.get(key) != stored.get(key))
+
+def migrate_legacy_rows(path=TRANSACTIONS_FILE):
+    """Rewrites old comma-separated rows in the canonical format. Returns the number of rows rewritten.
+
+    The ledger lock is held from the read to the replace, so a row appended
+    meanwhile by another process isn't lost.
+    """
+    with journal.ledger_lock(path):
+        try:
+            with open(path, "r") as f:
+                lines = f.readlines()
+        except FileNotFoundError:
+            return 0
+
+        migrated = 0
+        for i, line in enumerate(lines):
+            if is_legacy_record(line):
+                lines[i] = encode_record(decode_record(line))
+                migrated += 1
+        if migrated:
+            tmp_path = path + ".tmp"
+            with open(tmp_path, "w") as f:
+                f.writelines(lines)
+            os.replace(tmp_path, path)
+    return migrated
+
+def append_transaction(transaction, path=TRANSACTIONS_FILE):
+    """Appends a Transaction to the ledger and updates the monthly rollup."""
+    append_transactions([transaction], path)
+
+def append_transactions(transactions, path=TRANSACTIONS_FILE, fsync=False):
+    """Appends a batch of Transactions with a single write and a single rollup update.
+
+    The ledger's advisory lock is held throughout, so appends from several
+    processes never interleave, and a line torn by an earlier crash is moved
+    aside first. With fsync the data is on disk when this returns.
+    """
+    db = _sqlite(path, TRANSACTIONS_FILE)
+    if db:
+        return db.append_transactions(transactions)
+    with journal.ledger_lock(path):
+        journal.recover_torn_tail(path)
+        covered, totals = rollup.load(rollup_path(path))
+        in_step = fingerprint.is_current(covered, path)
+        with stage("storage.append"), open(path, "a", buffering=WRITE_BUFFER_BYTES) as f:
+            data = "".join(encode_record(transaction) for transaction in transactions)
+            f.write(data)
+            count(rows=len(transactions), bytes=len(data))
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+
+        if in_step:
+            for transaction in transactions:
+                rollup.add(totals, month_key(transaction.date), transaction)
+            with open(path, "rb") as f:
+                stat = os.fstat(f.fileno())
+                # Under the lock, so the ledger ends with this batch
+                rollup.save(rollup_path(path), fingerprint.take(f, stat, stat.st_size), totals)
+        else:
+            _synced_rollup(path)
+
+def ledger_position(path=TRANSACTIONS_FILE):
+    """Returns a marker of the ledger's current end, for transactions_since(): its size, or its highest id on SQLite."""
+    db = _sqlite(path, TRANSACTIONS_FILE)
+    if db:
+        return db.ledger_version()[1] or 0
+    with journal.ledger_lock(path):
+        # A torn line would be moved aside by the next append, shifting where it lands
+        journal.recover_torn_tail(path)
+        return (file_signature(path) or (0,))[0]
+
+def transactions_since(position, path=TRANSACTIONS_FILE):
+    """Returns the transactions appended after a ledger_position(), in order."""
+    db = _sqlite(path, TRANSACTIONS_FILE)
+    if db:
+        return db.transactions_since(position)
+    transactions = []
+    try:
+        f = open(path, "rb")
+    except FileNotFoundError:
+        return transactions
+    with f:
+        f.seek(position)
+        for raw in f:
+            transaction = decode_record(raw.decode("utf-8")) if raw.endswith(b"\n") else None
+            if transaction is not None:
+                transactions.append(transaction)
+    return transactions
+
+def read_budgets(period="monthly", path=BUDGETS_FILE, month=None):
+    """Returns the budgets of one period ("weekly", "monthly" or "yearly") in effect in a month (YYYY-MM, default: this month)."""
+    db = _sqlite(path, BUDGETS_FILE)
+    if db:
+        return db.read_budgets(period, month)
+    return budget_store.get_store(path).get(period, month)
+
+def read_text_budgets(path=BUDGETS_FILE):
+    """Returns this month's budgets of a text budgets file as a {period: {category: amount}} dict."""
+    store = budget_store.get_store(path)
+    return {period: store.get(period) for period in BUDGET_PERIODS if store.get(period)}
+
+def set_budgets(updates, period="monthly", path=BUDGETS_FILE, month=None):
+    """Sets many {category: amount} budgets of one period from a month on (default: this month) in one write."""
+    db = _sqlite(path, BUDGETS_FILE)
+    if db:
+        return db.set_budgets(updates, period, month)
+    budget_store.get_store(path).set_many(updates, period, month)
+
+def write_budgets(budgets, period="monthly", path=BUDGETS_FILE, month=None):
+    """Replaces the budgets of one period with a {category: amount} dict from a month on."""
+    db = _sqlite(path, BUDGETS_FILE)
+    if db:
+        return db.write_budgets(budgets, period, month)
+    budget_store.get_store(path).replace(budgets, period, month)
+
+def budget_history(category, period="monthly", path=BUDGETS_FILE):
+    """Returns [(YYYY-MM, amount)] of every change to one budget, oldest first."""
+    db = _sqlite(path, BUDGETS_FILE)
+    if db:
+        return db.budget_history(category, period)
+    return budget_store.get_store(path).category_history(category, period)
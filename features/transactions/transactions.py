@@ -1,16 +1,56 @@
-import questionary
 from datetime import datetime, timedelta
+from decimal import Decimal, InvalidOperation
+from itertools import islice
 from rich.panel import Panel
 from rich.console import Console
 from rich.table import Table
+from features.instrumentation.instrumentation import instrumented, stage
+from features.storage.codec import canonical_date
+from features.storage.storage import Transaction, append_transaction, has_transactions, iter_newest_first, month_totals, search
 
 EXPENSE_CATEGORIES = ["Food", "Transport", "Shopping", "Bills", "Entertainment", "Health", "Other"]
 INCOME_CATEGORIES = ["Salary", "Freelance", "Business", "Investment", "Gift", "Other"]
+PAGE_SIZE = 20
 
 console = Console()
 
+@instrumented("record_transaction")
+def record_transaction(type, amount_text, category, description, date_str=None, writer=None):
+    """Validates and saves a transaction without prompting. Raises ValueError on bad input.
+
+    With a JournalWriter the transaction is queued for its next group commit instead of appended right away.
+    """
+    if type not in ("expense", "income"):
+        raise ValueError(f"Unknown transaction type '{type}'.")
+    categories = EXPENSE_CATEGORIES if type == "expense" else INCOME_CATEGORIES
+    if category not in categories:
+        raise ValueError(f"Category must be one of: {', '.join(categories)}.")
+    if not description:
+        raise ValueError("Description cannot be empty.")
+    try:
+        amount = int((Decimal(amount_text) * 100).quantize(Decimal(1)))  # Store as paisa/cents
+    except InvalidOperation:
+        raise ValueError(f"Invalid amount '{amount_text}'.")
+    if amount <= 0:
+        raise ValueError("Amount must be positive.")
+    if date_str:
+        date_str = canonical_date(date_str)
+        if date_str is None:
+            raise ValueError("Invalid date format. Please use YYYY-MM-DD.")
+    else:
+        date_str = datetime.now().strftime('%Y-%m-%d')
+
+    transaction = Transaction(date_str, type, category, description, amount)
+    if writer:
+        writer.submit(transaction)
+    else:
+        append_transaction(transaction)
+    return transaction
+
 def add_expense():
     """Adds an expense transaction."""
+    import questionary  # loaded lazily, batch commands never prompt
+
     try:
         amount_str = questionary.text(
             "Enter the expense amount:",
@@ -49,10 +89,7 @@ def add_expense():
                 console.print(Panel("[bold red]Invalid date format. Please use YYYY-MM-DD.[/bold red]", title="Error"))
                 return
 
-        transaction = f"{date.strftime('%Y-%m-%d')}|expense|{category}|{description}|{amount}\n"
-
-        with open("database/transactions.txt", "a") as f:
-            f.write(transaction)
+        append_transaction(Transaction(date.strftime('%Y-%m-%d'), "expense", category, description, amount))
 
         console.print(Panel(f"[bold green]Expense of {amount/100:.2f} in '{category}' added successfully![/bold green]", title="Success"))
 
@@ -63,6 +100,8 @@ def add_expense():
 
 def add_income():
     """Adds an income transaction."""
+    import questionary  # loaded lazily, batch commands never prompt
+
     try:
         amount_str = questionary.text(
             "Enter the income amount:",
@@ -101,10 +140,7 @@ def add_income():
                 console.print(Panel("[bold red]Invalid date format. Please use YYYY-MM-DD.[/bold red]", title="Error"))
                 return
 
-        transaction = f"{date.strftime('%Y-%m-%d')}|income|{category}|{description}|{amount}\n"
-
-        with open("database/transactions.txt", "a") as f:
-            f.write(transaction)
+        append_transaction(Transaction(date.strftime('%Y-%m-%d'), "income", category, description, amount))
 
         console.print(Panel(f"[bold green]Income of {amount/100:.2f} from '{category}' added successfully![/bold green]", title="Success"))
 
@@ -113,47 +149,99 @@ def add_income():
     except Exception as e:
         console.print(Panel(f"[bold red]An error occurred: {e}[/bold red]", title="Error"))
 
-def list_transactions():
-    """Lists all transactions."""
+@instrumented("list_transactions")
+def list_transactions(page=1, page_size=PAGE_SIZE, start=None, end=None, type=None, category=None):
+    """Lists one page of transactions, newest first. Returns True if there are more pages."""
     try:
-        with open("database/transactions.txt", "r") as f:
-            transactions = f.readlines()
-
-        if not transactions:
+        # Only the requested page (plus one row to detect a next page) is read
+        rows = list(islice(
+            iter_newest_first(start, end, type, category),
+            (page - 1) * page_size,
+            page * page_size + 1,
+        ))
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+
+        if not rows:
             console.print(Panel("[bold yellow]No transactions found.[/bold yellow]", title="Transactions"))
-            return
+            return False
 
-        table = Table(title="Transactions")
-        table.add_column("Date", style="cyan")
-        table.add_column("Type", style="magenta")
-        table.add_column("Category", style="yellow")
-        table.add_column("Description", style="blue")
-        table.add_column("Amount", justify="right", style="green")
+        with stage("render"):
+            console.print(_transactions_table(f"Transactions (page {page})", rows))
+        return has_more
 
-        # Sort transactions by date (newest first)
-        transactions.sort(key=lambda t: datetime.strptime(t.split('|')[0], "%Y-%m-%d"), reverse=True)
+    except FileNotFoundError:
+        console.print(Panel("[bold yellow]No transactions found.[/bold yellow]", title="Transactions"))
+    except Exception as e:
+        console.print(Panel(f"[bold red]An error occurred: {e}[/bold red]", title="Error"))
+    return False
 
-        for transaction in transactions:
-            date, type, category, description, amount = transaction.strip().split('|')
-            amount = int(amount)
-            amount_str = f"{amount/100:.2f}"
-            style = "red" if type == "expense" else "green"
-            table.add_row(date, type, category, description, f"[{style}]{amount_str}[/{style}]")
+@instrumented("search_transactions")
+def search_transactions(query, start=None, end=None, type=None, category=None, limit=PAGE_SIZE):
+    """Shows the newest transactions whose description matches every word of a query, with counts per category."""
+    try:
+        result = search(query, start, end, type, category, limit)
+        if not result.total:
+            console.print(Panel(f"[bold yellow]No transactions match '{query}'.[/bold yellow]", title="Search"))
+            return
 
-        console.print(table)
+        shown = len(result.transactions)
+        title = f"'{query}': {result.total} matches" + (f", newest {shown} shown" if shown < result.total else "")
+        facets = ", ".join(
+            f"{category} {matches}"
+            for category, matches in sorted(result.categories.items(), key=lambda item: -item[1])
+        )
+        with stage("render"):
+            console.print(_transactions_table(title, result.transactions))
+            console.print(f"By category: {facets}")
 
-    except FileNotFoundError:
-        console.print(Panel("[bold yellow]No transactions found.[/bold yellow]", title="Transactions"))
     except Exception as e:
         console.print(Panel(f"[bold red]An error occurred: {e}[/bold red]", title="Error"))
 
+def _transactions_table(title, rows):
+    table = Table(title=title)
+    table.add_column("Date", style="cyan")
+    table.add_column("Type", style="magenta")
+    table.add_column("Category", style="yellow")
+    table.add_column("Description", style="blue")
+    table.add_column("Amount", justify="right", style="green")
+
+    for date, type, category, description, amount in rows:
+        amount_str = f"{amount/100:.2f}"
+        style = "red" if type == "expense" else "green"
+        table.add_row(date, type, category, description, f"[{style}]{amount_str}[/{style}]")
+    return table
+
+def browse_transactions():
+    """Lets the user pick a filter and page through transactions."""
+    import questionary  # loaded lazily, batch commands never prompt
+
+    try:
+        filters = {
+            "All transactions": {},
+            "Last 7 days": {"start": (datetime.now() - timedelta(days=7)).strftime('%Y-%m-%d')},
+            "Only expenses": {"type": "expense"},
+            "Only income": {"type": "income"},
+        }
+        choice = questionary.select("Which transactions?", choices=list(filters), qmark="🔎").ask()
+        if not choice:
+            return
+
+        page = 1
+        while list_transactions(page, **filters[choice]):
+            action = questionary.select("", choices=["Next page", "Back to menu"], qmark=">").ask()
+            if action != "Next page":
+                break
+            page += 1
+
+    except KeyboardInterrupt:
+        console.print("\n[bold yellow]Operation cancelled.[/bold yellow]")
+
+@instrumented("show_balance")
 def show_balance():
     """Shows the balance for the current month."""
     try:
-        with open("database/transactions.txt", "r") as f:
-            transactions = f.readlines()
-
-        if not transactions:
+        if not has_transactions():
             console.print(Panel("[bold yellow]No transactions found.[/bold yellow]", title="Balance"))
             return
 
@@ -162,15 +250,11 @@ def show_balance():
         total_income = 0
         total_expense = 0
 
-        for transaction in transactions:
-            date_str, type, _, _, amount = transaction.strip().split('|')
-            date = datetime.strptime(date_str, "%Y-%m-%d")
-            if date.month == current_month and date.year == current_year:
-                amount = int(amount)
-                if type == "income":
-                    total_income += amount
-                else:
-                    total_expense += amount
+        for (type, _), amount in month_totals(current_year, current_month).items():
+            if type == "income":
+                total_income += amount
+            else:
+                total_expense += amount
 
         balance = total_income - total_expense
         balance_style = "green" if balance >= 0 else "red"
@@ -181,7 +265,8 @@ def show_balance():
             f"[{balance_style}]Current Balance: {balance/100:.2f}[/{balance_style}]",
             title="Current Month Balance"
         )
-        console.print(balance_panel)
+        with stage("render"):
+            console.print(balance_panel)
 
     except FileNotFoundError:
         console.print(Panel("[bold yellow]No transactions found.[/bold yellow]", title="Balance"))
@@ -1,11 +1,13 @@
-import questionary
-import subprocess
-from features.transactions.transactions import add_expense, add_income, list_transactions, show_balance
-from features.budgets.budgets import set_budget, display_budgets
-from features.analytics.analytics import analyze_spending
+import argparse
+import sys
+
+# Feature modules are imported inside the functions that use them, so a
+# batch command like `python main.py balance` only loads what it needs.
 
 def main_menu():
     """Displays the main menu and returns the user's choice."""
+    import questionary
+
     choice = questionary.select(
         "What would you like to do?",
         choices=[
@@ -16,6 +18,9 @@ def main_menu():
             "Set Budget",
             "Display Budgets",
             "Spending Analysis",
+            "Income Analysis",
+            "Recurring Transactions",
+            "Import Transactions",
             "Launch Dashboard",
             "Exit"
         ],
@@ -25,6 +30,12 @@ def main_menu():
 
 def main():
     """Main function to run the finance tracker CLI."""
+    from features.transactions.transactions import add_expense, add_income, browse_transactions, show_balance
+    from features.budgets.budgets import set_budget, display_budgets
+    from features.analytics.analytics import analyze_income, analyze_spending
+    from features.data_management.data_management import import_transactions
+    from features.recurring.recurring import manage_recurring
+
     while True:
         choice = main_menu()
         if choice == "Add Expense":
@@ -32,7 +43,7 @@ def main():
         elif choice == "Add Income":
             add_income()
         elif choice == "List Transactions":
-            list_transactions()
+            browse_transactions()
         elif choice == "Show Balance":
             show_balance()
         elif choice == "Set Budget":
@@ -41,10 +52,337 @@ def main():
             display_budgets()
         elif choice == "Spending Analysis":
             analyze_spending()
+        elif choice == "Income Analysis":
+            analyze_income()
+        elif choice == "Recurring Transactions":
+            manage_recurring()
+        elif choice == "Import Transactions":
+            import_transactions()
         elif choice == "Launch Dashboard":
+            import subprocess
             subprocess.run(["streamlit", "run", "dashboard.py"])
         elif choice == "Exit" or choice is None:
             break
 
+# --- Batch commands ---
+def command_add(args):
+    from features.transactions.transactions import record_transaction
+
+    try:
+        transaction = record_transaction(args.type, args.amount, args.category, args.description, args.date)
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    print(f"Added {transaction.type} of {transaction.amount/100:.2f} in '{transaction.category}' on {transaction.date}.")
+    return 0
+
+def command_feed(args):
+    import csv
+    from features.storage.journal import JournalWriter
+    from features.transactions.transactions import record_transaction
+
+    added = failed = 0
+    with JournalWriter(fsync_interval=args.fsync_interval) as writer:
+        for line_number, row in enumerate(csv.reader(sys.stdin), 1):
+            if not row:
+                continue
+            try:
+                if len(row) not in (4, 5):
+                    raise ValueError("expected type,amount,category,description[,date]")
+                record_transaction(*row, writer=writer)
+                added += 1
+            except ValueError as e:
+                print(f"Line {line_number}: {e}", file=sys.stderr)
+                failed += 1
+    print(f"Added {added} transactions, {failed} failed.")
+    return 1 if failed else 0
+
+def command_list(args):
+    from features.transactions.transactions import list_transactions
+    list_transactions(args.page, args.page_size, args.start, args.end, args.type, args.category)
+    return 0
+
+def command_search(args):
+    from features.transactions.transactions import search_transactions
+    search_transactions(" ".join(args.query), args.start, args.end, args.type, args.category, args.limit)
+    return 0
+
+def command_balance(args):
+    from features.transactions.transactions import show_balance
+    show_balance()
+    return 0
+
+def command_budgets(args):
+    from features.budgets.budgets import display_budgets
+    display_budgets(args.period and [args.period])
+    return 0
+
+def command_set_budgets(args):
+    from decimal import Decimal, InvalidOperation
+    from features.budgets.budgets import BUDGET_CATEGORIES
+    from features.storage.storage import set_budgets
+
+    updates = {}
+    for assignment in args.budgets:
+        category, _, amount = assignment.partition("=")
+        if category not in BUDGET_CATEGORIES:
+            print(f"Error: category must be one of: {', '.join(BUDGET_CATEGORIES)}.", file=sys.stderr)
+            return 1
+        try:
+            updates[category] = int((Decimal(amount) * 100).quantize(Decimal(1)))
+        except InvalidOperation:
+            print(f"Error: invalid amount '{amount}' for {category}.", file=sys.stderr)
+            return 1
+        if updates[category] < 0:
+            print(f"Error: amount for {category} can't be negative.", file=sys.stderr)
+            return 1
+    try:
+        set_budgets(updates, args.period, month=args.month)
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    print(f"Set {len(updates)} {args.period} budgets from {args.month or 'this month'}.")
+    return 0
+
+def command_analyze(args):
+    from datetime import date, timedelta
+    from features.analytics.analytics import analyze_income, analyze_range, analyze_spending
+    if args.kind == "income":
+        analyze_income()
+    elif args.kind == "range":
+        try:
+            end = date.fromisoformat(args.end) if args.end else date.today()
+            start = date.fromisoformat(args.start) if args.start else end - timedelta(days=364)
+        except ValueError:
+            print("Error: dates must be YYYY-MM-DD.", file=sys.stderr)
+            return 1
+        analyze_range(start, end, args.category)
+    else:
+        analyze_spending()
+    return 0
+
+def command_export(args):
+    from features.data_management.export import export_transactions, format_for
+
+    format = args.format or format_for(args.output)
+    if format == "parquet" and not args.output:
+        print("Error: Parquet export needs --output.", file=sys.stderr)
+        return 1
+    if args.output:
+        output = open(args.output, "wb") if format == "parquet" else open(args.output, "w", newline="")
+    else:
+        output = sys.stdout
+    try:
+        rows = export_transactions(output, format, args.start, args.end, args.type, args.category)
+    except ImportError:
+        print("Error: Parquet export needs pyarrow (pip install pyarrow).", file=sys.stderr)
+        return 1
+    finally:
+        if args.output:
+            output.close()
+    if args.output:
+        print(f"Exported {rows} transactions to {args.output}.", file=sys.stderr)
+    return 0
+
+def command_recurring(args):
+    from features.recurring.recurring import create_rule, describe_schedule, display_recurring
+    from features.storage.recurring_store import remove_rule
+
+    try:
+        if args.action == "add":
+            rule, added = create_rule(
+                args.type, args.amount, args.category, args.description, args.frequency, args.every, args.start, args.end
+            )
+            print(f"Added recurring {rule.type} of {rule.amount/100:.2f} in '{rule.category}', {describe_schedule(rule)}.")
+            if added:
+                print(f"Added {added} transactions already due.")
+        elif args.action == "remove":
+            rule = remove_rule(args.number)
+            print(f"Removed recurring '{rule.description}'.")
+        else:
+            display_recurring()
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+def materialize_recurring():
+    """Adds the recurring transactions that came due since the last start."""
+    from features.storage.recurring_store import materialize
+
+    try:
+        added = materialize()
+    except Exception as e:
+        print(f"Warning: recurring transactions were not added: {e}", file=sys.stderr)
+        return
+    if added:
+        print(f"Added {added} recurring transactions.", file=sys.stderr)
+
+def command_import(args):
+    from features.data_management.data_management import import_statement
+
+    columns = {"date": args.date_column, "amount": args.amount_column}
+    for field in ["type", "category", "description"]:
+        column = getattr(args, f"{field}_column")
+        if column:
+            columns[field] = column
+    try:
+        stats = import_statement(args.file, columns, args.date_format)
+    except FileNotFoundError:
+        print(f"Error: file '{args.file}' not found.", file=sys.stderr)
+        return 1
+    print(
+        f"Imported {stats['imported']} rows, {stats['failed']} failed, "
+        f"in {stats['seconds']:.2f}s ({stats['rows_per_second']:,.0f} rows/s)."
+    )
+    return 0
+
+def positive_int(text):
+    """argparse type for counts that must be at least 1."""
+    value = int(text)
+    if value < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {value}")
+    return value
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="main.py",
+        description="Finance tracker. Run without a command for the interactive menu.",
+    )
+    parser.add_argument("--backend", choices=["text", "sqlite"], help="storage backend (default: text)")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        help="processes for aggregating archived ledger shards (default: one per CPU)",
+    )
+    parser.add_argument(
+        "--profile",
+        choices=["summary", "json", "cprofile"],
+        help="time the storage and rendering stages and report them on exit",
+    )
+    parser.add_argument("--profile-output", help="file for the json or cprofile report")
+    parser.add_argument(
+        "--skip-recurring",
+        action="store_true",
+        help="don't add the recurring transactions that came due before running",
+    )
+    commands = parser.add_subparsers(dest="command")
+
+    add = commands.add_parser("add", help="add a transaction without prompting")
+    add.add_argument("type", choices=["expense", "income"])
+    add.add_argument("amount", help="amount, e.g. 12.50")
+    add.add_argument("category")
+    add.add_argument("description")
+    add.add_argument("--date", help="YYYY-MM-DD, defaults to today")
+    add.set_defaults(handler=command_add)
+
+    feed = commands.add_parser(
+        "feed",
+        help="append transactions streamed on stdin as CSV lines: type,amount,category,description[,date]",
+    )
+    feed.add_argument(
+        "--fsync-interval",
+        type=float,
+        help="seconds between fsyncs, 0 for every group, negative to leave it to the OS (default: 0.5)",
+    )
+    feed.set_defaults(handler=command_feed)
+
+    list_ = commands.add_parser("list", help="list transactions, newest first, one page at a time")
+    list_.add_argument("--page", type=positive_int, default=1)
+    list_.add_argument("--page-size", type=positive_int, default=20)
+    list_.add_argument("--from", dest="start", help="YYYY-MM-DD, inclusive")
+    list_.add_argument("--to", dest="end", help="YYYY-MM-DD, inclusive")
+    list_.add_argument("--type", choices=["expense", "income"])
+    list_.add_argument("--category")
+    list_.set_defaults(handler=command_list)
+
+    search = commands.add_parser("search", help="find transactions by words of their description, newest first")
+    search.add_argument("query", nargs="+", help="words that must all start a word of the description, e.g. uber")
+    search.add_argument("--from", dest="start", help="YYYY-MM-DD, inclusive")
+    search.add_argument("--to", dest="end", help="YYYY-MM-DD, inclusive")
+    search.add_argument("--type", choices=["expense", "income"])
+    search.add_argument("--category")
+    search.add_argument("--limit", type=int, default=20, help="matches to show (default: 20)")
+    search.set_defaults(handler=command_search)
+    commands.add_parser("balance", help="show this month's balance").set_defaults(handler=command_balance)
+    budgets = commands.add_parser("budgets", help="show this week's, month's and year's budgets")
+    budgets.add_argument("--period", choices=["weekly", "monthly", "yearly"], help="only one period")
+    budgets.set_defaults(handler=command_budgets)
+
+    set_budgets = commands.add_parser("set-budgets", help="set many budgets at once, e.g. Food=15000 Bills=8000")
+    set_budgets.add_argument("budgets", nargs="+", metavar="CATEGORY=AMOUNT", help="an amount of 0 removes the budget")
+    set_budgets.add_argument("--period", choices=["weekly", "monthly", "yearly"], default="monthly")
+    set_budgets.add_argument("--month", help="YYYY-MM the budgets take effect from (default: this month)")
+    set_budgets.set_defaults(handler=command_set_budgets)
+
+    analyze = commands.add_parser("analyze", help="analyze this month's spending or income, or any date range")
+    analyze.add_argument("kind", nargs="?", choices=["spending", "income", "range"], default="spending")
+    analyze.add_argument("--from", dest="start", help="range start, YYYY-MM-DD (default: a year before --to)")
+    analyze.add_argument("--to", dest="end", help="range end, YYYY-MM-DD, inclusive (default: today)")
+    analyze.add_argument("--category", help="only this category")
+    analyze.set_defaults(handler=command_analyze)
+
+    export = commands.add_parser("export", help="export transactions as CSV, JSON Lines or Parquet")
+    export.add_argument("--output", "-o", help="file to write, defaults to stdout")
+    export.add_argument(
+        "--format",
+        choices=["csv", "jsonl", "parquet"],
+        help="defaults to the --output extension (.jsonl, .parquet), else csv",
+    )
+    export.add_argument("--from", dest="start", help="YYYY-MM-DD, inclusive")
+    export.add_argument("--to", dest="end", help="YYYY-MM-DD, inclusive")
+    export.add_argument("--type", choices=["expense", "income"])
+    export.add_argument("--category", action="append", help="only this category, can be repeated")
+    export.set_defaults(handler=command_export)
+
+    recurring = commands.add_parser("recurring", help="list, add or remove recurring transactions")
+    recurring_actions = recurring.add_subparsers(dest="action")
+    recurring_actions.add_parser("list", help="list the recurring rules with their numbers")
+    recurring_add = recurring_actions.add_parser(
+        "add",
+        help="add a rule; occurrences due from --start up to today, past ones included, are added right away",
+    )
+    recurring_add.add_argument("type", choices=["expense", "income"])
+    recurring_add.add_argument("amount", help="amount, e.g. 12.50")
+    recurring_add.add_argument("category")
+    recurring_add.add_argument("description")
+    recurring_add.add_argument("--frequency", choices=["daily", "weekly", "monthly", "yearly"], default="monthly")
+    recurring_add.add_argument("--every", type=int, default=1, help="repeat every N days, weeks, months or years")
+    recurring_add.add_argument("--start", help="YYYY-MM-DD of the first occurrence, defaults to today")
+    recurring_add.add_argument("--end", help="YYYY-MM-DD of the last possible occurrence")
+    recurring_remove = recurring_actions.add_parser("remove", help="remove a rule by its number in the list")
+    recurring_remove.add_argument("number", type=int)
+    recurring.set_defaults(handler=command_recurring)
+
+    import_ = commands.add_parser("import", help="import a CSV or bank statement")
+    import_.add_argument("file")
+    import_.add_argument("--date-column", default="Date")
+    import_.add_argument("--amount-column", default="Amount")
+    import_.add_argument("--type-column")
+    import_.add_argument("--category-column")
+    import_.add_argument("--description-column")
+    import_.add_argument("--date-format", default="%Y-%m-%d")
+    import_.set_defaults(handler=command_import)
+    return parser
+
+def run(argv):
+    """Runs a batch command, or the interactive menu when no command is given."""
+    args = build_parser().parse_args(argv)
+    if args.workers:
+        from features.storage import shards
+        shards.WORKERS = args.workers
+    if args.profile:
+        from features.instrumentation import instrumentation
+        instrumentation.enable(args.profile, args.profile_output)
+    if args.backend:
+        from features.storage import storage
+        storage.BACKEND = args.backend
+    if not args.skip_recurring:
+        materialize_recurring()
+    if args.command is None:
+        main()
+        return 0
+    return args.handler(args)
+
 if __name__ == "__main__":
-    main()
+    sys.exit(run(sys.argv[1:]))
@@ -0,0 +1,41 @@
+import os
+import threading
+
+import pytest
+
+from features.storage import budget_store, rollup, sqlite_backend, storage
+from features.storage.codec import Transaction, encode_record
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    """Runs a test in an empty directory with a database/ folder, as the app expects, and no cached state."""
+    (tmp_path / "database").mkdir()
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(storage, "BACKEND", "text")
+    monkeypatch.setattr(storage, "_indexes", {})
+    monkeypatch.setattr(rollup, "_cache", {})
+    monkeypatch.setattr(budget_store, "_stores", {})
+    monkeypatch.setattr(sqlite_backend, "_local", threading.local())
+    return tmp_path
+
+def transaction(date, amount, type="expense", category="Food", description="Lunch"):
+    return Transaction(date, type, category, description, amount)
+
+def write_ledger(transactions, path=storage.TRANSACTIONS_FILE):
+    with open(path, "w") as f:
+        f.writelines(encode_record(t) for t in transactions)
+
+def edit_in_place(path, old, new):
+    """Replaces bytes of a file without changing its size, then moves its mtime on.
+
+    The mtime is set explicitly so the edit is seen even on file systems with
+    a coarse timestamp resolution.
+    """
+    assert len(old) == len(new)
+    before = os.stat(path).st_mtime_ns
+    with open(path, "r+b") as f:
+        data = f.read()
+        assert old in data
+        f.seek(data.index(old))
+        f.write(new)
+    os.utime(path, ns=(before + 1_000_000_000, before + 1_000_000_000))
@@ -0,0 +1,57 @@
+import pytest
+
+from features.storage import budget_store, storage
+
+BUDGETS = storage.BUDGETS_FILE
+
+def test_budgets_apply_from_their_month_on(data_dir):
+    store = budget_store.get_store(BUDGETS)
+    store.set_many({"Food": 1000}, month="2024-01")
+    store.set_many({"Food": 2000}, month="2024-04")
+    assert store.get(month="2023-12") == {}
+    assert store.get(month="2024-03") == {"Food": 1000}
+    assert store.get(month="2024-04") == {"Food": 2000}
+    assert store.get(month="2025-01") == {"Food": 2000}
+
+def test_order_in_the_journal_doesnt_matter_across_months(data_dir):
+    store = budget_store.get_store(BUDGETS)
+    store.set_many({"Food": 2000}, month="2024-04")
+    # Set later, but for an earlier month
+    store.set_many({"Food": 1000}, month="2024-01")
+    assert store.get(month="2024-03") == {"Food": 1000}
+    assert store.get(month="2024-05") == {"Food": 2000}
+    assert store.category_history("Food") == [("2024-01", 1000), ("2024-04", 2000)]
+
+def test_later_line_for_the_same_month_wins(data_dir):
+    store = budget_store.get_store(BUDGETS)
+    store.set_many({"Food": 1000, "Bills": 500}, month="2024-01")
+    store.set_many({"Food": 1500}, month="2024-01")
+    store.replace({"Food": 1500}, month="2024-02")
+    assert store.get(month="2024-01") == {"Food": 1500, "Bills": 500}
+    assert store.get(month="2024-02") == {"Food": 1500}
+
+def test_compact_keeps_every_month(data_dir):
+    store = budget_store.get_store(BUDGETS)
+    for amount in (1, 2, 3):
+        store.set_many({"Food": amount}, month="2024-01")
+    store.set_many({"Food": 4}, month="2024-02")
+    assert store.compact() == 2
+    assert store.category_history("Food") == [("2024-01", 3), ("2024-02", 4)]
+
+def test_legacy_lines_count_as_set_before_any_month(data_dir):
+    with open(BUDGETS, "w") as f:
+        f.write("Food,700\nBills,300,yearly\n")
+    store = budget_store.get_store(BUDGETS)
+    store.set_many({"Food": 900}, month="2024-06")
+    assert store.get(month="2024-05") == {"Food": 700}
+    assert store.get(month="2024-06") == {"Food": 900}
+    assert store.get("yearly", month="2024-06") == {"Bills": 300}
+
+@pytest.mark.parametrize("month", ["2024-13", "2024-00", "24-01", "2024-1", "2024-01-01", " 2024-01"])
+def test_bad_months_are_rejected(data_dir, month):
+    store = budget_store.get_store(BUDGETS)
+    with pytest.raises(ValueError):
+        store.set_many({"Food": 100}, month=month)
+    with pytest.raises(ValueError):
+        store.replace({"Food": 100}, month=month)
+    assert store.entries() == []
@@ -0,0 +1,55 @@
+import pytest
+
+from features.storage.codec import Transaction, decode_record, encode_record, is_legacy_record, split_fields
+
+@pytest.mark.parametrize("description", [
+    "Lunch",
+    "Pipes | and backslashes \\",
+    "Two\r\nlines\nhere",
+    "Trailing backslash \\",
+    "Unicode ₹ café",
+])
+def test_round_trip(description):
+    original = Transaction("2024-03-05", "expense", "Food", description, 12345)
+    line = encode_record(original)
+    assert line.endswith("\n") and line.count("\n") == 1
+    assert decode_record(line) == original
+
+def test_escaped_category_round_trips():
+    original = Transaction("2024-03-05", "income", "Side|gig", "Paid", 100)
+    assert decode_record(encode_record(original)) == original
+
+def test_legacy_rows_are_read_and_recognized():
+    line = "2024-3-5,Expense,Food,Lunch,250\n"
+    assert decode_record(line) == Transaction("2024-03-05", "expense", "Food", "Lunch", 250)
+    assert is_legacy_record(line)
+    assert not is_legacy_record(encode_record(decode_record(line)))
+
+@pytest.mark.parametrize("line", [
+    "",
+    "2024-02-30|expense|Food|Lunch|250\n",
+    "2024-03-05|expense|Food|Lunch|2.50\n",
+    "2024-03-05|expense|Food|250\n",
+])
+def test_malformed_rows_are_rejected(line):
+    assert decode_record(line) is None
+
+def test_split_fields_unescapes():
+    assert split_fields("a\\|b|c\\\\|d\n") == ["a|b", "c\\", "d"]
+
+@pytest.mark.parametrize("line, description", [
+    ("2024-03-05|expense|Files|C:\\temp\\data|100\n", "C:\\temp\\data"),
+    ("2024-03-05|expense|Files|dir\\|100\n", "dir\\"),
+    ("2024-03-05|expense|Files|a \\ b|100\n", "a \\ b"),
+])
+def test_bare_backslashes_of_unescaped_pipe_rows_are_kept(line, description):
+    assert decode_record(line) == Transaction("2024-03-05", "expense", "Files", description, 100)
+    assert decode_record(encode_record(decode_record(line))) == decode_record(line)
+
+def test_bare_backslashes_agree_with_the_bulk_loader():
+    from features.storage.frames import frame_from_bytes
+
+    data = b"2024-03-05|expense|Files|C:\\temp|100\n2024-03-06|expense|Files|dir\\|200\n"
+    frame = frame_from_bytes(data)
+    assert frame["Description"].tolist() == ["C:\\temp", "dir\\"]
+    assert frame["Amount"].tolist() == [100, 200]
@@ -0,0 +1,77 @@
+import random
+from datetime import date, timedelta
+
+import pytest
+
+from features.analytics.dashboard_queries import DashboardQueries
+from features.storage.codec import Transaction, encode_record
+from features.storage.frames import frame_from_bytes
+
+FIRST = date(2022, 1, 1)
+
+@pytest.fixture(scope="module")
+def rows():
+    generator = random.Random(3)
+    rows = []
+    for i in range(3000):
+        day = (FIRST + timedelta(days=generator.randrange(1000))).isoformat()
+        type, category = generator.choice([("expense", "Food"), ("expense", "Bills"), ("income", "Salary")])
+        rows.append(Transaction(day, type, category, f"Row {i}", generator.randrange(1, 100_000)))
+    return rows
+
+@pytest.fixture(scope="module")
+def queries(rows):
+    return DashboardQueries(frame_from_bytes("".join(map(encode_record, rows)).encode("utf-8")))
+
+def brute_total(rows, start, end, type, category=None):
+    return sum(
+        t.amount for t in rows
+        if start.isoformat() <= t.date <= end.isoformat() and t.type == type and category in (None, t.category)
+    )
+
+def test_totals_and_categories(rows, queries):
+    start, end = date(2022, 3, 15), date(2023, 2, 10)
+    assert queries.totals(start, end) == {
+        "Expense": brute_total(rows, start, end, "expense"),
+        "Income": brute_total(rows, start, end, "income"),
+    }
+    categories = queries.category_totals(start, end)
+    assert categories.to_dict() == {
+        "Food": brute_total(rows, start, end, "expense", "Food"),
+        "Bills": brute_total(rows, start, end, "expense", "Bills"),
+    }
+    # Repeated questions are answered from the cache
+    assert queries.category_totals(start, end) is categories
+
+def test_short_trends_have_every_day(rows, queries):
+    start, end = date(2023, 1, 1), date(2023, 3, 31)
+    trend, bucket = queries.trend(start, end)
+    assert bucket == "Day"
+    assert len(trend) == (end - start).days + 1
+    assert trend["Expense"].sum() == brute_total(rows, start, end, "expense")
+
+@pytest.mark.parametrize("max_points, bucket", [(400, "Week"), (100, "Month"), (20, "Year")])
+def test_long_trends_are_downsampled_without_losing_amounts(rows, queries, max_points, bucket):
+    start, end = FIRST, FIRST + timedelta(days=999)
+    trend, used = queries.trend(start, end, max_points)
+    assert used == bucket
+    assert len(trend) <= max_points
+    assert trend["Income"].sum() == brute_total(rows, start, end, "income")
+    if bucket == "Week":
+        assert (trend["Date"].iloc[1:].dt.dayofweek == 0).all()
+
+def test_pages_are_newest_first(rows, queries):
+    expected = sorted(
+        (t for t in reversed(rows) if "2022-06-01" <= t.date <= "2022-12-31" and t.category != "Salary"),
+        key=lambda t: t.date, reverse=True,
+    )
+    start, end = date(2022, 6, 1), date(2022, 12, 31)
+    first, total = queries.page(start, end, ["Food", "Bills"], page=1, page_size=25)
+    second, _ = queries.page(start, end, ["Bills", "Food"], page=2, page_size=25)
+    assert total == len(expected)
+    descriptions = first["Description"].tolist() + second["Description"].tolist()
+    assert descriptions == [t.description for t in expected[:50]]
+
+    everything, total = queries.page(page=1, page_size=10)
+    assert total == len(rows)
+    assert str(everything["Date"].iloc[0].date()) == max(t.date for t in rows)
@@ -0,0 +1,97 @@
+import csv
+import io
+import json
+
+import pytest
+
+from conftest import transaction, write_ledger
+from features.data_management.export import export_transactions, format_for
+from features.storage import shards, sqlite_backend, storage
+
+ROWS = [
+    transaction("2023-11-30", 1250, description="Old, \"quoted\" row"),
+    transaction("2024-01-05", 100, category="Bills", description="Power | light"),
+    transaction("2024-01-31", 500000, "income", "Salary", "Pay\nJanuary"),
+    transaction("2024-02-01", 7),
+    transaction("2024-02-29", 99999, category="Bills"),
+]
+
+@pytest.fixture
+def ledger(data_dir, monkeypatch):
+    monkeypatch.setattr(shards, "WORKERS", 1)
+    write_ledger(ROWS)
+
+def export_csv(**filters):
+    output = io.StringIO(newline="")
+    rows = export_transactions(output, "csv", **filters)
+    parsed = list(csv.reader(io.StringIO(output.getvalue(), newline="")))
+    assert parsed[0] == ["Date", "Type", "Category", "Description", "Amount"]
+    assert len(parsed) == rows + 1
+    return parsed[1:]
+
+def test_csv_keeps_every_field(ledger):
+    assert export_csv() == [
+        ["2023-11-30", "expense", "Food", "Old, \"quoted\" row", "12.50"],
+        ["2024-01-05", "expense", "Bills", "Power | light", "1.00"],
+        ["2024-01-31", "income", "Salary", "Pay\nJanuary", "5000.00"],
+        ["2024-02-01", "expense", "Food", "Lunch", "0.07"],
+        ["2024-02-29", "expense", "Bills", "Lunch", "999.99"],
+    ]
+
+@pytest.mark.parametrize("filters, dates", [
+    ({"start": "2024-01-05", "end": "2024-02-01"}, ["2024-01-05", "2024-01-31", "2024-02-01"]),
+    ({"type": "income"}, ["2024-01-31"]),
+    ({"categories": ["Bills"]}, ["2024-01-05", "2024-02-29"]),
+    ({"categories": ["Food", "Salary"], "end": "2024-01-31"}, ["2023-11-30", "2024-01-31"]),
+    ({"start": "2025-01-01"}, []),
+])
+def test_filters(ledger, filters, dates):
+    assert [row[0] for row in export_csv(**filters)] == dates
+
+def test_json_lines(ledger):
+    output = io.StringIO()
+    assert export_transactions(output, "jsonl", type="income", chunk_rows=1) == 1
+    assert output.getvalue().count("\n") == 1
+    assert '"Amount": 5000.00}' in output.getvalue()
+    assert json.loads(output.getvalue()) == {
+        "Date": "2024-01-31", "Type": "income", "Category": "Salary", "Description": "Pay\nJanuary", "Amount": 5000,
+    }
+
+def test_chunks_dont_change_the_output(ledger):
+    outputs = []
+    for chunk_rows in (1, 2, 10_000):
+        output = io.StringIO(newline="")
+        export_transactions(output, "csv", chunk_rows=chunk_rows)
+        outputs.append(output.getvalue())
+    assert outputs[0] == outputs[1] == outputs[2]
+
+def test_parquet_row_groups_stay_within_a_month(ledger, tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    path = tmp_path / "export.parquet"
+    with open(path, "wb") as f:
+        assert export_transactions(f, "parquet", chunk_rows=1_000) == len(ROWS)
+    parquet = pq.ParquetFile(path)
+    assert parquet.metadata.num_row_groups == 3
+    table = parquet.read().to_pylist()
+    assert [str(row["Date"]) for row in table] == [t.date for t in ROWS]
+    assert [int(row["Amount"] * 100) for row in table] == [t.amount for t in ROWS]
+
+def test_archived_shards_come_first_and_are_filtered(ledger):
+    storage.append_transactions([transaction("2022-05-05", 3, "income", "Gift")])
+    shards.archive(2024)
+    assert [row[0] for row in export_csv()] == ["2022-05-05", "2023-11-30"] + [t.date for t in ROWS[1:]]
+    assert [row[0] for row in export_csv(type="income")] == ["2022-05-05", "2024-01-31"]
+    assert [row[0] for row in export_csv(categories=["Bills"])] == ["2024-01-05", "2024-02-29"]
+
+def test_sqlite_exports_the_same_rows(ledger, monkeypatch):
+    text = export_csv(start="2024-01-01", categories=["Bills", "Salary"])
+    sqlite_backend.import_text_files()
+    monkeypatch.setattr(storage, "BACKEND", "sqlite")
+    assert export_csv(start="2024-01-01", categories=["Bills", "Salary"]) == text
+
+def test_formats():
+    assert format_for("out.PARQUET") == "parquet"
+    assert format_for("out.ndjson") == "jsonl"
+    assert format_for("out.txt") == format_for(None) == "csv"
+    with pytest.raises(ValueError):
+        export_transactions(io.StringIO(), "xlsx")
@@ -0,0 +1,116 @@
+import os
+
+import numpy as np
+import pytest
+
+from conftest import edit_in_place, transaction, write_ledger
+from features.storage import storage
+from features.storage.codec import decode_record
+from features.storage.frames import LedgerFrameCache, frame_from_bytes, load_text_frame
+
+LEDGER = storage.TRANSACTIONS_FILE
+
+GOOD = (
+    b"2024-01-01|expense|Food|Lunch|100\n"
+    b"2024-01-02|income|Salary|Pay|-7\n"
+    b"2024-01-03|expense|Fo\\|od|Escaped|3\n"
+    b"2024-01-04,Expense,Food,Legacy,40\n"
+    b" 2024-01-05 | expense | Food | Padded | 5 \n"
+)
+
+BAD = [
+    b"2024-01-06|expense|Food|Decimal|12.5\n",
+    b"2024-01-06|expense|Food|Too large|99999999999999999999\n",
+    b"2024-01-06|expense|Food|uint64|18446744073709551615\n",
+    b"2024-02-30|expense|Food|No such day|1\n",
+    b"2024-01-06|expense|Food|Not a number|abc\n",
+    b"2024-01-06|expense|Food|Four fields\n",
+]
+
+def expected(data):
+    """The amounts codec.decode_record accepts that fit int64, in file order."""
+    rows = [decode_record(line) for line in data.decode("utf-8").splitlines()]
+    return [t.amount for t in rows if t is not None and -2**63 <= t.amount < 2**63]
+
+@pytest.mark.parametrize("padded", [False, True])
+@pytest.mark.parametrize("bad", BAD)
+def test_a_bad_row_only_drops_itself(bad, padded):
+    # Without padding the '|' rows go through the C parser's int64 fast path
+    good = GOOD if padded else GOOD[:GOOD.index(b" 2024")]
+    data = good.replace(b"\n", b"\n" + bad, 1)
+    frame = frame_from_bytes(data)
+    assert frame["Amount"].dtype == np.int64
+    assert frame["Amount"].tolist() == expected(data) == [100, -7, 3, 40, 5][:len(frame)]
+    assert len(frame) == (5 if padded else 4)
+
+def test_amounts_the_codec_accepts_are_kept():
+    data = b"2024-01-01|expense|Food|Separators|1_000\n2024-01-02|expense|Food|Plain|9223372036854775807\n"
+    assert frame_from_bytes(data)["Amount"].tolist() == expected(data) == [1000, 2**63 - 1]
+
+def test_columns():
+    frame = frame_from_bytes(GOOD)
+    assert frame["Type"].tolist() == ["Expense", "Income", "Expense", "Expense", "Expense"]
+    assert frame["Category"].tolist() == ["Food", "Salary", "Fo|od", "Food", "Food"]
+    assert frame["Description"].tolist() == ["Lunch", "Pay", "Escaped", "Legacy", "Padded"]
+    assert str(frame["Date"].iloc[0].date()) == "2024-01-01"
+
+def test_load_text_frame_matches_the_codec(data_dir):
+    with open(LEDGER, "wb") as f:
+        f.write(GOOD + b"".join(BAD))
+    assert load_text_frame(LEDGER)["Amount"].tolist() == expected(GOOD + b"".join(BAD))
+
+def test_cached_tail_with_bad_rows(data_dir):
+    write_ledger([transaction("2024-01-01", 100)])
+    cache = LedgerFrameCache(LEDGER)
+    assert cache.get()["Amount"].tolist() == [100]
+
+    with open(LEDGER, "ab") as f:
+        f.write(b"".join(BAD) + GOOD)
+    frame = cache.get()
+    assert frame["Amount"].dtype == np.int64
+    assert frame["Amount"].tolist() == [100, 100, -7, 3, 40, 5]
+    assert frame["Amount"].tolist() == load_text_frame(LEDGER)["Amount"].tolist()
+
+def test_unchanged_ledger_reuses_the_frame(data_dir):
+    write_ledger([transaction("2024-01-01", 100)])
+    cache = LedgerFrameCache(LEDGER)
+    assert cache.get() is cache.get()
+
+def test_unterminated_line_is_added_once_complete(data_dir):
+    write_ledger([transaction("2024-01-01", 100)])
+    with open(LEDGER, "a") as f:
+        f.write("2024-01-02|expense|Food|Lunch|2")
+    cache = LedgerFrameCache(LEDGER)
+    assert cache.get()["Amount"].tolist() == [100]
+    with open(LEDGER, "a") as f:
+        f.write("50\n")
+    assert cache.get()["Amount"].tolist() == [100, 250]
+
+def test_same_size_edit_reloads(data_dir):
+    write_ledger([transaction("2024-01-01", 50000), transaction("2024-01-02", 100)])
+    cache = LedgerFrameCache(LEDGER)
+    cache.get()
+    edit_in_place(LEDGER, b"|50000\n", b"|90000\n")
+    assert cache.get()["Amount"].tolist() == [90000, 100]
+
+def test_replaced_ledger_reloads(data_dir):
+    write_ledger([transaction("2024-01-01", 100)])
+    cache = LedgerFrameCache(LEDGER)
+    cache.get()
+    # Longer than before and sharing its first line, yet not an append
+    write_ledger([transaction("2024-01-01", 100), transaction("2024-01-02", 7)], LEDGER + ".new")
+    with open(LEDGER + ".new", "r+b") as f:
+        f.write(b"2023")
+    os.replace(LEDGER + ".new", LEDGER)
+    frame = cache.get()
+    assert frame["Amount"].tolist() == [100, 7]
+    assert str(frame["Date"].iloc[0].date()) == "2023-01-01"
+
+def test_shrunk_or_removed_ledger_reloads(data_dir):
+    write_ledger([transaction("2024-01-01", 100), transaction("2024-01-02", 200)])
+    cache = LedgerFrameCache(LEDGER)
+    cache.get()
+    write_ledger([transaction("2024-01-01", 100)])
+    assert cache.get()["Amount"].tolist() == [100]
+    os.remove(LEDGER)
+    assert cache.get().empty
@@ -0,0 +1,56 @@
+import pytest
+
+from features.data_management.data_management import import_statement, parse_amount
+from features.storage import storage
+from features.storage.codec import Transaction
+
+COLUMNS = {"date": "Date", "type": "Dr/Cr", "category": "Category", "description": "Narration", "amount": "Amount"}
+
+@pytest.mark.parametrize("text, paisa", [
+    ("1,234.50", 123450),
+    ("-20", -2000),
+    ("(20.00)", -2000),
+    (" 0.005 ", 1),
+    ("12.344", 1234),
+    ("abc", None),
+    ("NaN", None),
+    ("", None),
+])
+def test_parse_amount(text, paisa):
+    assert parse_amount(text) == paisa
+
+def write_statement(directory, text):
+    path = directory / "statement.csv"
+    path.write_text(text, encoding="utf-8")
+    return str(path)
+
+def test_rows_are_imported_in_batches(data_dir):
+    csv_path = write_statement(data_dir, (
+        "\ufeffDate,Dr/Cr,Category,Narration,Amount\n"
+        "05/01/2024,DR,Food,Lunch,\"1,250.00\"\n"
+        "06/01/2024,Credit,Salary,January pay,50000\n"
+        "07/01/2024,dr,Groceries,,-99.5\n"
+        "31/02/2024,DR,Food,No such day,10\n"
+        "08/01/2024,Refund,Food,Unknown type,10\n"
+        "09/01/2024,DR,Food,Zero,0\n"
+        "10/01/2024,CR,Gift,Birthday,100\n"
+    ))
+    batches = []
+    stats = import_statement(csv_path, COLUMNS, "%d/%m/%Y", batch_size=2, on_batch=lambda s: batches.append(s["imported"]))
+    assert (stats["imported"], stats["failed"]) == (4, 3)
+    assert batches == [2, 4]
+    assert list(storage.iter_text_transactions()) == [
+        Transaction("2024-01-05", "expense", "Food", "Lunch", 125000),
+        Transaction("2024-01-06", "income", "Salary", "January pay", 5000000),
+        # Unknown categories fall back to Other, and amounts are stored unsigned
+        Transaction("2024-01-07", "expense", "Other", "Imported", 9950),
+        Transaction("2024-01-10", "income", "Gift", "Birthday", 10000),
+    ]
+
+def test_sign_decides_the_type_without_a_type_column(data_dir):
+    csv_path = write_statement(data_dir, "Date,Amount\n2024-01-05,-12.5\n2024-01-06,(3)\n2024-01-07,40\n")
+    stats = import_statement(csv_path, {"date": "Date", "amount": "Amount"})
+    assert stats["imported"] == 3
+    assert [(t.type, t.amount) for t in storage.iter_text_transactions()] == [
+        ("expense", 1250), ("expense", 300), ("income", 4000),
+    ]
@@ -0,0 +1,67 @@
+import json
+
+import pytest
+
+from conftest import transaction
+from features.instrumentation import instrumentation
+from features.instrumentation.instrumentation import count, instrumented, stage
+from features.storage import storage
+
+@pytest.fixture
+def enabled(monkeypatch):
+    """Records stages for one test without registering a report at exit."""
+    monkeypatch.setattr(instrumentation, "ENABLED", True)
+    monkeypatch.setattr(instrumentation, "_stats", {})
+    return instrumentation
+
+def stages():
+    return {entry["stage"]: entry for entry in instrumentation.report()}
+
+def test_disabled_records_nothing(monkeypatch):
+    monkeypatch.setattr(instrumentation, "_stats", {})
+    assert stage("a") is stage("b")
+    with stage("a"):
+        count(rows=1)
+    assert instrumented("f")(lambda x: x * 2)(21) == 42
+    assert instrumentation.report() == []
+
+def test_nested_stages_and_counts(enabled):
+    @instrumented("outer")
+    def outer():
+        with stage("inner"):
+            count(rows=3, bytes=30)
+        count(rows=1)
+
+    outer()
+    outer()
+    recorded = stages()
+    assert (recorded["outer"]["calls"], recorded["outer"]["rows"]) == (2, 2)
+    assert (recorded["inner"]["calls"], recorded["inner"]["rows"], recorded["inner"]["bytes"]) == (2, 6, 60)
+    # Inclusive of nested stages, so the outer one is reported first
+    assert recorded["outer"]["seconds"] >= recorded["inner"]["seconds"]
+    assert instrumentation.report()[0]["stage"] == "outer"
+
+def test_a_stage_is_recorded_when_it_raises(enabled):
+    with pytest.raises(KeyError):
+        with stage("failing"):
+            raise KeyError
+    assert stages()["failing"]["calls"] == 1
+    assert instrumentation._active == []
+
+def test_storage_stages(enabled, data_dir):
+    storage.append_transactions([transaction("2024-01-05", 100), transaction("2024-01-06", 200)])
+    storage.month_totals(2024, 1)
+    assert stages()["storage.append"]["rows"] == 2
+    assert stages()["storage.month_totals"]["calls"] == 1
+
+def test_json_report(enabled, tmp_path):
+    with stage("a"):
+        count(bytes=5)
+    path = tmp_path / "profile.json"
+    instrumentation.write_json(path)
+    written = json.loads(path.read_text())
+    assert written["stages"] == [{"stage": "a", "calls": 1, "seconds": written["stages"][0]["seconds"], "rows": 0, "bytes": 5}]
+
+def test_unknown_mode_is_refused():
+    with pytest.raises(ValueError):
+        instrumentation.enable("verbose")
@@ -0,0 +1,104 @@
+import os
+import threading
+import time
+
+import pytest
+
+from conftest import transaction, write_ledger
+from features.storage import journal, storage
+from features.storage.journal import JournalWriter, recover_torn_tail
+
+LEDGER = storage.TRANSACTIONS_FILE
+
+@pytest.fixture
+def slow_appends(data_dir, monkeypatch):
+    """Makes every append take a while, so rows pile up into groups meanwhile. Returns the group sizes."""
+    real_append = storage.append_transactions
+    groups = []
+
+    def append(transactions, path, fsync=False):
+        groups.append(len(transactions))
+        time.sleep(0.005)
+        real_append(transactions, path, fsync=fsync)
+
+    monkeypatch.setattr(storage, "append_transactions", append)
+    return groups
+
+def test_rows_from_many_producers_are_written_once_in_groups(slow_appends):
+    with JournalWriter(LEDGER, max_group_rows=50) as writer:
+        def produce(producer):
+            for i in range(250):
+                writer.submit(transaction("2024-01-05", producer * 1000 + i))
+
+        producers = [threading.Thread(target=produce, args=(n,)) for n in range(4)]
+        for producer in producers:
+            producer.start()
+        for producer in producers:
+            producer.join()
+
+    amounts = [t.amount for t in storage.iter_text_transactions()]
+    assert sorted(amounts) == sorted(n * 1000 + i for n in range(4) for i in range(250))
+    assert sum(slow_appends) == 1000 and writer.groups == len(slow_appends) < 1000
+    assert max(slow_appends) <= 50
+    assert storage.verify_rollup(LEDGER) == []
+
+def test_flush_waits_for_queued_rows(slow_appends):
+    writer = JournalWriter(LEDGER)
+    for i in range(20):
+        writer.submit(transaction("2024-01-05", i))
+    writer.flush()
+    assert len(list(storage.iter_text_transactions())) == 20
+    writer.close()
+
+def test_a_failed_append_is_reported_to_the_producer(data_dir, monkeypatch):
+    def fail(transactions, path, fsync=False):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(storage, "append_transactions", fail)
+    writer = JournalWriter(LEDGER)
+    writer.submit(transaction("2024-01-05", 1))
+    with pytest.raises(OSError):
+        writer.flush()
+    with pytest.raises(OSError):
+        writer.submit(transaction("2024-01-05", 2))
+    with pytest.raises(OSError):
+        writer.close()
+
+def test_torn_tail_is_moved_aside(data_dir):
+    write_ledger([transaction("2024-01-05", 100)])
+    with open(LEDGER, "a") as f:
+        f.write("2024-01-06|expense|Fo")
+    assert recover_torn_tail(LEDGER) == len("2024-01-06|expense|Fo")
+    assert open(journal.torn_path(LEDGER)).read() == "2024-01-06|expense|Fo\n"
+    assert [t.amount for t in storage.iter_text_transactions()] == [100]
+    assert recover_torn_tail(LEDGER) == 0
+
+def test_torn_only_line_and_empty_ledger(data_dir):
+    with open(LEDGER, "w") as f:
+        f.write("x" * 10_000)
+    assert recover_torn_tail(LEDGER) == 10_000
+    assert os.path.getsize(LEDGER) == 0
+    assert recover_torn_tail(LEDGER) == 0
+    os.remove(LEDGER)
+    assert recover_torn_tail(LEDGER) == 0
+
+def test_appends_never_glue_onto_a_torn_line(data_dir):
+    write_ledger([transaction("2024-01-05", 100)])
+    with open(LEDGER, "a") as f:
+        f.write("2024-01-06|expense|Fo")
+    storage.append_transactions([transaction("2024-01-07", 7)])
+    with JournalWriter(LEDGER) as writer:
+        writer.submit(transaction("2024-01-08", 8))
+    assert [t.amount for t in storage.iter_text_transactions()] == [100, 7, 8]
+    assert storage.verify_rollup(LEDGER) == []
+
+def test_replacing_leaves_the_file_alone_when_the_block_fails(data_dir):
+    path = os.path.join("database", "sidecar.txt")
+    with journal.replacing(path) as f:
+        f.write("old\n")
+    with pytest.raises(KeyboardInterrupt):
+        with journal.replacing(path) as f:
+            f.write("new\n")
+            raise KeyboardInterrupt
+    assert open(path).read() == "old\n"
+    assert os.listdir("database") == ["sidecar.txt"]
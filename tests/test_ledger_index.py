@@ -0,0 +1,66 @@
+import os
+
+from conftest import edit_in_place, transaction, write_ledger
+from features.storage import storage
+
+LEDGER = storage.TRANSACTIONS_FILE
+
+def amounts(index):
+    return sorted(t.amount for t in index.read(index.offsets))
+
+def test_refresh_indexes_only_appended_rows(data_dir):
+    write_ledger([transaction("2024-01-05", 100), transaction("2024-02-05", 200)])
+    index = storage.get_index(LEDGER)
+    assert set(index.months) == {(2024, 1), (2024, 2)}
+    end = index.end
+
+    storage.append_transactions([transaction("2024-02-06", 300)], LEDGER)
+    index.refresh()
+    assert index.end > end
+    assert index.totals[(2024, 2)] == {("expense", "Food"): 500}
+    rebuilt = storage.LedgerIndex(LEDGER)
+    rebuilt.refresh()
+    assert index.offsets == rebuilt.offsets
+    assert index.daily == rebuilt.daily
+
+def test_unterminated_line_is_indexed_once_complete(data_dir):
+    write_ledger([transaction("2024-01-05", 100)])
+    with open(LEDGER, "a") as f:
+        f.write("2024-01-06|expense|Food|Lunch|2")
+    index = storage.get_index(LEDGER)
+    assert amounts(index) == [100]
+
+    with open(LEDGER, "a") as f:
+        f.write("50\n")
+    index.refresh()
+    assert amounts(index) == [100, 250]
+
+def test_same_size_edit_rebuilds(data_dir):
+    write_ledger([transaction("2024-01-05", 50000), transaction("2024-01-06", 100)])
+    index = storage.get_index(LEDGER)
+    assert index.totals[(2024, 1)] == {("expense", "Food"): 50100}
+
+    edit_in_place(LEDGER, b"|50000\n", b"|90000\n")
+    index.refresh()
+    assert index.totals[(2024, 1)] == {("expense", "Food"): 90100}
+
+def test_replaced_ledger_rebuilds(data_dir):
+    write_ledger([transaction("2024-01-05", 100)])
+    index = storage.get_index(LEDGER)
+
+    # Longer than before and sharing its first bytes, yet not an append
+    tmp_path = LEDGER + ".tmp"
+    write_ledger([transaction("2024-01-05", 100), transaction("2024-03-01", 7)], tmp_path)
+    with open(tmp_path, "r+b") as f:
+        f.write(b"2023")
+    os.replace(tmp_path, LEDGER)
+    index.refresh()
+    assert set(index.months) == {(2023, 1), (2024, 3)}
+    assert amounts(index) == [7, 100]
+
+def test_shrunk_ledger_rebuilds(data_dir):
+    write_ledger([transaction("2024-01-05", 100), transaction("2024-01-06", 200)])
+    index = storage.get_index(LEDGER)
+    write_ledger([transaction("2024-01-05", 100)])
+    index.refresh()
+    assert amounts(index) == [100]
@@ -0,0 +1,63 @@
+from datetime import date
+
+import pytest
+
+from conftest import transaction
+from features.analytics.metrics import MetricsPipeline, compute_month, health_score
+from features.storage import budget_store, storage
+
+TODAY = date(2024, 4, 10)
+
+@pytest.fixture
+def ledger(data_dir):
+    storage.append_transactions([
+        transaction("2024-01-05", 100000, "income", "Salary"),
+        transaction("2024-01-09", 30000),
+        transaction("2024-01-20", 20000, category="Bills"),
+        transaction("2024-03-01", 100000, "income", "Salary"),
+        transaction("2024-03-02", 110000),
+        transaction("2024-04-01", 500),
+    ])
+    budget_store.get_store(storage.BUDGETS_FILE).set_many({"Food": 40000}, month="2024-01")
+
+def test_compute_month():
+    metrics = compute_month("2024-01", {("income", "Salary"): 1000, ("expense", "Food"): 300, ("expense", "Bills"): 500}, {"Food": 200, "Bills": 600})
+    assert (metrics.income, metrics.expense, metrics.savings, metrics.savings_rate) == (1000, 800, 200, 20)
+    assert metrics.over_budget == {"Food": 100}
+    assert compute_month("2024-02", {}, {}).savings_rate is None
+
+def test_every_month_up_to_today(ledger):
+    months = MetricsPipeline().months(TODAY)
+    assert [m.month for m in months] == ["2024-01", "2024-02", "2024-03", "2024-04"]
+    january, february, march, april = months
+    assert january.spending == {"Food": 30000, "Bills": 20000}
+    assert january.savings_rate == 50
+    assert february.expense == 0 and february.budgets == {"Food": 40000}
+    assert march.over_budget == {"Food": 70000}
+    assert march.savings == -10000
+    assert april.expense == 500
+
+def test_closed_months_are_reused_until_they_change(ledger):
+    pipeline = MetricsPipeline()
+    first = pipeline.months(TODAY)
+    second = pipeline.months(TODAY)
+    assert all(a is b for a, b in zip(first[:-1], second[:-1]))
+
+    # A backdated row recomputes its month only
+    storage.append_transactions([transaction("2024-02-10", 700)])
+    third = pipeline.months(TODAY)
+    assert third[0] is first[0] and third[2] is first[2]
+    assert third[1].expense == 700
+
+    budget_store.get_store(storage.BUDGETS_FILE).set_many({"Food": 200000}, month="2024-03")
+    assert pipeline.months(TODAY)[2].over_budget == {}
+
+def test_health_score(ledger):
+    months = MetricsPipeline().months(TODAY)
+    score = health_score(months)
+    # January saved 50%, February earned nothing, March spent more than it earned
+    assert score.components["Savings"] == pytest.approx((50 - 10) / 2 / 20)
+    assert score.components["Budgets"] == pytest.approx(2 / 3)
+    assert score.components["Income"] == pytest.approx(2 / 3)
+    assert 0 <= score.score <= 100
+    assert health_score(months[:1]) is None
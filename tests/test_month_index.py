@@ -0,0 +1,87 @@
+import os
+from itertools import islice
+
+from conftest import edit_in_place, transaction, write_ledger
+from features.storage import month_index, storage
+from features.transactions.transactions import list_transactions
+
+LEDGER = storage.TRANSACTIONS_FILE
+INDEX = month_index.month_index_path(LEDGER)
+
+# Mostly in date order, with a few rows entered late, a second run for January
+# and an unparseable line in the middle
+ROWS = [
+    transaction("2024-01-03", 1),
+    transaction("2024-01-09", 2, "income", "Salary"),
+    transaction("2024-02-01", 3),
+    transaction("2024-01-20", 4, category="Bills"),
+    transaction("2024-02-14", 5),
+    transaction("2024-02-14", 6, category="Bills"),
+    transaction("2024-03-31", 7),
+    transaction("2023-12-25", 8, "income", "Gift"),
+]
+
+def newest_first(transactions, start=None, end=None, type=None, category=None):
+    """What iter_newest_first should yield, worked out from every row at once."""
+    rows = [
+        t for t in reversed(transactions)
+        if (not start or t.date >= start) and (not end or t.date <= end)
+        and (not type or t.type == type) and (not category or t.category == category)
+    ]
+    return sorted(rows, key=lambda t: t.date, reverse=True)
+
+def write_rows():
+    write_ledger(ROWS[:4])
+    with open(LEDGER, "a") as f:
+        f.write("not a row\n")
+    storage.append_transactions(ROWS[4:])
+
+def test_newest_first_with_filters(data_dir):
+    write_rows()
+    for filters in [{}, {"start": "2024-01-09", "end": "2024-02-14"}, {"type": "income"}, {"category": "Bills"}]:
+        assert list(storage.iter_newest_first(**filters)) == newest_first(ROWS, **filters)
+    # Same-day rows come latest entry first
+    assert [t.amount for t in storage.iter_newest_first(start="2024-02-14", end="2024-02-14")] == [6, 5]
+
+def test_january_is_read_from_two_runs(data_dir):
+    write_rows()
+    months = month_index.sync(LEDGER)
+    assert len(months[(2024, 1)]) == 2
+    assert [t.amount for t in month_index.read_month(LEDGER, months[(2024, 1)], (2024, 1))] == [1, 2, 4]
+
+def test_appended_rows_are_indexed_from_the_tail(data_dir):
+    write_rows()
+    month_index.sync(LEDGER)
+    extra = [transaction("2023-12-26", 9), transaction("2024-04-01", 10)]
+    storage.append_transactions(extra)
+    caught_up = month_index.sync(LEDGER)
+    os.remove(INDEX)
+    assert caught_up == month_index.sync(LEDGER)
+    # The ledger's last run, December's, is extended rather than a new one started
+    assert len(caught_up[(2023, 12)]) == 1
+    assert list(storage.iter_newest_first()) == newest_first(ROWS + extra)
+
+def test_rewritten_ledger_is_indexed_again(data_dir):
+    write_rows()
+    list(storage.iter_newest_first())
+    edit_in_place(LEDGER, b"2024-03-31", b"2024-04-30")
+    assert (2024, 4) in month_index.sync(LEDGER)
+    assert next(storage.iter_newest_first()).date == "2024-04-30"
+
+def test_unterminated_line_waits_until_complete(data_dir):
+    write_rows()
+    with open(LEDGER, "a") as f:
+        f.write("2025-01-01|expense|Food|Lunch|1")
+    assert next(storage.iter_newest_first()).date == "2024-03-31"
+    with open(LEDGER, "a") as f:
+        f.write("1\n")
+    assert next(storage.iter_newest_first()).amount == 11
+
+def test_pages(data_dir):
+    write_rows()
+    expected = newest_first(ROWS)
+    pages = [list(islice(storage.iter_newest_first(), (page - 1) * 3, page * 3)) for page in (1, 2, 3)]
+    assert pages == [expected[:3], expected[3:6], expected[6:]]
+    assert list_transactions(2, 3) is True
+    assert list_transactions(3, 3) is False
+    assert list_transactions(4, 3) is False
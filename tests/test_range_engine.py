@@ -0,0 +1,79 @@
+import random
+from datetime import date, timedelta
+
+import pytest
+
+from conftest import transaction
+from features.analytics import range_engine
+from features.analytics.range_engine import RangeEngine, get_range_engine, shift_years
+from features.storage import storage
+
+START = date(2023, 11, 20)
+
+@pytest.fixture
+def daily():
+    generator = random.Random(7)
+    totals = {}
+    for _ in range(300):
+        day = (START + timedelta(days=generator.randrange(500))).isoformat()
+        type, category = generator.choice([("expense", "Food"), ("expense", "Bills"), ("income", "Salary")])
+        totals[(day, type, category)] = totals.get((day, type, category), 0) + generator.randrange(1, 10_000)
+    return totals
+
+def brute_total(daily, start, end, type, category=None):
+    return sum(
+        amount for (day, row_type, row_category), amount in daily.items()
+        if start.isoformat() <= day <= end.isoformat() and row_type == type and category in (None, row_category)
+    )
+
+def test_range_totals_match_a_brute_force_sum(daily):
+    engine = RangeEngine(daily)
+    generator = random.Random(1)
+    for _ in range(200):
+        # Ranges reaching before the first and past the last day included
+        start = START + timedelta(days=generator.randrange(-30, 530))
+        end = start + timedelta(days=generator.randrange(-5, 200))
+        for type, category in [("expense", None), ("expense", "Food"), ("income", "Salary"), ("income", "Food")]:
+            assert engine.total(start, end, type, category) == brute_total(daily, start, end, type, category)
+
+def test_series(daily):
+    engine = RangeEngine(daily)
+    monthly = engine.monthly(date(2024, 1, 15), date(2024, 3, 10), "expense", "Food")
+    assert [(year, month) for year, month, _ in monthly] == [(2024, 1), (2024, 2), (2024, 3)]
+    assert monthly[1][2] == brute_total(daily, date(2024, 2, 1), date(2024, 2, 29), "expense", "Food")
+    assert monthly[0][2] == brute_total(daily, date(2024, 1, 15), date(2024, 1, 31), "expense", "Food")
+
+    yearly = engine.yearly("income", month_day_end=(2, 29))
+    assert yearly == [
+        (2023, brute_total(daily, date(2023, 1, 1), date(2023, 2, 28), "income")),
+        (2024, brute_total(daily, date(2024, 1, 1), date(2024, 2, 29), "income")),
+        (2025, brute_total(daily, date(2025, 1, 1), date(2025, 2, 28), "income")),
+    ]
+    assert engine.rolling_12_months(date(2024, 12, 31), "expense") == brute_total(
+        daily, date(2024, 1, 1), date(2024, 12, 31), "expense"
+    )
+    june = {
+        (type, category): brute_total(daily, date(2024, 6, 1), date(2024, 6, 30), type, category)
+        for type, category in [("expense", "Food"), ("expense", "Bills"), ("income", "Salary")]
+    }
+    assert engine.category_totals(date(2024, 6, 1), date(2024, 6, 30)) == {key: amount for key, amount in june.items() if amount}
+
+def test_empty_ledger():
+    engine = RangeEngine({})
+    assert engine.total(date(2024, 1, 1), date(2024, 12, 31), "expense") == 0
+    assert engine.yearly("expense") == []
+    assert engine.first_date is None
+
+def test_shift_years_clamps_leap_days():
+    assert shift_years(date(2024, 2, 29), -1) == date(2023, 2, 28)
+    assert shift_years(date(2023, 3, 1), 1) == date(2024, 3, 1)
+
+def test_engine_is_rebuilt_only_after_the_ledger_changed(data_dir, monkeypatch):
+    monkeypatch.setattr(range_engine, "_engines", {})
+    storage.append_transactions([transaction("2024-01-05", 100)])
+    engine = get_range_engine()
+    assert get_range_engine() is engine
+    storage.append_transactions([transaction("2024-01-06", 50)])
+    rebuilt = get_range_engine()
+    assert rebuilt is not engine
+    assert rebuilt.total(date(2024, 1, 1), date(2024, 1, 31), "expense", "Food") == 150
@@ -0,0 +1,55 @@
+from collections import Counter
+from datetime import date
+
+import pytest
+
+from features.storage import recurring_store, storage
+from features.storage.recurring_store import Rule
+
+LEDGER = storage.TRANSACTIONS_FILE
+RULES = storage.RECURRING_FILE
+
+def rule(frequency="monthly", start="2024-01-31", every=1, end=None):
+    return Rule(frequency, every, start, end, None, "expense", "Bills", "Rent", 100000)
+
+def ledger_dates():
+    return [t.date for t in storage.iter_text_transactions(LEDGER)]
+
+def test_materialize_adds_each_occurrence_once(data_dir):
+    recurring_store.add_rule(rule(), RULES)
+    assert recurring_store.materialize(date(2024, 4, 15), RULES, LEDGER) == 3
+    assert recurring_store.materialize(date(2024, 4, 15), RULES, LEDGER) == 0
+    assert recurring_store.materialize(date(2024, 5, 31), RULES, LEDGER) == 2
+    # Month ends are clamped, leap year included
+    assert ledger_dates() == ["2024-01-31", "2024-02-29", "2024-03-31", "2024-04-30", "2024-05-31"]
+    assert recurring_store.read_rules(RULES)[0].through == "2024-05-31"
+
+def test_occurrences_respect_interval_and_end(data_dir):
+    recurring_store.add_rule(rule("weekly", "2024-01-01", every=2, end="2024-02-01"), RULES)
+    recurring_store.materialize(date(2024, 12, 31), RULES, LEDGER)
+    assert ledger_dates() == ["2024-01-01", "2024-01-15", "2024-01-29"]
+
+def test_interrupted_batch_is_completed_without_duplicates(data_dir, monkeypatch):
+    recurring_store.add_rule(rule("daily", "2024-01-01"), RULES)
+    real_append = storage.append_transactions
+
+    def append_half_then_crash(transactions, path):
+        real_append(transactions[:2], path)
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(recurring_store, "append_transactions", append_half_then_crash)
+    with pytest.raises(KeyboardInterrupt):
+        recurring_store.materialize(date(2024, 1, 5), RULES, LEDGER)
+    assert recurring_store.load(RULES)[1] is not None
+    monkeypatch.setattr(recurring_store, "append_transactions", real_append)
+
+    assert recurring_store.materialize(date(2024, 1, 5), RULES, LEDGER) == 3
+    assert Counter(ledger_dates()) == Counter(f"2024-01-0{day}" for day in range(1, 6))
+    assert recurring_store.load(RULES)[1] is None
+
+def test_bad_rules_are_refused(data_dir):
+    with pytest.raises(ValueError):
+        recurring_store.add_rule(rule(start="2024-02-30"), RULES)
+    with pytest.raises(ValueError):
+        recurring_store.add_rule(rule(start="2024-02-01", end="2024-01-01"), RULES)
+    assert recurring_store.read_rules(RULES) == []
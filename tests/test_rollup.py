@@ -0,0 +1,66 @@
+import os
+import threading
+
+from conftest import edit_in_place, transaction, write_ledger
+from features.storage import rollup, storage
+
+LEDGER = storage.TRANSACTIONS_FILE
+
+def test_append_keeps_the_rollup_current(data_dir):
+    storage.append_transactions([transaction("2024-01-05", 100)], LEDGER)
+    storage.append_transactions([transaction("2024-01-09", 50), transaction("2024-02-01", 7, "income", "Salary")], LEDGER)
+    assert storage.verify_rollup(LEDGER) == []
+    _, totals = rollup.load(storage.rollup_path(LEDGER))
+    assert totals == {
+        (2024, 1): {("expense", "Food"): 150},
+        (2024, 2): {("income", "Salary"): 7},
+    }
+
+def test_rows_appended_behind_its_back_are_summed(data_dir):
+    storage.append_transactions([transaction("2024-01-05", 100)], LEDGER)
+    with open(LEDGER, "a") as f:
+        f.write("2024-01-06|expense|Food|Snack|25\n")
+    assert storage._synced_rollup(LEDGER) == {(2024, 1): {("expense", "Food"): 125}}
+    assert storage.verify_rollup(LEDGER) == []
+
+def test_same_size_edit_makes_the_rollup_stale(data_dir):
+    storage.append_transactions([transaction("2024-01-05", 50000)], LEDGER)
+    edit_in_place(LEDGER, b"|50000\n", b"|90000\n")
+    covered, _ = rollup.load(storage.rollup_path(LEDGER))
+    assert covered.size == len(open(LEDGER, "rb").read())
+    assert storage._synced_rollup(LEDGER) == {(2024, 1): {("expense", "Food"): 90000}}
+
+def test_rollup_without_a_fingerprint_is_rebuilt(data_dir):
+    write_ledger([transaction("2024-01-05", 100)])
+    with open(storage.rollup_path(LEDGER), "w") as f:
+        f.write("# ledger_size=999\n2024-01|expense|Food|1\n")
+    assert storage._synced_rollup(LEDGER) == {(2024, 1): {("expense", "Food"): 100}}
+
+def test_has_transactions_does_not_index_the_ledger(data_dir):
+    assert not storage.has_transactions(LEDGER)
+    write_ledger([transaction("2024-01-05", 100)])
+    assert storage.has_transactions(LEDGER)
+    assert storage._indexes == {}
+
+def test_concurrent_saves_each_use_their_own_temporary_file(data_dir):
+    write_ledger([transaction("2024-01-05", 100)])
+    storage._synced_rollup(LEDGER)
+    path = storage.rollup_path(LEDGER)
+    covered, totals = rollup.load(path)
+    errors = []
+
+    def save_repeatedly():
+        try:
+            for _ in range(200):
+                rollup.save(path, covered, totals)
+        except OSError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=save_repeatedly) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert [name for name in os.listdir("database") if name.endswith(".tmp")] == []
+    assert rollup.load(path) == (covered, totals)
@@ -0,0 +1,85 @@
+import os
+
+import pytest
+
+from conftest import edit_in_place, transaction, write_ledger
+from features.storage import search_index, shards, storage
+from features.storage.search_index import SearchIndex, index_path
+
+LEDGER = storage.TRANSACTIONS_FILE
+
+ROWS = [
+    transaction("2024-01-05", 100, description="Coffee at Blue Tokai"),
+    transaction("2024-01-20", 200, category="Bills", description="Electricity bill"),
+    transaction("2024-02-02", 300, description="Blue Tokai beans"),
+    transaction("2024-02-02", 400, "income", "Refund", "Refund from Blue Tokai"),
+    transaction("2024-03-15", 500, description="Lunch, coffee & cake"),
+]
+
+@pytest.fixture
+def ledger(data_dir, monkeypatch):
+    monkeypatch.setattr(search_index, "_indexes", {})
+    write_ledger(ROWS)
+
+def amounts(result):
+    return [t.amount for t in result.transactions]
+
+def test_every_word_matches_as_a_prefix(ledger):
+    result = storage.search("blu tok")
+    # Newest first, the later entry of a day on top
+    assert amounts(result) == [400, 300, 100]
+    assert result.total == 3
+    assert result.categories == {"Food": 2, "Refund": 1}
+    assert amounts(storage.search("COFFEE")) == [500, 100]
+    assert storage.search("tea").total == 0
+    assert storage.search("  ").total == 0
+
+def test_facets(ledger):
+    assert amounts(storage.search("blue", start="2024-02-01")) == [400, 300]
+    assert amounts(storage.search("blue", end="2024-02-01")) == [100]
+    assert amounts(storage.search("blue", type="income")) == [400]
+    assert amounts(storage.search("blue", category=["Food", "Bills"])) == [300, 100]
+    assert storage.search("blue", category="Travel").total == 0
+
+def test_limit_keeps_the_counts_of_every_match(ledger):
+    result = storage.search("blue", limit=1)
+    assert amounts(result) == [400]
+    assert result.total == 3
+    assert result.categories == {"Food": 2, "Refund": 1}
+
+def test_appended_rows_are_indexed_from_the_tail(ledger):
+    storage.search("blue")
+    snapshot = os.stat(index_path(LEDGER)).st_mtime_ns
+    storage.append_transactions([transaction("2024-04-01", 600, description="Blue cheese")])
+    assert amounts(storage.search("blue")) == [600, 400, 300, 100]
+    # A few appended rows don't rewrite the snapshot
+    assert os.stat(index_path(LEDGER)).st_mtime_ns == snapshot
+
+def test_snapshot_is_reloaded(ledger):
+    storage.search("blue")
+    storage.append_transactions([transaction("2024-04-01", 600, description="Blue cheese")])
+    index = SearchIndex(LEDGER)
+    assert index.snapshot_rows == len(ROWS)
+    index.refresh()
+    assert sorted(index.matches("blue")) == [0, 2, 3, 5]
+
+def test_rewritten_ledger_is_indexed_again(ledger):
+    storage.search("blue")
+    edit_in_place(LEDGER, b"Blue Tokai beans", b"Green tea beans!")
+    assert amounts(storage.search("blue")) == [400, 100]
+    assert amounts(storage.search("green tea")) == [300]
+
+def test_cut_short_snapshot_is_rebuilt(ledger):
+    storage.search("blue")
+    with open(index_path(LEDGER), "r+b") as f:
+        f.truncate(os.path.getsize(index_path(LEDGER)) - 8)
+    search_index._indexes.clear()
+    assert amounts(storage.search("blue")) == [400, 300, 100]
+
+def test_archived_shards_are_searched(ledger, monkeypatch):
+    monkeypatch.setattr(shards, "WORKERS", 1)
+    storage.append_transactions([transaction("2023-12-31", 7, description="Blue pen")])
+    assert shards.archive(2024) == 1
+    result = storage.search("blue")
+    assert amounts(result) == [400, 300, 100, 7]
+    assert result.categories == {"Food": 3, "Refund": 1}
@@ -0,0 +1,102 @@
+import os
+
+import pytest
+
+from conftest import edit_in_place, transaction, write_ledger
+from features.storage import journal, shards, storage
+
+LEDGER = storage.TRANSACTIONS_FILE
+SHARDS = storage.SHARDS_DIR
+
+ROWS = [
+    transaction("2022-06-01", 100),
+    transaction("2023-01-15", 200, "income", "Salary"),
+    transaction("2023-01-15", 30),
+    transaction("2024-02-01", 400),
+    transaction("2022-12-31", 5, category="Bills"),
+    transaction("2024-03-10", 60, "income", "Salary"),
+]
+
+@pytest.fixture
+def ledger(data_dir, monkeypatch):
+    """A ledger spanning 2022 to 2024, with the totals it has before anything is archived."""
+    monkeypatch.setattr(shards, "_daily_cache", {})
+    monkeypatch.setattr(shards, "WORKERS", 1)
+    write_ledger(ROWS)
+    with open(LEDGER, "a") as f:
+        f.write("not a row\n")
+    return storage.monthly_totals(), storage.daily_totals()
+
+def shard_names():
+    return sorted(name for name in os.listdir(SHARDS) if name.endswith(".txt"))
+
+def test_totals_add_up_across_shards(ledger):
+    monthly, daily = ledger
+    assert shards.archive(2024) == 4
+    assert shard_names() == ["2022.txt", "2023.txt"]
+    # The unparseable line stays in the live ledger
+    assert open(LEDGER).read().count("\n") == 3
+    assert storage.monthly_totals() == monthly
+    assert storage.daily_totals() == daily
+    assert storage.month_totals(2023, 1) == {("income", "Salary"): 200, ("expense", "Food"): 30}
+    assert sorted(t.amount for t in storage.read_transactions()) == sorted(t.amount for t in ROWS)
+
+def test_shard_sums_are_persisted_and_follow_edits(ledger):
+    shards.archive(2024)
+    storage.daily_totals()
+    storage.monthly_totals()
+    shard = os.path.join(SHARDS, "2022.txt")
+    assert os.path.exists(shards.shard_daily_path(shard)) and os.path.exists(shards.shard_rollup_path(shard))
+
+    edit_in_place(shard, b"|100\n", b"|900\n")
+    assert shards.daily_totals()[("2022-06-01", "expense", "Food")] == 900
+    assert shards.monthly_totals()[(2022, 6)] == {("expense", "Food"): 900}
+
+def test_worker_pool_merges_in_shard_order(ledger, monkeypatch):
+    shards.archive(2024)
+    monkeypatch.setattr(shards, "WORKERS", 2)
+    assert storage.monthly_totals() == ledger[0]
+    assert storage.daily_totals() == ledger[1]
+
+def test_archiving_again_moves_nothing(ledger):
+    shards.archive(2024)
+    assert shards.archive(2024) == 0
+    storage.append_transactions([transaction("2023-05-05", 7)])
+    assert shards.archive(2024) == 1
+    assert open(os.path.join(SHARDS, "2023.txt")).read().count("\n") == 3
+
+def test_crash_before_the_ledger_is_replaced_is_undone(ledger, monkeypatch):
+    shards.archive(2023)
+    real_replace = shards._replace_synced
+
+    def crash_on_ledger(path, data):
+        if path == LEDGER:
+            raise KeyboardInterrupt
+        real_replace(path, data)
+
+    monkeypatch.setattr(shards, "_replace_synced", crash_on_ledger)
+    with pytest.raises(KeyboardInterrupt):
+        shards.archive(2024)
+    assert os.path.exists(shards.archive_marker_path())
+    monkeypatch.setattr(shards, "_replace_synced", real_replace)
+
+    # The 2022 shard is cut back and the new 2023 shard removed
+    assert shards.recover_archive()
+    assert shard_names() == ["2022.txt"]
+    assert not os.path.exists(shards.archive_marker_path())
+    assert shards.archive(2024) == 2
+    assert storage.monthly_totals() == ledger[0]
+
+def test_crash_after_the_ledger_is_replaced_is_finished(ledger, monkeypatch):
+    def crash(path):
+        raise KeyboardInterrupt
+
+    with monkeypatch.context() as patch, pytest.raises(KeyboardInterrupt):
+        patch.setattr(journal, "sync_dir", crash)
+        shards.archive(2024)
+
+    # The next archive() keeps what was moved and only drops the marker
+    assert shards.archive(2024) == 0
+    assert not os.path.exists(shards.archive_marker_path())
+    assert shard_names() == ["2022.txt", "2023.txt"]
+    assert storage.monthly_totals() == ledger[0]
@@ -0,0 +1,34 @@
+import pytest
+
+from conftest import transaction, write_ledger
+from features.storage import budget_store, sqlite_backend, storage
+
+DB = sqlite_backend.SQLITE_FILE
+
+@pytest.fixture
+def text_files(data_dir):
+    write_ledger([
+        transaction("2024-01-05", 100),
+        transaction("2024-02-01", 5000, "income", "Salary", "Pay | January"),
+    ])
+    store = budget_store.get_store(storage.BUDGETS_FILE)
+    store.set_many({"Food": 1000}, month="2024-01")
+    store.set_many({"Food": 2000, "Bills": 300}, month="2024-03")
+
+def test_import_copies_rows_and_every_budget_month(text_files):
+    assert sqlite_backend.import_text_files(DB) == 2
+    assert sqlite_backend.read_transactions(DB) == list(storage.iter_text_transactions())
+    assert sqlite_backend.budget_history("Food", path=DB) == [("2024-01", 1000), ("2024-03", 2000)]
+    assert sqlite_backend.read_budgets(month="2024-02", path=DB) == {"Food": 1000}
+
+def test_second_import_is_refused(text_files):
+    sqlite_backend.import_text_files(DB)
+    with pytest.raises(ValueError):
+        sqlite_backend.import_text_files(DB)
+    assert sqlite_backend.ledger_version(DB)[0] == 2
+
+def test_forced_import_replaces(text_files):
+    sqlite_backend.import_text_files(DB)
+    storage.append_transactions([transaction("2024-02-02", 1)])
+    assert sqlite_backend.import_text_files(DB, force=True) == 3
+    assert sqlite_backend.ledger_version(DB)[0] == 3